@@ -0,0 +1,177 @@
+from input_handler import InputHandler
+from input_reader import InputReader
+from output import OutputBuffer
+from context import ExecutionContext
+from interpreter import Interpreter
+from program_cache import MemoryProgramCache
+from interpret import load_image
+from server import REQUEST_SOURCE
+
+import asyncio
+import io
+import sys
+
+# ///--------- ASYNCIO -------\\\\\\
+#
+# run_program runs a program as a coroutine, so one event loop can host
+# many interactive sessions: READ awaits the next line of an asyncio.StreamReader
+# and the output goes to an asyncio.StreamWriter, waiting for it to drain
+# when the client reads slower than the program writes
+#
+# the program runs on the tree engine, the only one which can stop
+# between any two instructions, a long computation gives the event loop
+# its turn every YIELD_INTERVAL instructions
+
+# number of instructions executed between two yields to the event loop
+YIELD_INTERVAL = 1000
+
+# return code of a session with options it can't run with
+BAD_OPTION = 10
+# return code of a session whose client went away, like an output file which can't be written
+CONNECTION_LOST = 12
+
+
+# READ gets the line the session awaited just before it
+class SessionInput(InputReader):
+    def __init__(self):
+        self.line = None
+
+    def _next_line(self):
+        line = self.line
+        self.line = None
+        return line
+
+
+# WRITE collects the output in the buffer, a full buffer is handed to the writer
+# and the session drains the writer after the WRITE
+class SessionOutput(OutputBuffer):
+    def __init__(self, writer: asyncio.StreamWriter):
+        super().__init__(writer)
+        # the writer got data which wasn't drained yet
+        self.pending = False
+
+    def flush(self) -> None:
+        if self._buffer:
+            # the transport may keep what it gets, the buffer is reused
+            self._stream.write(bytes(self._buffer))
+            self._buffer.clear()
+            self.pending = True
+
+    # wait until the writer drains, everything written is handed to it first with flush
+    async def drain(self, flush: bool = True) -> None:
+        if flush:
+            self.flush()
+        if self.pending:
+            self.pending = False
+            await self._stream.drain()
+
+
+# the next line of the reader without the line ending, None at the end,
+# a line longer than the limit of the reader is read on in parts
+async def _read_line(reader: asyncio.StreamReader) -> bytes:
+    parts = []
+    while True:
+        try:
+            parts.append(await reader.readuntil(b"\n"))
+            break
+        except asyncio.IncompleteReadError as e:
+            parts.append(e.partial)
+            break
+        except asyncio.LimitOverrunError as e:
+            parts.append(await reader.readexactly(e.consumed))
+
+    line = b"".join(parts)
+    if not line:
+        return None
+
+    if line.endswith(b"\n"):
+        line = line[:-1]
+    if line.endswith(b"\r"):
+        line = line[:-1]
+    return line
+
+
+# run the program (XML or bytecode) with the command line options in args,
+# READ reads the lines of the reader and WRITE writes to the writer, the writer
+# isn't closed, returns the return code of the program
+async def run_program(program: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                      args: list[str] = None, memory_cache: MemoryProgramCache = None,
+                      yield_interval: int = YIELD_INTERVAL) -> int:
+    output_stream = SessionOutput(writer)
+    try:
+        inpt = InputHandler()
+        inpt.parse_arguments(list(args or []) + [f"--source={REQUEST_SOURCE}"])
+        if inpt.args["engine"] != "tree":
+            print(f"Sessions can't run on the {inpt.args['engine']} engine", file=sys.stderr)
+            return BAD_OPTION
+
+        inpt.input_file = "stdin"
+        # bytecode is recognised by peeking at the source
+        inpt.source_file = io.BufferedReader(io.BytesIO(program))
+        image = load_image(inpt, memory_cache)
+
+        context = ExecutionContext(SessionInput(), output_stream)
+        if inpt.args["frame_pool"] is not None:
+            context.memory.set_frame_pool_cap(inpt.args["frame_pool"])
+
+        # the interpreter lays out the frames, the session runs its instructions
+        interpreter = Interpreter(None, image=image, context=context)
+        try:
+            await _execute_instructions(image["instructions"], context, reader, yield_interval)
+        finally:
+            if inpt.args["stats"]:
+                interpreter.print_statistics()
+        return_code = 0
+
+    # errors and EXIT end the session with their return code like they end the process
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return_code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            return_code = 1
+
+    # a client which went away ends only its own session, not the loop hosting the others
+    except ConnectionError as e:
+        print(f"Session lost its connection: {e}", file=sys.stderr)
+        return CONNECTION_LOST
+
+    # a cancelled session doesn't wait for its output
+    try:
+        await output_stream.drain()
+    except ConnectionError as e:
+        print(f"Session lost its connection: {e}", file=sys.stderr)
+        return CONNECTION_LOST
+    return return_code
+
+
+# the loop of Interpreter.execute_instructions with the awaits of the session
+async def _execute_instructions(instructions: list, context: ExecutionContext, reader: asyncio.StreamReader,
+                                yield_interval: int) -> None:
+    output_stream = context.output_stream
+    num_instructions = len(instructions)
+    countdown = yield_interval
+    context.instruction_index = 0
+    while context.instruction_index < num_instructions:
+        instruction = instructions[context.instruction_index]
+        opcode = instruction.opcode
+        if opcode == "READ":
+            # the client sees everything written before the program waits for it
+            await output_stream.drain()
+            context.input_stream.line = await _read_line(reader)
+
+        next_index = instruction.execute(context)
+        if next_index is None:
+            context.instruction_index += 1
+        else:
+            context.instruction_index = next_index
+
+        # backpressure only when WRITE filled the buffer
+        if opcode == "WRITE" and output_stream.pending:
+            await output_stream.drain(flush=False)
+
+        countdown -= 1
+        if countdown == 0:
+            countdown = yield_interval
+            await output_stream.drain()
+            await asyncio.sleep(0)
@@ -0,0 +1,98 @@
+from program_cache import MemoryProgramCache
+from server import handle_request
+
+import json
+import os
+import sys
+
+# ///--------- MANIFEST -------\\\\\\
+#
+# one job per line, json with the paths relative to the manifest:
+#   {"source": "prog.xml", "input": "prog.in", "output": "prog.out"}
+# input and output are optional, a job without input reads nothing and
+# the output of a job without output is put into its result, the limits
+# of the server can be given too: "timeout" in seconds, "max_output" in bytes
+#
+# the results are json lines in the order of the jobs:
+#   {"job": 1, "source": "prog.xml", "exit_code": 0, "timed_out": false,
+#    "output_truncated": false, "stderr": "", "output": "prog.out"}
+# with "stdout" instead of "output" for a job without output file,
+# exit_code is null when the program was stopped by one of the limits
+
+# return codes of jobs which couldn't be run
+BAD_JOB = 10
+MISSING_FILE = 11
+OUTPUT_FILE_ERROR = 12
+
+
+# run every job of the manifest in this process with the same options,
+# programs repeated in the manifest are loaded and linked only once
+def run_batch(manifest: str, results: str = None, options: list[str] = None) -> int:
+    options = [] if options is None else options
+    directory = os.path.dirname(os.path.abspath(manifest))
+    memory_cache = MemoryProgramCache()
+
+    try:
+        manifest_file = open(manifest, "r", encoding="utf-8")
+    except OSError as e:
+        print(e, file=sys.stderr)
+        sys.exit(MISSING_FILE)
+
+    results_file = sys.stdout if results is None else open(results, "w", encoding="utf-8")
+    with manifest_file:
+        for number, line in enumerate(manifest_file, 1):
+            if not line.strip():
+                continue
+
+            result = {"job": number}
+            result.update(_run_job(line, directory, options, memory_cache))
+            results_file.write(json.dumps(result) + "\n")
+            # results of the finished jobs are kept if the batch is stopped
+            results_file.flush()
+
+    if results is not None:
+        results_file.close()
+
+    return 0
+
+
+def _failed_job(message: str, exit_code: int) -> dict:
+    return {"exit_code": exit_code, "timed_out": False, "output_truncated": False, "stderr": message}
+
+
+# run one line of the manifest, a bad job is reported in its result
+def _run_job(line: str, directory: str, options: list[str], memory_cache: MemoryProgramCache) -> dict:
+    try:
+        job = json.loads(line)
+        source = job["source"]
+    except (ValueError, TypeError, KeyError) as e:
+        return _failed_job(f"Bad job: {e}", BAD_JOB)
+
+    try:
+        with open(os.path.join(directory, source), "rb") as file:
+            program = file.read()
+        input_data = b""
+        if job.get("input") is not None:
+            with open(os.path.join(directory, job["input"]), "rb") as file:
+                input_data = file.read()
+    except (OSError, TypeError) as e:
+        return dict(source=source, **_failed_job(str(e), MISSING_FILE))
+
+    header = {"args": options, "timeout": job.get("timeout"), "max_output": job.get("max_output")}
+    reply, stdout, stderr = handle_request(header, program, input_data, memory_cache)
+
+    result = dict(source=source, **reply)
+    result["stderr"] = stderr.decode("utf-8")
+    if job.get("output") is None:
+        result["stdout"] = stdout.decode("utf-8", "replace")
+        return result
+
+    result["output"] = job["output"]
+    try:
+        with open(os.path.join(directory, job["output"]), "wb") as file:
+            file.write(stdout)
+    except OSError as e:
+        result["exit_code"] = OUTPUT_FILE_ERROR
+        result["stderr"] += str(e)
+
+    return result
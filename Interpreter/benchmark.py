@@ -0,0 +1,604 @@
+import os
+import sys
+import json
+import time
+import gc
+import argparse
+import tempfile
+import subprocess
+
+from output import OutputBuffer
+from input_handler import InputHandler
+from interpreter import Interpreter
+from bytecode import BytecodeReader
+from client import InterpreterClient
+
+BLUE = "\033[34m"
+BLACK = "\033[0m"
+
+# import time of the interpreter running a bytecode program in ms
+STARTUP_BUDGET = 30
+
+parser = argparse.ArgumentParser()
+parser.add_argument("benchmark", choices=["output", "load", "cache", "bytecode", "startup", "serve", "batch",
+                                              "inputs", "lockstep", "sessions",
+                                              "scheduler"])
+parser.add_argument("--python", default=sys.executable)
+parser.add_argument("--engine", default="tree")
+parser.add_argument("--repeat", type=int, default=3)
+parser.add_argument("--size", type=int, default=200000)
+# numbers of instructions of the programs loaded by the load benchmark
+parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+# number of programs sent by the serve benchmark and run by the batch
+# benchmark, number of input files of the inputs benchmark
+parser.add_argument("--requests", type=int, default=200)
+# number of worker processes of the inputs benchmark (default number of CPUs)
+parser.add_argument("--jobs", type=int, default=None)
+# number of lines each session of the sessions benchmark sends and gets back
+parser.add_argument("--lines", type=int, default=20)
+# instructions of one turn of the scheduler benchmark
+parser.add_argument("--quantum", type=int, default=1000)
+# number of inputs run at once by the lockstep benchmark
+parser.add_argument("--lockstep", type=int, default=64)
+# limit of the time spent importing the interpreter in ms, checked by the startup benchmark
+parser.add_argument("--budget", type=float, default=STARTUP_BUDGET)
+
+args = parser.parse_args()
+
+
+# xml of a program from (opcode, [(type, value), ...]) pairs
+def make_program(instructions: list[tuple[str, list[tuple[str, str]]]]) -> str:
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<program language="IPPcode23">']
+    for order, (opcode, operands) in enumerate(instructions, 1):
+        lines.append(f'    <instruction order="{order}" opcode="{opcode}">')
+        for index, (type_, value) in enumerate(operands, 1):
+            lines.append(f'        <arg{index} type="{type_}">{value}</arg{index}>')
+        lines.append('    </instruction>')
+    lines.append('</program>')
+    return "\n".join(lines) + "\n"
+
+
+# the function run with the collector off during the loads like interpret.py does
+def without_gc(function):
+    def run():
+        gc.disable()
+        try:
+            function()
+        finally:
+            gc.enable()
+    return run
+
+
+# best wall time of the function in seconds
+def best_time(function) -> float:
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+# best wall time of interpret.py running the program
+def time_interpreter(source: str, extra_args: list[str] = None) -> float:
+    extra_args = [] if extra_args is None else extra_args
+    command = [args.python, "interpret.py", f"--source={source}", f"--engine={args.engine}"] + extra_args
+    def run():
+        subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=False)
+    return best_time(run)
+
+
+def report(name: str, seconds: float) -> None:
+    print(f"{BLUE}{name:<40}{BLACK} {seconds * 1000:10.1f} ms")
+
+
+# ///--------- OUTPUT -------\\\\\\
+
+# writing one character at a time through print and through the output buffer,
+# then a whole program which writes one character per loop iteration
+def benchmark_output() -> None:
+    chars = "ab\n" * (args.size // 3)
+
+    def print_chars():
+        with open(os.devnull, "w") as stream:
+            for char in chars:
+                print(char, end='', file=stream)
+
+    def buffer_chars():
+        with open(os.devnull, "wb") as stream:
+            output_stream = OutputBuffer(stream)
+            for char in chars:
+                output_stream.write(char)
+            output_stream.flush()
+
+    print_time = best_time(print_chars)
+    buffer_time = best_time(buffer_chars)
+    report(f"print {len(chars)} chars", print_time)
+    report(f"OutputBuffer {len(chars)} chars", buffer_time)
+    print(f"speedup {print_time / buffer_time:.2f}x")
+
+    program = make_program([
+        ("DEFVAR", [("var", "GF@i")]),
+        ("MOVE", [("var", "GF@i"), ("int", str(args.size))]),
+        ("LABEL", [("label", "loop")]),
+        ("WRITE", [("string", "a")]),
+        ("SUB", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+        ("JUMPIFNEQ", [("label", "loop"), ("var", "GF@i"), ("int", "0")]),
+    ])
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "write.xml")
+        with open(source, "w") as file:
+            file.write(program)
+
+        report(f"program writing {args.size} chars to stdout", time_interpreter(source))
+        report(f"program writing {args.size} chars to --output",
+               time_interpreter(source, [f"--output={os.path.join(directory, 'out.txt')}"]))
+
+
+# ///--------- LOADING -------\\\\\\
+
+# program with the given number of instructions, every kind of argument is used
+def write_load_program(file_name: str, size: int) -> None:
+    body = [
+        ("MOVE", [("var", "GF@a"), ("int", "42")]),
+        ("CONCAT", [("var", "GF@s"), ("string", "some\\032text"), ("var", "GF@s")]),
+        ("JUMPIFEQ", [("label", "end"), ("var", "GF@a"), ("bool", "true")]),
+        ("READ", [("var", "GF@a"), ("type", "int")]),
+    ]
+    with open(file_name, "w") as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n<program language="IPPcode23">\n')
+        for order in range(1, size + 1):
+            opcode, operands = body[order % len(body)]
+            file.write(f'    <instruction order="{order}" opcode="{opcode}">\n')
+            for index, (type_, value) in enumerate(operands, 1):
+                file.write(f'        <arg{index} type="{type_}">{value}</arg{index}>\n')
+            file.write('    </instruction>\n')
+        file.write('</program>\n')
+
+
+# time of parsing, verifying and converting programs of different sizes
+def benchmark_load() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            source = os.path.join(directory, f"load_{size}.xml")
+            write_load_program(source, size)
+
+            def load():
+                handler = InputHandler()
+                handler.input_file = "stdin"
+                handler.source_file = open(source, "rb")
+                handler.load_program()
+                handler.get_instructions()
+                handler.source_file.close()
+
+            seconds = best_time(without_gc(load))
+            report(f"load {size} instructions", seconds)
+            print(f"{'':<40} {seconds / size * 1e6:10.2f} us per instruction")
+            os.remove(source)
+
+
+# ///--------- PROGRAM CACHE -------\\\\\\
+
+# program with the given number of instructions which can be linked,
+# it only defines its variables and jumps over the rest to its end
+def linked_program(size: int) -> list[tuple[str, list[tuple[str, str]]]]:
+    body = [
+        ("MOVE", [("var", "GF@a"), ("int", "42")]),
+        ("CONCAT", [("var", "GF@s"), ("string", "some\\032text"), ("var", "GF@s")]),
+        ("JUMPIFEQ", [("label", "end"), ("var", "GF@a"), ("bool", "true")]),
+        ("READ", [("var", "GF@a"), ("type", "int")]),
+    ]
+    program = [
+        ("DEFVAR", [("var", "GF@a")]),
+        ("DEFVAR", [("var", "GF@s")]),
+        ("JUMP", [("label", "end")]),
+    ]
+    program += [body[order % len(body)] for order in range(size)]
+    program.append(("LABEL", [("label", "end")]))
+    return program
+
+
+# runs of a big program without the cache, filling the cache and hitting it
+def benchmark_cache() -> None:
+    program = linked_program(args.size)
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "cached.xml")
+        cache = os.path.join(directory, "cache")
+        with open(source, "w") as file:
+            file.write(make_program(program))
+
+        report(f"{args.size} instructions without cache", time_interpreter(source))
+        start = time.perf_counter()
+        subprocess.run([args.python, "interpret.py", f"--source={source}", f"--engine={args.engine}",
+                        f"--cache={cache}"], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=False)
+        report(f"{args.size} instructions filling cache", time.perf_counter() - start)
+        report(f"{args.size} instructions from cache", time_interpreter(source, [f"--cache={cache}"]))
+
+
+# ///--------- BYTECODE -------\\\\\\
+
+# loading and linking programs from XML and loading the same programs from bytecode
+def benchmark_bytecode() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            source = os.path.join(directory, f"program_{size}.xml")
+            compiled = os.path.join(directory, f"program_{size}.ippc")
+            with open(source, "w") as file:
+                file.write(make_program(linked_program(size)))
+            subprocess.run([args.python, "ippc.py", source, f"--output={compiled}"], check=True)
+
+            def load_xml():
+                handler = InputHandler()
+                handler.input_file = "stdin"
+                handler.source_file = open(source, "rb")
+                handler.load_program()
+                Interpreter(handler.get_instructions()[0])
+                handler.source_file.close()
+
+            def load_bytecode():
+                with open(compiled, "rb") as file:
+                    Interpreter(None, image=BytecodeReader.open(file).load())
+
+            xml_time = best_time(without_gc(load_xml))
+            bytecode_time = best_time(without_gc(load_bytecode))
+            report(f"XML {size} instructions", xml_time)
+            report(f"bytecode {size} instructions", bytecode_time)
+            print(f"{'':<40} {os.path.getsize(source) / os.path.getsize(compiled):10.1f}x smaller,"
+                  f" {xml_time / bytecode_time:.1f}x faster")
+
+
+# ///--------- STARTUP -------\\\\\\
+
+# {module: (self, cumulative)} import times in ms of the modules imported
+# by the command, only the top level modules have the cumulative time
+def import_times(command: list[str], env: dict[str, str]) -> dict[str, tuple[float, float]]:
+    process = subprocess.run([args.python, "-X", "importtime"] + command, env=env, stdin=subprocess.DEVNULL,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        top_level = not name.startswith("  ")
+        times[name.strip()] = (int(self_time) / 1000, int(cumulative) / 1000 if top_level else 0)
+    return times
+
+
+# time spent importing the interpreter (without the modules python imports on its own)
+# compared to the budget, and the wall time of running small programs
+def benchmark_startup() -> None:
+    # startup is measured with the compiled modules cached like in an installation
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "startup.xml")
+        compiled = os.path.join(directory, "startup.ippc")
+        with open(source, "w") as file:
+            file.write(make_program(linked_program(10)))
+        subprocess.run([args.python, "ippc.py", source, f"--output={compiled}"], env=env, check=True)
+
+        python_modules = import_times(["-c", "pass"], env)
+        imports_time = {}
+        for name, command in [("bytecode", ["interpret.py", f"--source={compiled}"]),
+                              ("XML", ["interpret.py", f"--source={source}"])]:
+            times = {module: time for module, time in import_times(command, env).items()
+                     if module not in python_modules}
+            total = sum(cumulative for _, cumulative in times.values())
+            imports_time[name] = total
+            report(f"imports running {name} program", total / 1000)
+            for module, (self_time, _) in sorted(times.items(), key=lambda item: -item[1][0])[:5]:
+                print(f"{'':<4}{module:<36} {self_time:10.1f} ms")
+
+        def run(command: list[str]):
+            def run_command():
+                subprocess.run([args.python] + command, env=env, stdin=subprocess.DEVNULL,
+                               stdout=subprocess.DEVNULL, check=False)
+            return run_command
+
+        report("python -c pass", best_time(run(["-c", "pass"])))
+        report("bytecode program", best_time(run(["interpret.py", f"--source={compiled}"])))
+        report("XML program", best_time(run(["interpret.py", f"--source={source}"])))
+
+    if imports_time["bytecode"] > args.budget:
+        print(f"imports take {imports_time['bytecode']:.1f} ms, over the budget of {args.budget:.1f} ms")
+        sys.exit(1)
+    print(f"imports take {imports_time['bytecode']:.1f} ms, within the budget of {args.budget:.1f} ms")
+
+
+# ///--------- SERVER -------\\\\\\
+
+# requests per second of one server process compared to one process per program
+def benchmark_serve() -> None:
+    program = make_program(linked_program(10)).encode("utf-8")
+    arguments = [f"--engine={args.engine}"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "serve.xml")
+        with open(source, "wb") as file:
+            file.write(program)
+
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            subprocess.run([args.python, "interpret.py", f"--source={source}"] + arguments,
+                           stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=False)
+        process_time = time.perf_counter() - start
+
+    with InterpreterClient(python=args.python) as client:
+        # the first request pays for the imports
+        client.run(program, args=arguments)
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            client.run(program, args=arguments)
+        serve_time = time.perf_counter() - start
+
+    print(f"{BLUE}{'process per program':<40}{BLACK} {args.requests / process_time:10.1f} requests/s")
+    print(f"{BLUE}{'--serve':<40}{BLACK} {args.requests / serve_time:10.1f} requests/s")
+    print(f"speedup {process_time / serve_time:.2f}x")
+
+
+# ///--------- BATCH -------\\\\\\
+
+# programs per second of --batch compared to one process per program,
+# the jobs cycle through a few programs like nightly runs of the same tests
+def benchmark_batch() -> None:
+    arguments = [f"--engine={args.engine}"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        sources = []
+        for size in [10, 20, 50, 100]:
+            source = os.path.join(directory, f"batch{size}.xml")
+            with open(source, "w") as file:
+                file.write(make_program(linked_program(size)))
+            sources.append(source)
+        jobs = [sources[index % len(sources)] for index in range(args.requests)]
+
+        start = time.perf_counter()
+        for source in jobs:
+            subprocess.run([args.python, "interpret.py", f"--source={source}"] + arguments,
+                           stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=False)
+        process_time = time.perf_counter() - start
+
+        manifest = os.path.join(directory, "manifest.jsonl")
+        with open(manifest, "w") as file:
+            for source in jobs:
+                file.write(json.dumps({"source": source}) + "\n")
+
+        start = time.perf_counter()
+        subprocess.run([args.python, "interpret.py", f"--batch={manifest}"] + arguments,
+                       stdout=subprocess.DEVNULL, check=True)
+        batch_time = time.perf_counter() - start
+
+    print(f"{BLUE}{'process per program':<40}{BLACK} {args.requests / process_time:10.1f} programs/s")
+    print(f"{BLUE}{'--batch':<40}{BLACK} {args.requests / batch_time:10.1f} programs/s")
+    print(f"speedup {process_time / batch_time:.2f}x")
+
+
+# ///--------- PARALLEL RUNS -------\\\\\\
+
+# inputs per second of one program of --size / 10 instructions run with
+# one process per input and with --inputs_glob, the program is linked only once
+def benchmark_inputs() -> None:
+    arguments = [f"--engine={args.engine}"]
+    jobs = args.jobs or os.cpu_count()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "inputs.xml")
+        with open(source, "w") as file:
+            file.write(make_program(linked_program(args.size // 10)))
+        os.mkdir(os.path.join(directory, "inputs"))
+        for index in range(args.requests):
+            with open(os.path.join(directory, "inputs", f"{index}.in"), "w") as file:
+                file.write(f"{index}\n")
+
+        start = time.perf_counter()
+        for index in range(args.requests):
+            subprocess.run([args.python, "interpret.py", f"--source={source}",
+                            f"--input={os.path.join(directory, 'inputs', f'{index}.in')}"] + arguments,
+                           stdout=subprocess.DEVNULL, check=False)
+        process_time = time.perf_counter() - start
+
+        def run_inputs(jobs: int) -> float:
+            start = time.perf_counter()
+            subprocess.run([args.python, "interpret.py", f"--source={source}",
+                            f"--inputs_glob={os.path.join(directory, 'inputs', '*.in')}", f"--jobs={jobs}",
+                            f"--output_dir={os.path.join(directory, 'outputs')}"] + arguments,
+                           stdout=subprocess.DEVNULL, check=True)
+            return time.perf_counter() - start
+
+        one_job_time = run_inputs(1)
+        jobs_time = run_inputs(jobs)
+
+    print(f"{BLUE}{'process per input':<40}{BLACK} {args.requests / process_time:10.1f} inputs/s")
+    print(f"{BLUE}{'--inputs_glob --jobs=1':<40}{BLACK} {args.requests / one_job_time:10.1f} inputs/s")
+    print(f"{BLUE}{f'--inputs_glob --jobs={jobs}':<40}{BLACK} {args.requests / jobs_time:10.1f} inputs/s")
+    print(f"speedup {process_time / jobs_time:.2f}x")
+
+
+# ///--------- LOCK STEP -------\\\
+
+# program which reads n and runs a loop of --size / 10 iterations of arithmetic on it,
+# all inputs take the same branches so the lanes are never split
+def lockstep_program(iterations: int) -> list[tuple[str, list[tuple[str, str]]]]:
+    return [
+        ("DEFVAR", [("var", "GF@n")]),
+        ("DEFVAR", [("var", "GF@i")]),
+        ("DEFVAR", [("var", "GF@acc")]),
+        ("DEFVAR", [("var", "GF@tmp")]),
+        ("DEFVAR", [("var", "GF@cond")]),
+        ("READ", [("var", "GF@n"), ("type", "int")]),
+        ("MOVE", [("var", "GF@i"), ("int", "0")]),
+        ("MOVE", [("var", "GF@acc"), ("int", "0")]),
+        ("LABEL", [("label", "loop")]),
+        ("ADD", [("var", "GF@tmp"), ("var", "GF@n"), ("var", "GF@i")]),
+        ("IDIV", [("var", "GF@tmp"), ("var", "GF@tmp"), ("int", "3")]),
+        ("SUB", [("var", "GF@acc"), ("var", "GF@tmp"), ("var", "GF@acc")]),
+        ("ADD", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+        ("LT", [("var", "GF@cond"), ("var", "GF@i"), ("int", str(iterations))]),
+        ("JUMPIFEQ", [("label", "loop"), ("var", "GF@cond"), ("bool", "true")]),
+        ("WRITE", [("var", "GF@acc")]),
+    ]
+
+
+# inputs per second of --inputs_glob in one worker running one input at a time
+# and running --lockstep inputs at once on vectors
+def benchmark_lockstep() -> None:
+    arguments = [f"--engine={args.engine}", "--jobs=1"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "lockstep.xml")
+        with open(source, "w") as file:
+            file.write(make_program(lockstep_program(args.size // 10)))
+        os.mkdir(os.path.join(directory, "inputs"))
+        for index in range(args.requests):
+            with open(os.path.join(directory, "inputs", f"{index}.in"), "w") as file:
+                file.write(f"{index}\n")
+
+        def run_inputs(extra_args: list[str], output_dir: str) -> float:
+            start = time.perf_counter()
+            subprocess.run([args.python, "interpret.py", f"--source={source}",
+                            f"--inputs_glob={os.path.join(directory, 'inputs', '*.in')}",
+                            f"--output_dir={os.path.join(directory, output_dir)}"] + arguments + extra_args,
+                           stdout=subprocess.DEVNULL, check=True)
+            return time.perf_counter() - start
+
+        serial_time = run_inputs([], "serial")
+        lockstep_time = run_inputs([f"--lockstep={args.lockstep}"], "lockstep")
+
+        # both runs have to write the same outputs
+        for index in range(args.requests):
+            with open(os.path.join(directory, "serial", f"{index}.in.out"), "rb") as serial, \
+                    open(os.path.join(directory, "lockstep", f"{index}.in.out"), "rb") as lockstep:
+                if serial.read() != lockstep.read():
+                    print(f"different output of input {index}")
+                    sys.exit(1)
+
+    print(f"{BLUE}{'--inputs_glob --jobs=1':<40}{BLACK} {args.requests / serial_time:10.1f} inputs/s")
+    print(f"{BLUE}{f'--lockstep={args.lockstep} --jobs=1':<40}{BLACK} {args.requests / lockstep_time:10.1f} inputs/s")
+    print(f"speedup {serial_time / lockstep_time:.2f}x")
+
+
+# ///--------- SESSIONS -------\\\
+
+# program which writes back every line it reads until the end of the input
+def echo_program() -> list[tuple[str, list[tuple[str, str]]]]:
+    return [
+        ("DEFVAR", [("var", "GF@line")]),
+        ("DEFVAR", [("var", "GF@type")]),
+        ("LABEL", [("label", "loop")]),
+        ("READ", [("var", "GF@line"), ("type", "string")]),
+        ("TYPE", [("var", "GF@type"), ("var", "GF@line")]),
+        ("JUMPIFEQ", [("label", "end"), ("var", "GF@type"), ("string", "nil")]),
+        ("WRITE", [("var", "GF@line")]),
+        ("WRITE", [("string", "\\010")]),
+        ("JUMP", [("label", "loop")]),
+        ("LABEL", [("label", "end")]),
+    ]
+
+
+# sessions per second of --requests interactive sessions open at once in one event loop,
+# every client waits for the answer to each of its --lines lines before sending the next,
+# compared to one process per session which gets all its lines at once
+def benchmark_sessions() -> None:
+    import asyncio
+    import resource
+    import socket
+    from async_interpreter import run_program
+
+    program = make_program(echo_program()).encode("utf-8")
+    lines = [f"line {index}".encode("utf-8") for index in range(args.lines)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "echo.xml")
+        with open(source, "wb") as file:
+            file.write(program)
+
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            subprocess.run([args.python, "interpret.py", f"--source={source}"], input=b"\n".join(lines) + b"\n",
+                           stdout=subprocess.DEVNULL, check=True)
+        process_time = time.perf_counter() - start
+
+    async def session() -> None:
+        server_socket, client_socket = socket.socketpair()
+        reader, writer = await asyncio.open_connection(sock=server_socket)
+        client_reader, client_writer = await asyncio.open_connection(sock=client_socket)
+        running = asyncio.create_task(run_program(program, reader, writer))
+        for line in lines:
+            client_writer.write(line + b"\n")
+            if await client_reader.readline() != line + b"\n":
+                print("wrong answer of a session")
+                sys.exit(1)
+        client_writer.write_eof()
+        await running
+        writer.close()
+        client_writer.close()
+
+    async def sessions() -> None:
+        await asyncio.gather(*[session() for _ in range(args.requests)])
+
+    start = time.perf_counter()
+    asyncio.run(sessions())
+    sessions_time = time.perf_counter() - start
+
+    print(f"{BLUE}{'process per session':<40}{BLACK} {args.requests / process_time:10.1f} sessions/s")
+    print(f"{BLUE}{f'{args.requests} sessions in one event loop':<40}{BLACK} "
+          f"{args.requests / sessions_time:10.1f} sessions/s")
+    print(f"{BLUE}{'peak memory of the event loop':<40}{BLACK} "
+          f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:10.1f} MB")
+    print(f"speedup {process_time / sessions_time:.2f}x")
+
+
+# ///--------- SCHEDULER -------\\\
+
+# programs per second of --requests tenant programs (loops of --size / 100 iterations)
+# run by one scheduler in one thread compared to one process per program,
+# with the longest wait of a program for its turn and the fairness of the turns
+def benchmark_scheduler() -> None:
+    from scheduler import Scheduler
+
+    program = make_program(lockstep_program(args.size // 100)).encode("utf-8")
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "tenant.xml")
+        with open(source, "wb") as file:
+            file.write(program)
+
+        start = time.perf_counter()
+        for index in range(args.requests):
+            subprocess.run([args.python, "interpret.py", f"--source={source}"], input=f"{index}\n".encode("utf-8"),
+                           stdout=subprocess.DEVNULL, check=True)
+        process_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scheduler = Scheduler(quantum=args.quantum)
+    for index in range(args.requests):
+        scheduler.add(program, f"{index}\n".encode("utf-8"))
+    scheduler.run()
+    scheduler_time = time.perf_counter() - start
+
+    statistics = scheduler.get_statistics()
+    print(f"{BLUE}{'process per program':<40}{BLACK} {args.requests / process_time:10.1f} programs/s")
+    print(f"{BLUE}{f'one scheduler, quantum {args.quantum}':<40}{BLACK} "
+          f"{args.requests / scheduler_time:10.1f} programs/s")
+    print(f"{BLUE}{'longest wait for a turn':<40}{BLACK} {statistics['max_wait'] * 1000:10.1f} ms")
+    print(f"{BLUE}{'fairness index':<40}{BLACK} {statistics['fairness']:10.3f}")
+    print(f"speedup {process_time / scheduler_time:.2f}x")
+
+
+benchmarks = {
+    "output": benchmark_output,
+    "load": benchmark_load,
+    "cache": benchmark_cache,
+    "bytecode": benchmark_bytecode,
+    "startup": benchmark_startup,
+    "serve": benchmark_serve,
+    "batch": benchmark_batch,
+    "inputs": benchmark_inputs,
+    "lockstep": benchmark_lockstep,
+    "sessions": benchmark_sessions,
+    "scheduler": benchmark_scheduler,
+}
+
+benchmarks[args.benchmark]()
@@ -0,0 +1,360 @@
+from input_handler import ArgumentType
+from input_handler import Argument
+from input_handler import instructions_dic
+import instructions as InstructionsClass
+from debug import DEBUG_PRINT
+from error_codes import ErrorCodes
+
+import mmap
+import struct
+import sys
+
+# ///--------- FORMAT -------\\\\\\
+#
+# header
+# string table       length (u32) and utf-8 bytes of every name
+# global names       string index (u32) of the name of every global slot
+# local names        string index (u32) of every LF/TF name
+# label table        string index (u32) and instruction index (u32) of every label
+# constant pool      tag (u8) and the value of every constant
+# code               opcode (u8), order (u32) and kind (u8) and index (u32) of every operand
+#
+# all numbers are little endian, operands of variables are slots, operands
+# of labels are already resolved to instruction indices
+
+BYTECODE_MAGIC = b"IPPC"
+BYTECODE_VERSION = 1
+
+# flags in the header
+# LF and TF frames are slot lists, their operands are slots into the local names
+FLAG_LOCAL_LAYOUT = 1
+
+# magic, version, flags and numbers of strings, global names,
+# local names, labels, constants and instructions
+header_struct = struct.Struct("<4sHHIIIIII")
+u32_struct = struct.Struct("<I")
+label_struct = struct.Struct("<II")
+instruction_struct = struct.Struct("<BI")
+int_struct = struct.Struct("<q")
+float_struct = struct.Struct("<d")
+
+# opcode byte is the position of the instruction in instructions_dic
+opcodes = list(instructions_dic)
+opcode_numbers = {opcode: number for number, opcode in enumerate(opcodes)}
+# all operands of an instruction are read at once
+operands_structs = [struct.Struct("<" + "BI" * len(instructions_dic[opcode])) for opcode in opcodes]
+# None for the opcodes the interpreter doesn't implement
+instruction_classes = [getattr(InstructionsClass, opcode, None) for opcode in opcodes]
+
+# kinds of operands
+OPERAND_GF = 0
+OPERAND_LF = 1
+OPERAND_TF = 2
+OPERAND_CONSTANT = 3
+OPERAND_LABEL = 4
+OPERAND_TYPE = 5
+# operand of LABEL keeps the name of the label
+OPERAND_LABEL_NAME = 6
+
+frame_operands = {"GF": OPERAND_GF, "LF": OPERAND_LF, "TF": OPERAND_TF}
+operand_frames = {operand: frame for frame, operand in frame_operands.items()}
+
+# tags of constants, ints which don't fit to 64 bits are stored as bytes
+CONSTANT_NIL = 0
+CONSTANT_INT = 1
+CONSTANT_BIG_INT = 2
+CONSTANT_BOOL = 3
+CONSTANT_FLOAT = 4
+CONSTANT_STRING = 5
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+# check the first bytes of the source without reading them
+def is_bytecode(source_file) -> bool:
+    peek = getattr(source_file, "peek", None)
+    if peek is None:
+        return False
+
+    return peek(len(BYTECODE_MAGIC))[:len(BYTECODE_MAGIC)] == BYTECODE_MAGIC
+
+
+# ///--------- ASSEMBLER -------\\\\\\
+
+# BytecodeWriter encodes a linked program (Interpreter.get_image)
+# with the "orders" of its instructions
+class BytecodeWriter:
+    def __init__(self):
+        self._strings = {}
+        self._constants = {}
+        self._constant_data = bytearray()
+        self._code = bytearray()
+
+    def _string(self, text: str) -> int:
+        if text not in self._strings:
+            self._strings[text] = len(self._strings)
+        return self._strings[text]
+
+    # equal constants share one entry of the pool, the datatype and repr
+    # keep apart True and 1, 0.0 and -0.0
+    def _constant(self, datatype: str, value) -> int:
+        key = (datatype, repr(value))
+        if key in self._constants:
+            return self._constants[key]
+
+        data = self._constant_data
+        if datatype == "nil":
+            data.append(CONSTANT_NIL)
+        elif datatype == "int" and INT64_MIN <= value <= INT64_MAX:
+            data.append(CONSTANT_INT)
+            data += int_struct.pack(value)
+        elif datatype == "int":
+            encoded = value.to_bytes((value.bit_length() + 8) // 8, "little", signed=True)
+            data.append(CONSTANT_BIG_INT)
+            data += u32_struct.pack(len(encoded)) + encoded
+        elif datatype == "bool":
+            data.append(CONSTANT_BOOL)
+            data.append(value)
+        elif datatype == "float":
+            data.append(CONSTANT_FLOAT)
+            data += float_struct.pack(value)
+        else:
+            encoded = value.encode("utf-8")
+            data.append(CONSTANT_STRING)
+            data += u32_struct.pack(len(encoded)) + encoded
+
+        self._constants[key] = len(self._constants)
+        return self._constants[key]
+
+    def _operand(self, arg: Argument, local_names: dict[str, int]) -> tuple[int, int]:
+        if arg.type_ == ArgumentType.VAR:
+            if arg.frame == "GF" or isinstance(arg.name, int):
+                return frame_operands[arg.frame], arg.name
+
+            # frames without a slot layout, the name gets its index here
+            return frame_operands[arg.frame], local_names.setdefault(arg.name, len(local_names))
+
+        if arg.type_ == ArgumentType.LABEL and isinstance(arg.value, str):
+            return OPERAND_LABEL_NAME, self._string(arg.value)
+
+        if arg.type_ == ArgumentType.LABEL:
+            return OPERAND_LABEL, arg.value
+
+        if arg.type_ == ArgumentType.TYPE:
+            return OPERAND_TYPE, self._string(arg.value)
+
+        return OPERAND_CONSTANT, self._constant(arg.datatype, arg.value)
+
+    def assemble(self, image: dict) -> bytearray:
+        local_slots = image["local_slots"]
+        local_names = dict(local_slots) if local_slots is not None else {}
+
+        for instruction, order in zip(image["instructions"], image["orders"]):
+            operands = []
+            for arg in instruction.args:
+                operands += self._operand(arg, local_names)
+
+            opcode = opcode_numbers[instruction.opcode]
+            self._code += instruction_struct.pack(opcode, order)
+            self._code += operands_structs[opcode].pack(*operands)
+
+        global_names = [self._string(name) for name in image["global_slots"]]
+        local_names = [self._string(name) for name in local_names]
+        labels = [(self._string(name), index) for name, index in image["labels"].items()]
+
+        data = bytearray(header_struct.pack(
+            BYTECODE_MAGIC, BYTECODE_VERSION, FLAG_LOCAL_LAYOUT if local_slots is not None else 0,
+            len(self._strings), len(global_names), len(local_names), len(labels),
+            len(self._constants), len(image["instructions"])))
+
+        for text in self._strings:
+            encoded = text.encode("utf-8")
+            data += u32_struct.pack(len(encoded)) + encoded
+        for index in global_names + local_names:
+            data += u32_struct.pack(index)
+        for label in labels:
+            data += label_struct.pack(*label)
+
+        return data + self._constant_data + self._code
+
+
+# ///--------- LOADER -------\\\\\\
+
+# BytecodeReader turns the encoded program back to a linked program, the data
+# is read through a memoryview of the mapped file without copying it
+class BytecodeReader:
+    def __init__(self, data):
+        self._view = memoryview(data)
+        self._offset = 0
+
+    # map the bytecode file, stdin and pipes are read whole
+    @staticmethod
+    def open(source_file) -> "BytecodeReader":
+        try:
+            data = mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError, AttributeError):
+            data = source_file.read()
+
+        return BytecodeReader(data)
+
+    def _unpack(self, unpacker: struct.Struct) -> tuple:
+        values = unpacker.unpack_from(self._view, self._offset)
+        self._offset += unpacker.size
+        return values
+
+    def _bytes(self, length: int) -> memoryview:
+        if self._offset + length > len(self._view):
+            raise ValueError("Truncated bytecode")
+
+        data = self._view[self._offset:self._offset + length]
+        self._offset += length
+        return data
+
+    def _read_constant(self):
+        tag = self._bytes(1)[0]
+        if tag == CONSTANT_NIL:
+            return "nil", None
+        if tag == CONSTANT_INT:
+            return "int", self._unpack(int_struct)[0]
+        if tag == CONSTANT_BIG_INT:
+            length, = self._unpack(u32_struct)
+            return "int", int.from_bytes(self._bytes(length), "little", signed=True)
+        if tag == CONSTANT_BOOL:
+            return "bool", self._bytes(1)[0] != 0
+        if tag == CONSTANT_FLOAT:
+            return "float", self._unpack(float_struct)[0]
+        if tag == CONSTANT_STRING:
+            length, = self._unpack(u32_struct)
+            return "string", str(self._bytes(length), "utf-8")
+
+        raise ValueError(f"Unknown constant {tag}")
+
+    # return the image for Interpreter with the "orders" of the instructions,
+    # bytecode which can't be decoded is a source which isn't well formed
+    def load(self) -> dict:
+        try:
+            return self._load()
+        except (ValueError, IndexError, KeyError, struct.error) as e:
+            DEBUG_PRINT(f"Bad bytecode {e}")
+            sys.exit(ErrorCodes.InputNotWellFormed)
+        finally:
+            self._view.release()
+
+    def _load(self) -> dict:
+        (magic, version, flags, num_strings, num_globals, num_locals,
+         num_labels, num_constants, num_instructions) = self._unpack(header_struct)
+        if magic != BYTECODE_MAGIC or version != BYTECODE_VERSION:
+            raise ValueError(f"Bad bytecode version {version}")
+
+        strings = []
+        for _ in range(num_strings):
+            length, = self._unpack(u32_struct)
+            strings.append(str(self._bytes(length), "utf-8"))
+
+        global_names = [strings[self._unpack(u32_struct)[0]] for _ in range(num_globals)]
+        local_names = [strings[self._unpack(u32_struct)[0]] for _ in range(num_locals)]
+        labels = {}
+        for _ in range(num_labels):
+            name, index = self._unpack(label_struct)
+            labels[strings[name]] = index
+
+        # constants are never changed so every use shares the same argument
+        constants = []
+        for _ in range(num_constants):
+            datatype, value = self._read_constant()
+            constants.append(Argument(ArgumentType.SYMB, value, datatype=datatype))
+
+        local_layout = flags & FLAG_LOCAL_LAYOUT
+        # linked arguments aren't changed either, every operand is created once
+        arguments = {}
+
+        instructions = []
+        orders = []
+        for _ in range(num_instructions):
+            opcode, order = self._unpack(instruction_struct)
+            operands = self._unpack(operands_structs[opcode])
+
+            args = []
+            for position in range(0, len(operands), 2):
+                operand = operands[position:position + 2]
+                arg = arguments.get(operand)
+                if arg is None:
+                    arg = self._create_argument(*operand, strings, constants, global_names,
+                                                local_names, local_layout)
+                    arguments[operand] = arg
+                args.append(arg)
+
+            instruction_class = instruction_classes[opcode]
+            if instruction_class is None:
+                raise ValueError(f"Unsupported instruction {opcodes[opcode]}")
+            instructions.append(instruction_class(args))
+            orders.append(order)
+
+        return {"instructions": instructions,
+                "labels": labels,
+                "global_slots": {name: slot for slot, name in enumerate(global_names)},
+                "local_slots": {name: slot for slot, name in enumerate(local_names)} if local_layout else None,
+                "orders": orders}
+
+    def _create_argument(self, kind: int, index: int, strings: list[str], constants: list[Argument],
+                         global_names: list[str], local_names: list[str], local_layout: int) -> Argument:
+        if kind == OPERAND_CONSTANT:
+            return constants[index]
+        if kind == OPERAND_LABEL:
+            return Argument(ArgumentType.LABEL, index)
+        if kind == OPERAND_TYPE:
+            return Argument(ArgumentType.TYPE, strings[index])
+        if kind == OPERAND_LABEL_NAME:
+            return Argument(ArgumentType.LABEL, strings[index])
+
+        # variables keep their source text for the error messages of the transpiled program
+        frame = operand_frames[kind]
+        name = global_names[index] if frame == "GF" else local_names[index]
+        arg = Argument(ArgumentType.VAR, f"{frame}@{name}")
+        arg.frame = frame
+        arg.name = index if frame == "GF" or local_layout else name
+        return arg
+
+
+# ///--------- DISASSEMBLER -------\\\\\\
+
+# literal in the source notation, characters which can't
+# be written directly in a string are escape sequences
+def format_constant(datatype: str, value) -> str:
+    if datatype == "nil":
+        return "nil@nil"
+    if datatype == "bool":
+        return "bool@" + ("true" if value else "false")
+    if datatype == "float":
+        return "float@" + value.hex()
+    if datatype == "int":
+        return f"int@{value}"
+
+    return "string@" + "".join(f"\\{ord(char):03d}" if ord(char) <= 32 or char in "#\\" else char
+                               for char in value)
+
+
+# print every instruction with its original order, variables
+# and labels with their names instead of the slots and indices
+def disassemble(image: dict, stream) -> None:
+    global_names = {slot: name for name, slot in image["global_slots"].items()}
+    local_names = {}
+    if image["local_slots"] is not None:
+        local_names = {slot: name for name, slot in image["local_slots"].items()}
+    label_names = {index: name for name, index in image["labels"].items()}
+
+    for instruction, order in zip(image["instructions"], image["orders"]):
+        operands = []
+        for arg in instruction.args:
+            if arg.type_ == ArgumentType.VAR:
+                names = global_names if arg.frame == "GF" else local_names
+                operands.append(f"{arg.frame}@{names.get(arg.name, arg.name)}")
+            elif arg.type_ == ArgumentType.LABEL:
+                operands.append(label_names.get(arg.value, arg.value))
+            elif arg.type_ == ArgumentType.TYPE:
+                operands.append(arg.value)
+            else:
+                operands.append(format_constant(arg.datatype, arg.value))
+
+        print(f"{order:>8}  {instruction.opcode} {' '.join(operands)}".rstrip(), file=stream)
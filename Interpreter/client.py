@@ -0,0 +1,75 @@
+from server import read_message
+from server import write_message
+
+import json
+import os
+import socket
+import subprocess
+import sys
+
+INTERPRET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "interpret.py")
+
+
+# result of one program run by the server
+class Reply:
+    def __init__(self, header: dict, stdout: bytes, stderr: bytes):
+        self.exit_code = header["exit_code"]
+        self.timed_out = header["timed_out"]
+        self.output_truncated = header["output_truncated"]
+        self.stdout = stdout
+        self.stderr = stderr.decode("utf-8")
+
+    def __repr__(self):
+        return f"exit code: {self.exit_code} stdout: {self.stdout!r} stderr: {self.stderr!r}"
+
+
+# InterpreterClient sends programs to a server listening on the Unix socket,
+# without a socket it starts its own server which reads the requests on stdin
+#
+#   with InterpreterClient() as client:
+#       reply = client.run(program, b"input line\n", args=["--engine=closure"])
+class InterpreterClient:
+    def __init__(self, socket_path: str = None, python: str = sys.executable):
+        self._process = None
+        self._socket = None
+        if socket_path is None:
+            self._process = subprocess.Popen([python, INTERPRET_PATH, "--serve"],
+                                             stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self._writer = self._process.stdin
+            self._reader = self._process.stdout
+        else:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(socket_path)
+            self._writer = self._socket.makefile("wb")
+            self._reader = self._socket.makefile("rb")
+
+    # args are the command line arguments of interpret.py without --source and --input,
+    # timeout is in seconds and max_output in bytes
+    def run(self, program: bytes, input_data: bytes = b"", args: list[str] = None,
+            timeout: float = None, max_output: int = None) -> Reply:
+        header = {"args": [] if args is None else args, "timeout": timeout, "max_output": max_output}
+        write_message(self._writer, json.dumps(header).encode("utf-8"))
+        write_message(self._writer, program)
+        write_message(self._writer, input_data)
+        self._writer.flush()
+
+        reply = read_message(self._reader)
+        if reply is None:
+            raise ConnectionError("Server closed the connection")
+        stdout = read_message(self._reader)
+        stderr = read_message(self._reader)
+        return Reply(json.loads(reply), stdout, stderr)
+
+    def close(self) -> None:
+        self._writer.close()
+        self._reader.close()
+        if self._process is not None:
+            self._process.wait()
+        if self._socket is not None:
+            self._socket.close()
+
+    def __enter__(self) -> "InterpreterClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,331 @@
+from input_handler import ArgumentType
+from input_handler import Argument
+from context import ExecutionContext
+from memory import DataType
+from memory import Variable
+import instructions as InstructionsClass
+
+from collections.abc import Callable
+
+
+# names of the Memory methods used by the three address instructions
+# ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+three_address_operations = {
+    "ADD": "add",
+    "SUB": "sub",
+    "MUL": "mul",
+    "IDIV": "idiv",
+    "DIV": "div",
+    "LT": "lt",
+    "GT": "gt",
+    "EQ": "eq",
+    "AND": "and_",
+    "OR": "or_",
+    "CONCAT": "concat",
+    "GETCHAR": "getchar",
+}
+
+# names of the Memory methods used by the stack instructions
+stack_operations = {
+    "ADDS": "add",
+    "SUBS": "sub",
+    "MULS": "mul",
+    "IDIVS": "idiv",
+    "LTS": "lt",
+    "GTS": "gt",
+    "EQS": "eq",
+    "ANDS": "and_",
+    "ORS": "or_",
+}
+
+# instructions which don't do anything at runtime
+nop_instructions = {"LABEL", "DPRINT", "BREAK"}
+
+
+# ClosureCompiler turns every instruction object into a closure
+# with its operands already parsed, each closure returns the index
+# of the next instruction to execute, the closures work with
+# the memory and streams of the context they were compiled for
+class ClosureCompiler:
+    def __init__(self, context: ExecutionContext):
+        self._context = context
+        self._memory = context.memory
+
+    def compile(self, instructions: list[InstructionsClass.Instruction]) -> list[Callable[[], int]]:
+        code = []
+        for index, instruction in enumerate(instructions):
+            opcode = instruction.opcode
+            if opcode in three_address_operations:
+                compile_function = self._compile_three_address
+            elif opcode in stack_operations:
+                compile_function = self._compile_stack_operation
+            elif opcode in nop_instructions:
+                compile_function = self._compile_nop
+            else:
+                compile_function = getattr(self, "_compile_" + opcode, self._compile_generic)
+
+            code.append(compile_function(instruction, index))
+
+        return code
+
+    # (name, frame) of a linked variable, global variables are named by their slot
+    def _var_operand(self, arg: Argument) -> tuple:
+        return arg.name, arg.frame
+
+    # return a function which returns the variable (or constant)
+    # described by the argument, the variable must be initialized
+    def _symbol_loader(self, arg: Argument) -> Callable[[], Variable]:
+        if arg.type_ == ArgumentType.VAR:
+            name, frame = self._var_operand(arg)
+            if frame == "GF":
+                get_set_global_var = self._memory.get_set_global_var
+                return lambda: get_set_global_var(name)
+
+            get_set_var = self._memory.get_set_var
+            return lambda: get_set_var(name, frame)
+
+        constant = Variable("constant")
+        constant.value = arg.value
+        constant.datatype = DataType.convert_to_enum(arg.datatype)
+        return lambda: constant
+
+    # instructions without a specialized closure run their own execute
+    def _compile_generic(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        execute = instruction.execute
+        context = self._context
+        next_index = index + 1
+
+        def run():
+            jump_index = execute(context)
+            return next_index if jump_index is None else jump_index
+
+        return run
+
+    # instructions which do nothing at runtime
+    def _compile_nop(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        next_index = index + 1
+        return lambda: next_index
+
+    # ///--------- FRAMES -------\\\\\\
+
+    def _compile_DEFVAR(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        name, frame = self._var_operand(instruction.args[0])
+        define_var = self._memory.define_var
+        next_index = index + 1
+
+        def run():
+            define_var(name, frame)
+            return next_index
+
+        return run
+
+    def _compile_frame_operation(self, operation: Callable[[], None], index: int) -> Callable[[], int]:
+        next_index = index + 1
+
+        def run():
+            operation()
+            return next_index
+
+        return run
+
+    def _compile_CREATEFRAME(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        return self._compile_frame_operation(self._memory.create_frame, index)
+
+    def _compile_PUSHFRAME(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        return self._compile_frame_operation(self._memory.push_frame, index)
+
+    def _compile_POPFRAME(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        return self._compile_frame_operation(self._memory.pop_frame, index)
+
+    # ///--------- MOVING DATA -------\\\\\\
+
+    def _compile_MOVE(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        dest_arg, source_arg = instruction.args
+        dest_name, dest_frame = self._var_operand(dest_arg)
+        load_source = self._symbol_loader(source_arg)
+        set_var = self._memory.set_var
+        next_index = index + 1
+
+        def run():
+            source = load_source()
+            set_var(dest_name, dest_frame, source.value, source.datatype)
+            return next_index
+
+        return run
+
+    def _compile_PUSHS(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        load_source = self._symbol_loader(instruction.args[0])
+        push = self._memory.push_to_data_stack
+        next_index = index + 1
+
+        def run():
+            source = load_source()
+            push(source.value, source.datatype)
+            return next_index
+
+        return run
+
+    def _compile_POPS(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        dest_name, dest_frame = self._var_operand(instruction.args[0])
+        pop = self._memory.pop_from_data_stack
+        set_var = self._memory.set_var
+        next_index = index + 1
+
+        def run():
+            value, datatype = pop()
+            set_var(dest_name, dest_frame, value, datatype)
+            return next_index
+
+        return run
+
+    def _compile_WRITE(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        load_source = self._symbol_loader(instruction.args[0])
+        write = instruction._write_const
+        context = self._context
+        next_index = index + 1
+
+        def run():
+            source = load_source()
+            write(context.output_stream, source.value, source.datatype)
+            return next_index
+
+        return run
+
+    # ///--------- ARITHMETIC -------\\\\\\
+
+    def _compile_three_address(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        dest_arg, operand1_arg, operand2_arg = instruction.args
+        dest_name, dest_frame = self._var_operand(dest_arg)
+        load_operand1 = self._symbol_loader(operand1_arg)
+        load_operand2 = self._symbol_loader(operand2_arg)
+        set_var = self._memory.set_var
+        operation = getattr(self._memory, three_address_operations[instruction.opcode])
+        next_index = index + 1
+
+        def run():
+            operand1 = load_operand1()
+            operand2 = load_operand2()
+            value, datatype = operation(operand1.value, operand1.datatype, operand2.value, operand2.datatype)
+            set_var(dest_name, dest_frame, value, datatype)
+            return next_index
+
+        return run
+
+    def _compile_unary(self, instruction: InstructionsClass.Instruction, index: int,
+                       operation: Callable) -> Callable[[], int]:
+        dest_arg, operand_arg = instruction.args
+        dest_name, dest_frame = self._var_operand(dest_arg)
+        load_operand = self._symbol_loader(operand_arg)
+        set_var = self._memory.set_var
+        next_index = index + 1
+
+        def run():
+            operand = load_operand()
+            value, datatype = operation(operand.value, operand.datatype)
+            set_var(dest_name, dest_frame, value, datatype)
+            return next_index
+
+        return run
+
+    def _compile_NOT(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        return self._compile_unary(instruction, index, self._memory.not_)
+
+    def _compile_STRLEN(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        return self._compile_unary(instruction, index, self._memory.strlen)
+
+    def _compile_SETCHAR(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        dest_arg, index_arg, char_arg = instruction.args
+        dest_name, dest_frame = self._var_operand(dest_arg)
+        load_index = self._symbol_loader(index_arg)
+        load_char = self._symbol_loader(char_arg)
+        get_set_var = self._memory.get_set_var
+        setchar = self._memory.setchar
+        next_index = index + 1
+
+        def run():
+            index_operand = load_index()
+            char_operand = load_char()
+            var = get_set_var(dest_name, dest_frame)
+            var.value, var.datatype = setchar(var.value, var.datatype, index_operand.value, index_operand.datatype,
+                                              char_operand.value, char_operand.datatype)
+            return next_index
+
+        return run
+
+    def _compile_stack_operation(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        operation = getattr(self._memory, stack_operations[instruction.opcode])
+        stack_operation = self._memory.stack_operation
+        next_index = index + 1
+
+        def run():
+            stack_operation(operation)
+            return next_index
+
+        return run
+
+    # ///--------- CONTROL FLOW -------\\\\\\
+
+    # label operands are already linked to instruction indices
+    def _compile_JUMP(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        jump_index = instruction.args[0].value
+        return lambda: jump_index
+
+    def _compile_conditional_jump(self, instruction: InstructionsClass.Instruction, index: int,
+                                  jump_if_equal: bool) -> Callable[[], int]:
+        label_arg, operand1_arg, operand2_arg = instruction.args
+        jump_index = label_arg.value
+        load_operand1 = self._symbol_loader(operand1_arg)
+        load_operand2 = self._symbol_loader(operand2_arg)
+        equals = self._memory.equals
+        next_index = index + 1
+
+        def run():
+            operand1 = load_operand1()
+            operand2 = load_operand2()
+            if equals(operand1.value, operand1.datatype, operand2.value, operand2.datatype) == jump_if_equal:
+                return jump_index
+            return next_index
+
+        return run
+
+    def _compile_JUMPIFEQ(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        return self._compile_conditional_jump(instruction, index, True)
+
+    def _compile_JUMPIFNEQ(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        return self._compile_conditional_jump(instruction, index, False)
+
+    def _compile_stack_conditional_jump(self, instruction: InstructionsClass.Instruction, index: int,
+                                        jump_if_equal: bool) -> Callable[[], int]:
+        jump_index = instruction.args[0].value
+        pop = self._memory.pop_from_data_stack
+        equals = self._memory.equals
+        next_index = index + 1
+
+        def run():
+            second_value, second_datatype = pop()
+            first_value, first_datatype = pop()
+            if equals(first_value, first_datatype, second_value, second_datatype) == jump_if_equal:
+                return jump_index
+            return next_index
+
+        return run
+
+    def _compile_JUMPIFEQS(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        return self._compile_stack_conditional_jump(instruction, index, True)
+
+    def _compile_JUMPIFNEQS(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        return self._compile_stack_conditional_jump(instruction, index, False)
+
+    def _compile_CALL(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        jump_index = instruction.args[0].value
+        push_to_call_stack = self._memory.push_to_call_stack
+        return_index = index + 1
+
+        def run():
+            push_to_call_stack(return_index)
+            return jump_index
+
+        return run
+
+    def _compile_RETURN(self, instruction: InstructionsClass.Instruction, index: int) -> Callable[[], int]:
+        return self._memory.pop_from_call_stack
@@ -0,0 +1,15 @@
+from memory import Memory
+
+
+# everything one run of a program changes: the frames and stacks in memory,
+# the streams of READ and WRITE and the index of the executed instruction,
+# the instructions and compiled code only get it as an argument, so several
+# programs can run side by side in threads or one after another in one process
+class ExecutionContext:
+    def __init__(self, input_stream: "InputReader" = None, output_stream: "OutputBuffer" = None,
+                 memory: Memory = None):
+        self.memory = Memory() if memory is None else memory
+        self.input_stream = input_stream
+        self.output_stream = output_stream
+        # index of the instruction being executed by the tree engine
+        self.instruction_index = 0
@@ -1,4 +1,6 @@
 class ErrorCodes():
+    OutputFileError = 12
+
     InputNotWellFormed = 31
     InputStructureBad = 32
 
@@ -1,11 +1,14 @@
-import argparse
-from lxml import etree
 from enum import Enum
 from error_codes import ErrorCodes
 from debug import DEBUG_PRINT
-import re
+from operator import itemgetter
+import io
 import sys
 
+# lxml, argparse and re are imported only when they're needed, bytecode
+# and cached programs are run without the XML parser
+etree = None
+
 
 class ArgumentType(Enum):
     LABEL = 1
@@ -28,17 +31,92 @@ class ArgumentType(Enum):
     def __str__(self):
         return self.name
 
+# escape sequence \ddd with the decimal code of a character, compiled with the first escape
+escape_pattern = None
+
+
+# replace the escape sequences in a string literal with the characters
+def decode_escapes(text: str) -> str:
+    if '\\' not in text:
+        return text
+
+    global escape_pattern
+    if escape_pattern is None:
+        import re
+        escape_pattern = re.compile(r'\\([0-9]{3})')
+
+    return escape_pattern.sub(lambda match: chr(int(match.group(1))), text)
+
+
+# convert the text of a literal from the source to a native python value
+# (None for nil), raises ValueError if the literal is malformed
+def decode_literal(datatype: str, text: str):
+    try:
+        if datatype == "int":
+            return int(text)
+
+        if datatype == "float":
+            return float.fromhex(text)
+
+    except (ValueError, TypeError):
+        raise ValueError(f"Bad {datatype} on input")
+
+    if datatype == "bool":
+        if text is None or text.lower() not in ["true", "false"]:
+            raise ValueError("Bad bool on input")
+
+        return text.lower() == "true"
+
+    if datatype == "nil":
+        return None
+
+    # empty string element has no text,
+    # escape sequences are decoded only once here
+    return decode_escapes(text) if text is not None else ""
+
+
+# convert a line read by READ to a native python value,
+# returns None (nil) if it can't be converted
+def decode_input_value(datatype: str, text: str):
+    if len(text) == 0:
+        return None
+
+    if datatype == "string":
+        return text
+
+    if datatype == "bool":
+        return text.lower() == "true"
+
+    try:
+        if datatype == "int":
+            return int(text)
+
+        try:
+            return float.fromhex(text)
+        except ValueError:
+            return float(text)
+
+    except ValueError:
+        return None
+
+
 class Argument:
     def __init__(self, arg_type: ArgumentType, value: str, datatype=None):
         self.type_ = arg_type
         self.value = value
         # only for symbols
         self.datatype = datatype
+        # only for variables, filled in when the program is linked
+        self.frame = None
+        self.name = None
 
     def __repr__(self):
         return f"type: {self.type_} value: {self.value} datatype: {self.datatype}"
 
 
+# position of an argument in the instruction by the tag of its element
+argument_positions = {"arg1": 0, "arg2": 1, "arg3": 2}
+
 # dictionary mappings where key is the name of instruction and
 # value is an array of arguments to that instruction
 # bruh this looks ugly as hell but it does the job (hopefully)
@@ -118,58 +196,20 @@ instructions_dic = {
 
 }
 
+ENGINES = ["tree", "closure", "transpile"]
 
-class InstructionVerify:
-    @staticmethod
-    def verify_instruction(instruction_xml, orders: set) -> bool:
-        order = instruction_xml.get("order")
-        if order is None:
-            DEBUG_PRINT("Missing order of instruction")
-            return False
+# values of the command line options when they aren't given
+default_arguments = {"source": None, "input": None, "help": False, "debug": False, "engine": "tree",
+                     "stats": False, "output": None, "cache": None, "cache_size": None, "serve": None,
+                     "frame_pool": None, "batch": None, "results": None, "inputs_glob": None,
+                     "jobs": None, "output_dir": ".", "lockstep": None}
 
-        try:
-            order = int(order)
-        except:
-            DEBUG_PRINT("Wrong order of instruction")
-            exit(ErrorCodes.InputStructureBad)
-
-        # checks whether order is correct, must be greater
-        # than zero and in the correct order
-        if order <= 0 or order in orders:
-            DEBUG_PRINT("Wrong order of instruction")
-            return False
-
-        orders.add(order)
-        opcode = instruction_xml.get("opcode")
-        # check for missing opcode
-        if opcode is None:
-            DEBUG_PRINT("Missing opcode")
-            return False
-
-        # check for wrong(unknown) opcode
-        if opcode.upper() not in instructions_dic:
-            DEBUG_PRINT("Wrong opcode")
-            return False
-
-        # get all children of instruction
-        expected_num_args = len(instructions_dic[opcode.upper()])
-        arg_numbers = set()
-        for index, child in enumerate(instruction_xml.iterchildren()):
-            # check if arg matches arg<digit> using regex
-            if not re.match(r"arg[0-9]+", child.tag) or int(child.tag[3:]) in arg_numbers:
-                DEBUG_PRINT(f"Failed to verify arguments {child.tag}")
-                return False
-            
-            arg_numbers.add(int(child.tag[3:]))
+# options of a run of one program, a command line with only these written
+# as --name=value (and --stats) is parsed without argparse, which imports
+# re, gettext and shutil, every other command line goes through argparse
+fast_options = {"--source": str, "--input": str, "--engine": str, "--output": str,
+                "--cache": str, "--cache_size": int, "--frame_pool": int}
 
-        # check if it matches the numbers
-        if not all([x in arg_numbers for x in range(1, expected_num_args + 1)]):
-            DEBUG_PRINT("Missing argument or wrong order")
-            return False
-
-        return len(arg_numbers) == expected_num_args
-
-       
 
 class InputHandler:
     def __init__(self):
@@ -177,9 +217,84 @@ class InputHandler:
         self.source_file = None
         self.input_file = None
         self.instruction_orders = set()
+        # (order, [opcode, arguments]) of the loaded instructions
+        self.instructions = []
         DEBUG = False
 
-    def parse_arguments(self):
+    # argv is sys.argv without the program name by default
+    def parse_arguments(self, argv: list[str] = None):
+        if argv is None:
+            argv = sys.argv[1:]
+
+        parser = None
+        cmd_args = self._parse_fast_arguments(argv)
+        if cmd_args is None:
+            parser = self._argument_parser()
+            cmd_args = parser.parse_args(argv)
+
+        if cmd_args.help:
+            # help can't be combined with any other arguments
+            if cmd_args.source is not None or cmd_args.input is not None:
+                DEBUG_PRINT("Can't combine help with other arguments")
+                sys.exit(10)
+
+            parser.print_help()
+            sys.exit(0)
+
+        # at least one of these two must be present, the server gets the programs
+        # in requests, the batch from its manifest and --inputs_glob its inputs
+        if cmd_args.source is None and cmd_args.input is None and cmd_args.serve is None \
+                and cmd_args.batch is None and cmd_args.inputs_glob is None:
+            DEBUG_PRINT("Missing one parameter")
+            sys.exit(10)
+
+        self.args["source_file_parameter"] = cmd_args.source
+        self.args["input_file_parameter"] = cmd_args.input
+        self.args["engine"] = cmd_args.engine
+        self.args["stats"] = cmd_args.stats
+        self.args["frame_pool"] = cmd_args.frame_pool
+        self.args["output"] = cmd_args.output
+        self.args["cache"] = cmd_args.cache
+        self.args["cache_size"] = cmd_args.cache_size
+        self.args["serve"] = cmd_args.serve
+        self.args["batch"] = cmd_args.batch
+        self.args["results"] = cmd_args.results
+        self.args["inputs_glob"] = cmd_args.inputs_glob
+        self.args["jobs"] = cmd_args.jobs
+        self.args["output_dir"] = cmd_args.output_dir
+        self.args["lockstep"] = cmd_args.lockstep
+
+        # DEBUG_PRINT(f"{self.args['source_file_parameter']=}")
+        # DEBUG_PRINT(f"{self.args['input_file_parameter']=}")
+
+    # the arguments of a plain run of one program or None if argparse is needed
+    def _parse_fast_arguments(self, argv: list[str]):
+        import types
+
+        values = dict(default_arguments)
+        for argument in argv:
+            if argument == "--stats":
+                values["stats"] = True
+                continue
+
+            name, equals, value = argument.partition("=")
+            convert = fast_options.get(name)
+            if convert is None or not equals:
+                return None
+            try:
+                values[name[2:]] = convert(value)
+            except ValueError:
+                return None
+
+        # argparse reports the bad ones
+        if values["engine"] not in ENGINES or (values["source"] is None and values["input"] is None):
+            return None
+
+        return types.SimpleNamespace(**values)
+
+    def _argument_parser(self):
+        import argparse
+
         parser = argparse.ArgumentParser(add_help=False,
                                          prog="input_handler.py",
                                          description="Handle command line \
@@ -195,46 +310,74 @@ class InputHandler:
         parser.add_argument("--debug", "--d", action="store_true",
                             help="Enable debug mode")
 
-        # help message is generated automatically
+        parser.add_argument("--engine", type=str, default="tree",
+                            choices=ENGINES,
+                            help="Select the execution engine")
 
-        cmd_args = parser.parse_args()
+        parser.add_argument("--stats", action="store_true",
+                            help="Print runtime statistics to stderr on exit")
 
-        if cmd_args.help:
-            # help can't be combined with any other arguments
-            if cmd_args.source is not None or cmd_args.input is not None:
-                DEBUG_PRINT("Can't combine help with other arguments")
-                exit(10)
+        parser.add_argument("--output", type=str, help="Specify output file")
 
-            parser.print_help()
-            exit(0)
+        parser.add_argument("--cache", type=str,
+                            help="Directory of the compiled program cache (default $IPP_CACHE_DIR)")
 
-        # at least one of these two must be present
-        if cmd_args.source is None and cmd_args.input is None:
-            DEBUG_PRINT("Missing one parameter")
-            exit(10)
+        parser.add_argument("--cache_size", type=int, default=None,
+                            help="Size limit of the compiled program cache in MB")
 
-        self.args["source_file_parameter"] = cmd_args.source
-        self.args["input_file_parameter"] = cmd_args.input
+        parser.add_argument("--serve", nargs="?", const="-", default=None, metavar="SOCKET",
+                            help="Run programs sent to the Unix socket (stdin and stdout without SOCKET)")
 
-        # DEBUG_PRINT(f"{self.args['source_file_parameter']=}")
-        # DEBUG_PRINT(f"{self.args['input_file_parameter']=}")
+        parser.add_argument("--frame_pool", type=int, default=None,
+                            help="Number of discarded frames kept for reuse (0 disables the pool)")
+
+        parser.add_argument("--batch", type=str, default=None, metavar="MANIFEST",
+                            help="Run all programs listed in the manifest in one process")
+
+        parser.add_argument("--results", type=str, default=None,
+                            help="File of the --batch or --inputs_glob results (default stdout)")
+
+        parser.add_argument("--inputs_glob", "--inputs-glob", type=str, default=None, metavar="PATTERN",
+                            help="Run the program for every input file matching the pattern")
 
-    # open file and return its contents as string
-    def load_file(self, file_name: str) -> str:
+        parser.add_argument("--jobs", type=int, default=None,
+                            help="Number of worker processes of --inputs_glob (default number of CPUs)")
+
+        parser.add_argument("--output_dir", type=str, default=".",
+                            help="Directory of the outputs of --inputs_glob")
+
+        parser.add_argument("--lockstep", type=int, default=None, metavar="K",
+                            help="Run --inputs_glob K inputs at a time on NumPy vectors (experimental)")
+
+        # help message is generated automatically
+
+        return parser
+
+    # options which change how a program runs, without the files and the modes,
+    # for running other programs the same way
+    def run_options(self) -> list[str]:
+        options = [f"--engine={self.args['engine']}"]
+        if self.args["stats"]:
+            options.append("--stats")
+        for name in ["frame_pool", "cache", "cache_size"]:
+            if self.args[name] is not None:
+                options.append(f"--{name}={self.args[name]}")
+
+        return options
+
+    # open the source file for the streaming parser
+    def open_source(self, file_name: str):
         try:
-            file = open(file_name)
-            file_content = file.read()
-            file.close()
-            return file_content
+            return open(file_name, "rb")
 
         # catch an exception when opening file
         except Exception as e:
             print(e)
             DEBUG_PRINT(f"Error when opening input file {e=} {file_name=}")
-            exit(11)
+            sys.exit(11)
 
-    # load input to self.source_file and self.input_file
-    # throw appropriate error if a problem is encountered
+    # set self.source_file to the stream the program is parsed from
+    # and self.input_file, throw appropriate error if a problem is encountered
     def parse_input(self):
         if self.args["input_file_parameter"] is not None:
             self.input_file = self.args["input_file_parameter"]
@@ -243,72 +386,133 @@ class InputHandler:
             self.input_file = "stdin"
 
         if self.args["source_file_parameter"] is not None:
-            self.source_file = self.load_file(
+            self.source_file = self.open_source(
                     self.args["source_file_parameter"])
         else:
-            lines = sys.stdin.readlines()
-            lines = "\n".join(lines)
-            self.source_file = lines
-
-    # convert source file to xml
-    def convert_source(self):
+            self.source_file = sys.stdin.buffer
+
+    # read the whole source for the program cache, the program is then
+    # parsed from the bytes which were read, bytecode is still recognised
+    def read_source(self) -> bytes:
+        source = self.source_file.read()
+        self.source_file = io.BufferedReader(io.BytesIO(source))
+        return source
+
+    # parse the source as a stream of elements, every instruction is verified
+    # and converted as soon as its end tag is read and then removed from the tree,
+    # so only the converted instructions are kept in memory
+    def load_program(self):
+        global etree
+        from lxml import etree
+
+        self.instructions = []
+        # structure errors are reported only after the whole source
+        # is parsed, a source which isn't well formed is error 31
+        structure_error = False
         try:
-            self.source_file = etree.fromstring(self.source_file.encode())
+            # only the end of <instruction> elements is reported by the parser
+            parser = etree.iterparse(self.source_file, events=("end",), tag="instruction", huge_tree=True)
+            for _, element in parser:
+                program = element.getparent()
+                # <instruction> must be directly in the top level element
+                if program is None or program.getparent() is not None:
+                    DEBUG_PRINT("Instruction outside of <program>")
+                    structure_error = True
+                elif not structure_error:
+                    structure_error = not self._load_instruction(element)
+
+                # drop everything before the instruction, the previous instruction
+                # was already loaded, any other element is a structure error
+                element.clear()
+                while element.getprevious() is not None:
+                    if isinstance(program[0].tag, str) and program[0].tag != "instruction":
+                        DEBUG_PRINT("Other element than instruction found in <program>")
+                        structure_error = True
+                    del program[0]
+
+            root = parser.root
+
         except Exception as e:
-            DEBUG_PRINT(f"Exception {e} when reading source file {self.source_file}")
+            DEBUG_PRINT(f"Exception {e} when reading source file")
+            sys.exit(ErrorCodes.InputNotWellFormed)
+
+        if root.tag != "program":
+            DEBUG_PRINT("Missing program top level element")
+            structure_error = True
+
+        # elements after the last instruction
+        if any(isinstance(child.tag, str) and child.tag != "instruction" for child in root):
+            DEBUG_PRINT("Other element than instruction found in <program>")
+            structure_error = True
+
+        if structure_error:
+            sys.exit(ErrorCodes.InputStructureBad)
+
+    # verify the instruction element and convert it to (order, [opcode, [arg1, arg2, ...]])
+    # in one pass, returns False on a structure error or a bad literal,
+    # the rest of the source is still checked for error 31
+    def _load_instruction(self, element) -> bool:
+        order = element.get("order")
+        opcode = element.get("opcode")
+        if order is None or opcode is None:
+            DEBUG_PRINT("Missing order or opcode of instruction")
+            return False
+
+        try:
+            order = int(order)
+        except ValueError:
+            DEBUG_PRINT("Wrong order of instruction")
+            return False
 
-            exit(ErrorCodes.InputNotWellFormed)
+        # order must be greater than zero and unique
+        if order <= 0 or order in self.instruction_orders:
+            DEBUG_PRINT("Wrong order of instruction")
+            return False
 
-    # verify the correct structure of xml, error ErrorCodes.InputStructureBad
-    def verify_structure(self):
-        # check if there is any other element than program
-        top_elements = self.source_file.xpath("/*")
-        if len(list(top_elements)) != 1 or top_elements[0].tag != "program":
-            DEBUG_PRINT("Missing program or more than one top level elements")
-            exit(ErrorCodes.InputStructureBad)
+        self.instruction_orders.add(order)
 
-        for element in self.source_file.xpath("/program/*"):
-            if element.tag != "instruction":
-                DEBUG_PRINT("Other element than instruction found in <program>")
-                exit(ErrorCodes.InputStructureBad)
+        opcode = opcode.upper()
+        expected_args = instructions_dic.get(opcode)
+        if expected_args is None:
+            DEBUG_PRINT("Wrong opcode")
+            return False
 
-            # could've chosen a better name but whatever
-            if not InstructionVerify.verify_instruction(
-                    element, self.instruction_orders):
+        # arguments are put straight to their position
+        arguments = [None] * len(expected_args)
+        for child in element.iterchildren(tag=etree.Element):
+            position = argument_positions.get(child.tag)
+            if position is None or position >= len(arguments) or arguments[position] is not None:
+                DEBUG_PRINT(f"Failed to verify arguments {child.tag}")
+                return False
+
+            try:
+                arguments[position] = self._convert_argument(child)
+            except ValueError as e:
+                DEBUG_PRINT(str(e))
+                return False
 
-                DEBUG_PRINT("Failed to verify instruction" + str(etree.tostring(element)))
+        if any(argument is None for argument in arguments):
+            DEBUG_PRINT("Missing argument")
+            return False
 
-                exit(ErrorCodes.InputStructureBad)
-            # print(etree.tostring(element))
+        self.instructions.append((order, [opcode, arguments]))
+        return True
 
+    # convert <argN> element to Argument, literals are decoded
+    def _convert_argument(self, element) -> Argument:
+        datatype = element.get("type")
+        arg_type = ArgumentType.convert_to_enum(datatype)
+        if arg_type == ArgumentType.SYMB:
+            return Argument(arg_type, decode_literal(datatype, element.text), datatype=datatype)
 
+        return Argument(arg_type, element.text)
 
-    # return the instruction in the format
+    # return the instructions in the format
     # [opcode, [arg1, arg2, ...]]
     def get_instructions(self) -> list[str, list[Argument]]:
-        instructions = []
-        for instruction in self.source_file.xpath("/program/*"):
-            opcode = instruction.get("opcode").upper()
-            arguments = []
-            for argument in instruction.iterchildren():
-                arg_type = ArgumentType.convert_to_enum(argument.get("type"))
-                arg_value = argument.text
-                argument_order = int(argument.tag[3])
-                if arg_type == ArgumentType.SYMB:
-                    argument = Argument(arg_type, arg_value, datatype=argument.get("type"))
-                else:
-                    argument = Argument(arg_type, arg_value)
-
-                arguments.append([argument, argument_order])
-
-            instruction_order = int(instruction.get("order"))
-
-            arguments.sort(key=lambda x: x[1]) 
-            arguments = [x[0] for x in arguments]
-            instructions.append([instruction_order, opcode, arguments])
-
-        instructions.sort(key=lambda x: x[0])
-        
+        # orders are unique so only the orders are compared
+        self.instructions.sort(key=itemgetter(0))
+
         # return just the opcode and arguments
-        return [x[1:] for x in instructions], self.input_file
+        return [instruction for _, instruction in self.instructions], self.input_file
 
@@ -0,0 +1,148 @@
+from input_handler import decode_input_value
+
+import abc
+import mmap
+import sys
+
+# number of bytes read from stdin at once
+INPUT_CHUNK_SIZE = 1024 * 1024
+
+
+# convert a line of input to a native python value, int and bool
+# are converted straight from the bytes, returns None (nil) if it can't be converted
+def decode_input_line(datatype: str, line) -> object:
+    if len(line) == 0:
+        return None
+
+    if datatype == "int":
+        try:
+            return int(line)
+        except ValueError:
+            return None
+
+    if datatype == "bool":
+        return bytes(line).lower() == b"true"
+
+    return decode_input_value(datatype, str(line, "utf-8", "replace"))
+
+
+# InputReader serves the lines for READ, already converted to the requested type,
+# empty or missing input is nil (None)
+class InputReader(abc.ABC):
+    # memory map the --input file, read stdin in chunks if there's no file
+    @staticmethod
+    def open(file_name: str = None) -> "InputReader":
+        if file_name is None:
+            return ChunkedInputReader(sys.stdin.buffer)
+
+        file = open(file_name, "rb")
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # empty files and pipes can't be mapped
+            return ChunkedInputReader(file)
+
+        # the mapping stays valid without the file
+        file.close()
+        return MappedInputReader(data)
+
+    @abc.abstractmethod
+    def _next_line(self):
+        """ Return the next line without the line ending
+            or None at the end of the input
+            """
+        pass
+
+    def read(self, datatype: str):
+        line = self._next_line()
+        if line is None:
+            return None
+
+        return decode_input_line(datatype, line)
+
+
+# lines of a mapped file are slices of the mapping, the offsets
+# of all line endings are found before the first READ
+class MappedInputReader(InputReader):
+    def __init__(self, data: mmap.mmap):
+        self._data = data
+        self._view = memoryview(data)
+        self._line_ends = self._index_lines(data)
+        self._line = 0
+        self._line_start = 0
+
+    @staticmethod
+    def _index_lines(data: mmap.mmap) -> list[int]:
+        line_ends = []
+        end = data.find(b"\n")
+        while end != -1:
+            line_ends.append(end)
+            end = data.find(b"\n", end + 1)
+
+        # last line without a line ending
+        if len(data) and (not line_ends or line_ends[-1] != len(data) - 1):
+            line_ends.append(len(data))
+
+        return line_ends
+
+    def _next_line(self):
+        if self._line >= len(self._line_ends):
+            return None
+
+        start = self._line_start
+        end = self._line_ends[self._line]
+        self._line += 1
+        self._line_start = end + 1
+
+        if end > start and self._data[end - 1] == ord("\r"):
+            end -= 1
+        return self._view[start:end]
+
+
+# stdin is read in big chunks, a line is returned as soon as
+# its line ending was read so interactive input still works
+class ChunkedInputReader(InputReader):
+    def __init__(self, stream):
+        self._stream = stream
+        self._buffer = bytearray()
+        self._position = 0
+        self._eof = False
+
+    # read more input, returns False at the end of the input
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+
+        # drop the lines which were already read
+        del self._buffer[:self._position]
+        self._position = 0
+
+        read = getattr(self._stream, "read1", self._stream.read)
+        chunk = read(INPUT_CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+
+        self._buffer += chunk
+        return True
+
+    def _next_line(self):
+        end = self._buffer.find(b"\n", self._position)
+        while end == -1:
+            # only the new chunk has to be searched
+            searched = len(self._buffer) - self._position
+            if not self._fill():
+                break
+            end = self._buffer.find(b"\n", searched)
+
+        start = self._position
+        if end == -1:
+            # last line without a line ending
+            if start >= len(self._buffer):
+                return None
+            end = len(self._buffer)
+
+        self._position = end + 1
+        if end > start and self._buffer[end - 1] == ord("\r"):
+            end -= 1
+        return bytes(self._buffer[start:end])
@@ -3,83 +3,85 @@ from input_handler import Argument
 from input_handler import instructions_dic
 from debug import DEBUG_PRINT
 from error_codes import ErrorCodes
-from typing import Callable
-from memory import Memory
-
 from memory import DataType
 from memory import Variable
 
-import re
 import abc
-
-memory = Memory()
+import sys
 
 
+# instructions keep only their operands, everything they change
+# is in the ExecutionContext given to execute
 class Instruction(abc.ABC):
-    instruction_index_callback: Callable[[], int]
-    input_stream: "Input"
     def __init__(self, opcode: str, args: list[Argument]):
         self.opcode = opcode
         self._args = args
         self.check_argument_types()
 
-    # i don't know if this is necessary but whatever
+    @property
+    def args(self) -> list[Argument]:
+        return self._args
+
+    # literals are already decoded by the input handler,
+    # only the kinds of the arguments are checked here
     def check_argument_types(self):
         for arg, expected_type in zip(self._args, instructions_dic[self.opcode]):
-            if arg.datatype == "int":
-                try:
-                    int(arg.value)
-                except Exception as e:
-                    DEBUG_PRINT("Bad int on input")
-
-                    exit(ErrorCodes.InputStructureBad)
-
-            if arg.datatype == "float":
-                try:
-                    float.fromhex(arg.value)
-                except Exception as e:
-                    DEBUG_PRINT("Bad float on input")
-                    exit(ErrorCodes.InputStructureBad)
-
-            if arg.datatype == "bool":
-                if not arg.value.lower() in ["true", "false"]:
-                    DEBUG_PRINT("Bad bool on input")
-                    exit(ErrorCodes.InputStructureBad)
-            
             if expected_type == ArgumentType.SYMB:
                 if arg.type_ in [ArgumentType.SYMB, ArgumentType.VAR]:
                     continue
 
             if not arg.type_ == expected_type:
                 DEBUG_PRINT("Not good type ")
-                exit(ErrorCodes.InputStructureBad)
+                sys.exit(ErrorCodes.InputStructureBad)
 
     @abc.abstractmethod
-    def execute(self) -> None:
+    def execute(self, context: "ExecutionContext") -> None:
         """ Each instruction must implement
             its own execute function
             """
         pass
 
-    def get_frame_from_arg_value(self, var: str) -> str:
-        return var.split('@')[0]
-
-    def get_name_from_arg_value(self, var: str) -> str:
-        return var.split('@')[1]
-    
-    def push_var_to_stack(self, arg, memory) -> None:
+    # replace label operands with the index of the LABEL they point to
+    # so the jumps don't have to look the label up on every execution
+    def link_labels(self, labels_indeces: dict[str, int]) -> None:
+        for arg in self._args:
+            if arg.type_ != ArgumentType.LABEL:
+                continue
+
+            if arg.value not in labels_indeces:
+                DEBUG_PRINT(f"Label {arg.value} doesn't exist")
+                sys.exit(ErrorCodes.InputSemanticsBad)
+
+            arg.value = labels_indeces[arg.value]
+
+    # split variable operands into frame and name once, global variables
+    # are addressed by their slot in the global frame instead of the name,
+    # local and temporary ones too if the frames have a slot layout
+    def link_variables(self, global_slots: dict[str, int], local_slots: dict[str, int] = None) -> None:
+        for arg in self._args:
+            if arg.type_ != ArgumentType.VAR:
+                continue
+
+            arg.frame, arg.name = arg.value.split('@', 1)
+            if arg.frame == "GF":
+                arg.name = global_slots[arg.name]
+            elif local_slots is not None:
+                arg.name = local_slots[arg.name]
+
+    # return (value, datatype) of a variable or a constant,
+    # exit with error if the variable isn't initialized
+    def get_symbol(self, arg: Argument, memory) -> tuple:
         if arg.type_ == ArgumentType.VAR:
-            name = self.get_name_from_arg_value(arg.value)
-            frame = self.get_frame_from_arg_value(arg.value)
-            var = memory.get_var(name, frame)
-            memory.push_to_data_stack(var.value, var.datatype)
-        else:
-            memory.push_to_data_stack(arg.value, DataType.convert_to_enum(arg.datatype))
+            name, frame = self.get_var_from_arg(arg)
+            var = memory.get_set_var(name, frame)
+            return var.value, var.datatype
 
-    def get_var_from_arg(self, arg: Argument) -> tuple[str, str]:
-        name = self.get_name_from_arg_value(arg.value)
-        frame = self.get_frame_from_arg_value(arg.value)
-        return name, frame
+        return arg.value, DataType.convert_to_enum(arg.datatype)
+
+    # (name, frame) of a linked variable operand, the name of
+    # a variable in a slot frame is its slot index
+    def get_var_from_arg(self, arg: Argument) -> tuple:
+        return arg.name, arg.frame
 
     def __repr__(self):
         return f"{str(type(self))}, {self._args}"
@@ -89,10 +91,9 @@ class DEFVAR(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        frame = self.get_frame_from_arg_value(self._args[0].value)
-        name = self.get_name_from_arg_value(self._args[0].value)
-        memory.define_var(name, frame)
+    def execute(self, context):
+        name, frame = self.get_var_from_arg(self._args[0])
+        context.memory.define_var(name, frame)
 
 #////---------- INSTRUCTIONS RELATED TO FRAMES ----------//// 
 
@@ -100,37 +101,37 @@ class CREATEFRAME(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        memory.create_frame()
+    def execute(self, context):
+        context.memory.create_frame()
 
 class PUSHFRAME(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        memory.push_frame()
+    def execute(self, context):
+        context.memory.push_frame()
 
 class POPFRAME(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        memory.pop_frame()
+    def execute(self, context):
+        context.memory.pop_frame()
 
 #////---------- INSTRUCTIONS RELATED TO THE DATA STACK ----------////
 class PUSHS(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
+        memory = context.memory
         arg = self._args[0]
         value = arg.value
 
         # if it's a variable
         if arg.type_ == ArgumentType.VAR:
-            name = self.get_name_from_arg_value(arg.value)
-            frame = self.get_frame_from_arg_value(arg.value)
-            var = memory.get_var(name, frame)
+            name, frame = self.get_var_from_arg(arg)
+            var = memory.get_set_var(name, frame)
             memory.push_to_data_stack(var.value, var.datatype)
 
         # it's a constant
@@ -144,12 +145,12 @@ class POPS(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
+        memory = context.memory
         arg = self._args[0]
-        name = self.get_name_from_arg_value(arg.value)
-        frame = self.get_frame_from_arg_value(arg.value)
-        popped = memory.pop_from_data_stack()
-        memory.set_var(name, frame, popped.value, popped.datatype)
+        name, frame = self.get_var_from_arg(arg)
+        value, datatype = memory.pop_from_data_stack()
+        memory.set_var(name, frame, value, datatype)
 
 
 # MOVE ⟨var⟩ ⟨symb⟩
@@ -157,13 +158,14 @@ class MOVE(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
+        memory = context.memory
         dest_arg, source_arg  = self._args
         dest_name, dest_frame = self.get_var_from_arg(dest_arg)
 
         if source_arg.type_ == ArgumentType.VAR:
             source_name, source_frame = self.get_var_from_arg(source_arg)
-            var = memory.get_var(source_name, source_frame)
+            var = memory.get_set_var(source_name, source_frame)
             memory.set_var(dest_name, dest_frame, var.value, var.datatype)
 
         else:
@@ -177,24 +179,23 @@ class READ(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
+        memory = context.memory
         var_arg = self._args[0]
         type_arg = self._args[1]
         if type_arg.value not in ["string", "int", "bool", "float"]:
             DEBUG_PRINT("Bad type on input")
-            exit(ErrorCodes.InputStructureBad)
+            sys.exit(ErrorCodes.InputStructureBad)
         
-        var_name = self.get_name_from_arg_value(var_arg.value)
-        var_frame = self.get_frame_from_arg_value(var_arg.value)
+        var_name, var_frame = self.get_var_from_arg(var_arg)
         var = memory.get_var(var_name, var_frame)
 
         
-        value = Instruction.input_stream.readline().strip('\n')
-        if len(value) == 0:
-            memory.set_var(var_name, var_frame, value, DataType.TYPE_NIL)
+        value = context.input_stream.read(type_arg.value)
+        # missing or malformed input is nil@nil
+        if value is None:
+            memory.set_var(var_name, var_frame, None, DataType.TYPE_NIL)
             return
-            # special case nil@nil
-        
 
         memory.set_var(var_name, var_frame, value, DataType.convert_to_enum(type_arg.value))
 
@@ -204,62 +205,57 @@ class WRITE(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    # find any escaped sequences and convert them to ascii
-    def _convert_to_ascii(self, string: str) -> str:
-        pattern = r'\\[0-9]{3}'
-        new_string = string
-        new_string = re.sub(pattern, lambda m: chr(int(m.group(0)[1:])), new_string)
-        new_string = new_string.replace('\\', '')
+    # values are native, they are converted to text only here
+    def _write_const(self, output_stream: "OutputBuffer", value, datatype: DataType):
+        if datatype is None:
+            DEBUG_PRINT("WRITE uninitialized variable")
+            sys.exit(ErrorCodes.MissingValue)
 
-        return new_string
-
-
-    def _write_const(self, value: str, datatype: DataType):
-        # print(f"Printing this value: _{value}_")
         if datatype == DataType.TYPE_NIL:
-            print(end='')
+            return
 
         elif datatype == DataType.TYPE_INT:
-            if '.' in value:
-                print(int(float(value)), end='')
+            output_stream.write(str(value))
+
+        elif datatype == DataType.TYPE_BOOL:
+            output_stream.write("true" if value else "false")
 
-            else:
-                print(int(value), end='')
         elif datatype == DataType.TYPE_FLOAT:
-            print(float.hex(float.fromhex(value)), end='')
+            output_stream.write(float.hex(value))
         else:
-            print_value = self._convert_to_ascii(value)
-            if len(print_value):
-                print(print_value, end='')
+            # escape sequences are decoded when the program is loaded
+            output_stream.write(value)
 
-    def execute(self):
+    def execute(self, context):
         arg = self._args[0]
         if arg.type_ == ArgumentType.VAR:
-            name = self.get_name_from_arg_value(arg.value)
-            frame = self.get_frame_from_arg_value(arg.value)
-            var = memory.get_var(name, frame)
-            self._write_const(var.value, var.datatype)
+            name, frame = self.get_var_from_arg(arg)
+            var = context.memory.get_var(name, frame)
+            self._write_const(context.output_stream, var.value, var.datatype)
         else:
             value = arg.value
             datatype = DataType.convert_to_enum(arg.datatype)
-            self._write_const(value, datatype)
+            self._write_const(context.output_stream, value, datatype)
 
 
 class ArithmeticInstruction(Instruction):
     def __init__(self, opcode: str, args: list[Argument]):
         super().__init__(opcode, args)
 
-    def execute(self, function_name):
-        source_arg, operand1_arg, operand2_arg = self._args
-        self.push_var_to_stack(operand1_arg, memory)
-        self.push_var_to_stack(operand2_arg, memory)
+    # operands are read straight from the variables or constants
+    # and the result is stored in the destination, the data stack isn't used
+    def execute(self, context, function_name):
+        memory = context.memory
+        dest_arg, operand1_arg, operand2_arg = self._args
+        operand1_value, operand1_datatype = self.get_symbol(operand1_arg, memory)
+        operand2_value, operand2_datatype = self.get_symbol(operand2_arg, memory)
 
         # find the method name dynamically
-        source_name, source_frame = self.get_var_from_arg(source_arg)
-
-
         callback = getattr(memory, function_name)
-        callback(source_name, source_frame)
+        value, datatype = callback(operand1_value, operand1_datatype, operand2_value, operand2_datatype)
+
+        dest_name, dest_frame = self.get_var_from_arg(dest_arg)
+        memory.set_var(dest_name, dest_frame, value, datatype)
 
 
 # ADD ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
@@ -267,8 +263,8 @@ class ADD(ArithmeticInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("add")
+    def execute(self, context):
+        super().execute(context, "add")
 
 
  # SUB ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
@@ -276,32 +272,32 @@ class SUB(ArithmeticInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("sub")
+    def execute(self, context):
+        super().execute(context, "sub")
 
 # MUL ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
 class MUL(ArithmeticInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("mul")
+    def execute(self, context):
+        super().execute(context, "mul")
 
 # IDIV ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
 class IDIV(ArithmeticInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("idiv")
+    def execute(self, context):
+        super().execute(context, "idiv")
 
 # DIV ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
 class DIV(ArithmeticInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("div")
+    def execute(self, context):
+        super().execute(context, "div")
 
 
 
@@ -310,16 +306,16 @@ class LT(ArithmeticInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("lt")
+    def execute(self, context):
+        super().execute(context, "lt")
 
 # GT ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
 class GT(ArithmeticInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("gt")
+    def execute(self, context):
+        super().execute(context, "gt")
 
 
 # EQ ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
@@ -327,8 +323,8 @@ class EQ(ArithmeticInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("eq")
+    def execute(self, context):
+        super().execute(context, "eq")
 
 
 # AND ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
@@ -336,82 +332,82 @@ class AND(ArithmeticInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("and_")
+    def execute(self, context):
+        super().execute(context, "and_")
 
 # OR ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
 class OR(ArithmeticInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("or_")
+    def execute(self, context):
+        super().execute(context, "or_")
 
 # NOT ⟨var⟩ ⟨symb1⟩
 class NOT(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        source_arg, operand1_arg= self._args
-        source_name = self.get_name_from_arg_value(source_arg.value)
-        source_frame = self.get_frame_from_arg_value(source_arg.value)
+    def execute(self, context):
+        memory = context.memory
+        dest_arg, operand_arg = self._args
+        value, datatype = memory.not_(*self.get_symbol(operand_arg, memory))
 
-        self.push_var_to_stack(operand1_arg, memory)
-        memory.not_(source_name, source_frame)
+        dest_name, dest_frame = self.get_var_from_arg(dest_arg)
+        memory.set_var(dest_name, dest_frame, value, datatype)
 
 
 class ArithmeticStackInstruction(Instruction):
     def __init__(self, opcode: str, args: list[Argument]):
         super().__init__(opcode, args)
 
-    def execute(self, function_name):
+    def execute(self, context, function_name):
+        memory = context.memory
         callback = getattr(memory, function_name)
-        # we don't need to pass any variable to store the result to
-        callback("", "", stack_only=True)
+        memory.stack_operation(callback)
 
 class ADDS(ArithmeticStackInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("add")
+    def execute(self, context):
+        super().execute(context, "add")
 
 class SUBS(ArithmeticStackInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("sub")
+    def execute(self, context):
+        super().execute(context, "sub")
 
 class MULS(ArithmeticStackInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("mul")
+    def execute(self, context):
+        super().execute(context, "mul")
 
 class IDIVS(ArithmeticStackInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("idiv")
+    def execute(self, context):
+        super().execute(context, "idiv")
 
 class LTS(ArithmeticStackInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("lt")
+    def execute(self, context):
+        super().execute(context, "lt")
 
 # GT ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
 class GTS(ArithmeticStackInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("gt")
+    def execute(self, context):
+        super().execute(context, "gt")
 
 
 # EQ ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
@@ -419,30 +415,31 @@ class EQS(ArithmeticStackInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("eq")
+    def execute(self, context):
+        super().execute(context, "eq")
 
 
 class ANDS(ArithmeticStackInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("and_")
+    def execute(self, context):
+        super().execute(context, "and_")
 
 class ORS(ArithmeticStackInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("or_")
+    def execute(self, context):
+        super().execute(context, "or_")
 
 class NOTS(ArithmeticStackInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("not_")
+    def execute(self, context):
+        memory = context.memory
+        memory.stack_unary_operation(memory.not_)
 
 
 
@@ -452,25 +449,26 @@ class TYPE(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
+        memory = context.memory
         var_arg = self._args[0]
         symb_arg = self._args[1]
 
-        var_name = self.get_name_from_arg_value(var_arg.value)
-        var_frame = self.get_frame_from_arg_value(var_arg.value)
-        var = memory.get_var(var_name, var_frame)
+        var_name, var_frame = self.get_var_from_arg(var_arg)
 
         if symb_arg.type_ == ArgumentType.VAR:
-            symb_name = self.get_name_from_arg_value(var_arg.value)
-            symb_frame = self.get_frame_from_arg_value(var_arg.value)
+            symb_name, symb_frame = self.get_var_from_arg(symb_arg)
             symb_var = memory.get_var(symb_name, symb_frame)
-            if symb_var.datatype == None:
-                var.value = ""
+            # uninitialized variable has empty type
+            if symb_var.datatype is None:
+                type_name = ""
             else:
-                memory.set_var(DataType.convert_to_string(symb_var.datatype, DataType.TYPE_STRING))
+                type_name = DataType.convert_to_string(symb_var.datatype)
 
         else:
-            var.value = symb_arg.datatype
+            type_name = symb_arg.datatype
+
+        memory.set_var(var_name, var_frame, type_name, DataType.TYPE_STRING)
 
 class ConvertInstruction(Instruction):
     def __init__(self, opcode: str, args: list[Argument]):
@@ -487,33 +485,48 @@ class ConvertInstruction(Instruction):
         memory.check_var_set(source_name, source_frame)
 
 
-    def _convert_to_chr(self, value: str) -> chr:
+    # return value of the source operand, exit with error if it's not the expected type
+    def _get_source_value(self, memory, source_arg: Argument, expected_datatype: DataType):
+        if source_arg.type_ == ArgumentType.VAR:
+            source_name, source_frame = self.get_var_from_arg(source_arg)
+            source_var = memory.get_set_var(source_name, source_frame)
+            value, datatype = source_var.value, source_var.datatype
+        else:
+            value, datatype = source_arg.value, DataType.convert_to_enum(source_arg.datatype)
+
+        if datatype != expected_datatype:
+            DEBUG_PRINT(f"{self.opcode} bad type")
+            sys.exit(ErrorCodes.OperandTypeBad)
+
+        return value
+
+    def _convert_to_chr(self, value: int) -> chr:
         try: 
             return chr(int(value))
         except:
             DEBUG_PRINT("Failed to convert int to chr")
-            exit(ErrorCodes.StringError)
+            sys.exit(ErrorCodes.StringError)
 
-    def _convert_string_to_int(self, value: str) -> chr:
+    def _convert_string_to_int(self, value: str) -> int:
         try:
-            return str(ord(value))
+            return ord(value)
         except:
             DEBUG_PRINT("Failed to convert chr to int")
-            exit(ErrorCodes.StringError)
+            sys.exit(ErrorCodes.StringError)
 
-    def _convert_float_to_int(self, value: str) -> int:
+    def _convert_float_to_int(self, value: float) -> int:
         try:
-            return int(float.fromhex(value))
+            return int(value)
         except:
             DEBUG_PRINT("Failed to convert float to int")
-            exit(ErrorCodes.OperandTypeBad)
+            sys.exit(ErrorCodes.OperandTypeBad)
 
-    def _convert_int_to_float(self, value: str) -> int:
+    def _convert_int_to_float(self, value: int) -> float:
         try:
-            return float.hex(float(value))
+            return float(value)
         except:
             DEBUG_PRINT("Failed to convert int to float")
-            exit(ErrorCodes.OperandTypeBad)
+            sys.exit(ErrorCodes.OperandTypeBad)
 
 
 
@@ -522,22 +535,15 @@ class INT2CHAR(ConvertInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
+        memory = context.memory
         self.check_vars_exist(memory)
         dest_arg = self._args[0]
         source_arg = self._args[1]
         dest_name, dest_frame = self.get_var_from_arg(dest_arg)
 
-        if source_arg.type_ == ArgumentType.VAR:
-            source_name, source_frame = self.get_var_from_arg(source_arg)
-            source_var = memory.get_var(source_name, source_frame)
-            if source_var.datatype != DataType.TYPE_INT:
-                DEBUG_PRINT("INT2CHAR bad type")
-                exit(ErrorCodes.OperandTypeBad)
-            new_value = self._convert_to_chr(source_var.value)
-        else:
-            new_value = self._convert_to_chr(source_arg.value)
-
+        source_value = self._get_source_value(memory, source_arg, DataType.TYPE_INT)
+        new_value = self._convert_to_chr(source_value)
 
         memory.set_var(dest_name, dest_frame, new_value, DataType.TYPE_STRING)
 
@@ -546,7 +552,8 @@ class INT2FLOAT(ConvertInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
+        memory = context.memory
         self.check_vars_exist(memory)
 
         dest_arg = self._args[0]
@@ -554,18 +561,9 @@ class INT2FLOAT(ConvertInstruction):
 
         dest_name, dest_frame = self.get_var_from_arg(dest_arg)
 
-        if source_arg.type_ == ArgumentType.VAR:
-            source_name, source_frame = self.get_var_from_arg(source_arg)
-            source_var = memory.get_var(source_name, source_frame)
-            if source_var.datatype != DataType.TYPE_INT:
-                DEBUG_PRINT("INT2CHAR bad type")
-                exit(ErrorCodes.OperandTypeBad)
-
-            new_value = self._convert_int_to_float(source_var.value)
-        else:
-            new_value = self._convert_int_to_float(source_arg.value)
+        source_value = self._get_source_value(memory, source_arg, DataType.TYPE_INT)
+        new_value = self._convert_int_to_float(source_value)
 
-        
         memory.set_var(dest_name, dest_frame, new_value, DataType.TYPE_FLOAT)
 
 
@@ -574,26 +572,18 @@ class FLOAT2INT(ConvertInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
+        memory = context.memory
         self.check_vars_exist(memory)
 
         dest_arg = self._args[0]
         source_arg = self._args[1]
         dest_name, dest_frame = self.get_var_from_arg(dest_arg)
 
-        if source_arg.type_ == ArgumentType.VAR:
-            source_name, source_frame = self.get_var_from_arg(source_arg)
-            source_var = memory.get_var(source_name, source_frame)
-            if source_var.datatype != DataType.TYPE_FLOAT:
-                DEBUG_PRINT("INT2CHAR bad type")
-                exit(ErrorCodes.OperandTypeBad)
-
-            new_value = self._convert_float_to_int(source_var.value)
-        else:
-            new_value = self._convert_float_to_int(source_arg.value)
+        source_value = self._get_source_value(memory, source_arg, DataType.TYPE_FLOAT)
+        new_value = self._convert_float_to_int(source_value)
 
-
-        memory.set_var(dest_name, dest_frame, str(new_value), DataType.TYPE_INT)
+        memory.set_var(dest_name, dest_frame, new_value, DataType.TYPE_INT)
 
 
 # INT2CHARS
@@ -601,13 +591,14 @@ class INT2CHARS(ConvertInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        var = memory.pop_from_data_stack()
-        if var.datatype != DataType.TYPE_INT:
+    def execute(self, context):
+        memory = context.memory
+        value, datatype = memory.pop_from_data_stack()
+        if datatype != DataType.TYPE_INT:
             DEBUG_PRINT("INT2CHARS bad type")
-            exit(ErrorCodes.OperandTypeBad)
+            sys.exit(ErrorCodes.OperandTypeBad)
 
-        value = self._convert_to_chr(var.value)
+        value = self._convert_to_chr(value)
         memory.push_to_data_stack(value, DataType.TYPE_STRING)
 
 # STR2INT ⟨var⟩ ⟨symb⟩
@@ -615,17 +606,18 @@ class STRI2INT(ConvertInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
+        memory = context.memory
         dest_arg, source_arg, index_arg = self._args
         dest_name, dest_frame = self.get_var_from_arg(dest_arg)
 
         if source_arg.type_ == ArgumentType.VAR:
             source_name, source_frame = self.get_var_from_arg(source_arg)
 
-            source_var = memory.get_var(source_name, source_frame)
+            source_var = memory.get_set_var(source_name, source_frame)
             if source_var.datatype != DataType.TYPE_STRING:
                 DEBUG_PRINT("STRI2INT bad source type")
-                exit(ErrorCodes.OperandTypeBad)
+                sys.exit(ErrorCodes.OperandTypeBad)
 
             source_value = source_var.value
         else:
@@ -633,20 +625,20 @@ class STRI2INT(ConvertInstruction):
 
         if index_arg.type_ == ArgumentType.VAR:
             index_name, index_frame = self.get_var_from_arg(index_arg)
-            index_var = memory.get_var(index_name, index_frame)
+            index_var = memory.get_set_var(index_name, index_frame)
             if index_var.datatype != DataType.TYPE_INT:
                 DEBUG_PRINT("STRI2INT bad index type")
-                exit(ErrorCodes.OperandTypeBad)
+                sys.exit(ErrorCodes.OperandTypeBad)
 
-            index_value = int(index_var.value)
+            index_value = index_var.value
         else:
-            index_value = int(index_arg.value)
+            index_value = index_arg.value
 
         if index_value < 0 or index_value >= len(source_value):
             DEBUG_PRINT("Out of bounds index")
-            exit(ErrorCodes.StringError)
+            sys.exit(ErrorCodes.StringError)
 
-        converted = self.convert_string_to_int(source_value[index_value])
+        converted = self._convert_string_to_int(source_value[index_value])
         memory.set_var(dest_name, dest_frame, converted, DataType.TYPE_INT)
 
 
@@ -655,23 +647,24 @@ class STRI2INTS(ConvertInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        index_var = memory.pop_from_data_stack()
-        source_var = memory.pop_from_data_stack()
+    def execute(self, context):
+        memory = context.memory
+        index, index_datatype = memory.pop_from_data_stack()
+        source, source_datatype = memory.pop_from_data_stack()
 
-        if source_var.datatype != DataType.TYPE_STRING:
+        if source_datatype != DataType.TYPE_STRING:
             DEBUG_PRINT("STR2INTS bad source type")
-            exit(ErrorCodes.OperandTypeBad)
+            sys.exit(ErrorCodes.OperandTypeBad)
 
-        if index_var.datatype != DataType.TYPE_INT:
+        if index_datatype != DataType.TYPE_INT:
             DEBUG_PRINT("STR2INTS bad index type")
-            exit(ErrorCodes.OperandTypeBad)
+            sys.exit(ErrorCodes.OperandTypeBad)
 
-        if int(index_var.value) <0 or (int(index_var.value) >= len(source_var.value)):
+        if index < 0 or index >= len(source):
             DEBUG_PRINT("Out of bounds index")
-            exit(ErrorCodes.StringError)
+            sys.exit(ErrorCodes.StringError)
 
-        converted = self._convert_string_to_int(source_var.value[int(index_var.value)])
+        converted = self._convert_string_to_int(source[index])
         memory.push_to_data_stack(converted, DataType.TYPE_INT)
 
 
@@ -680,45 +673,59 @@ class CONCAT(ArithmeticInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("concat")
+    def execute(self, context):
+        super().execute(context, "concat")
 
 # STRLEN ⟨var⟩ ⟨symb⟩
-class STRLEN(ArithmeticInstruction):
+class STRLEN(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("strlen")
+    def execute(self, context):
+        memory = context.memory
+        dest_arg, operand_arg = self._args
+        value, datatype = memory.strlen(*self.get_symbol(operand_arg, memory))
+
+        dest_name, dest_frame = self.get_var_from_arg(dest_arg)
+        memory.set_var(dest_name, dest_frame, value, datatype)
 
 # GETCHAR ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
 class GETCHAR(ArithmeticInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("getchar")
+    def execute(self, context):
+        super().execute(context, "getchar")
 
 # SETCHAR ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-class SETCHAR(ArithmeticInstruction):
+# the string which is changed is the value of the variable itself
+class SETCHAR(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        super().execute("setchar")
+    def execute(self, context):
+        memory = context.memory
+        dest_arg, index_arg, char_arg = self._args
+        index_value, index_datatype = self.get_symbol(index_arg, memory)
+        char_value, char_datatype = self.get_symbol(char_arg, memory)
+
+        dest_name, dest_frame = self.get_var_from_arg(dest_arg)
+        var = memory.get_set_var(dest_name, dest_frame)
+        var.value, var.datatype = memory.setchar(var.value, var.datatype, index_value, index_datatype,
+                                                 char_value, char_datatype)
 
 class DPRINT(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
         pass
 
 class BREAK(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
         pass
 
 # JUMP
@@ -726,25 +733,26 @@ class JUMP(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
         arg = self._args[0]
         return arg.value
 
-temp_var_index = 0
-
 class JumpInstruction(Instruction):
     def __init__(self, opcode: str, args: list[Argument]):
         super().__init__(opcode, args)
 
-    def _push_var(self, memory):
-        global temp_var_index
+    # compare both symbols of JUMPIFEQ/JUMPIFNEQ directly
+    def _operands_equal(self, memory) -> bool:
         label_arg, first_arg, second_arg = self._args
+        first_value, first_datatype = self.get_symbol(first_arg, memory)
+        second_value, second_datatype = self.get_symbol(second_arg, memory)
+        return memory.equals(first_value, first_datatype, second_value, second_datatype)
 
-        self.push_var_to_stack(first_arg, memory)
-        self.push_var_to_stack(second_arg, memory)
-
-        # put the temporary memory in Global frame
-        memory.define_var("<temp_result>" + str(temp_var_index), "GF")
+    # compare the two values on top of the data stack
+    def _stack_operands_equal(self, memory) -> bool:
+        second_value, second_datatype = memory.pop_from_data_stack()
+        first_value, first_datatype = memory.pop_from_data_stack()
+        return memory.equals(first_value, first_datatype, second_value, second_datatype)
 
 
 # JUMPIFEQ
@@ -752,63 +760,35 @@ class JUMPIFEQ(JumpInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        global temp_var_index
-        label_arg = self._args[0]
-        self._push_var(memory)     
-
-        memory.eq("<temp_result>" + str(temp_var_index), "GF")
-        result = memory.get_var("<temp_result>" + str(temp_var_index), "GF")
-        temp_var_index += 1
-        if result.value == "true":
-            return label_arg.value
+    def execute(self, context):
+        if self._operands_equal(context.memory):
+            return self._args[0].value
 
 
-# JUMPIFEQ
+# JUMPIFNEQ
 class JUMPIFNEQ(JumpInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        label_arg = self._args[0]
-        global temp_var_index
-        self._push_var(memory)
-        memory.eq("<temp_result>" + str(temp_var_index), "GF")
-
-        result = memory.get_var("<temp_result>" + str(temp_var_index), "GF")
-
-        temp_var_index += 1
-        if result.value == "false":
-            return label_arg.value
+    def execute(self, context):
+        if not self._operands_equal(context.memory):
+            return self._args[0].value
 
 class JUMPIFEQS(JumpInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        label_arg = self._args[0]
-        global temp_var_index
-
-        memory.define_var("<temp_result>" + str(temp_var_index), "GF")
-        memory.eq("<temp_result>" + str(temp_var_index), "GF")
-        result = memory.get_var("<temp_result>" + str(temp_var_index), "GF")
-        temp_var_index += 1
-        if result.value == "true":
-            return label_arg.value
+    def execute(self, context):
+        if self._stack_operands_equal(context.memory):
+            return self._args[0].value
 
 class JUMPIFNEQS(JumpInstruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        label_arg = self._args[0]
-        global temp_var_index
-        memory.define_var("<temp_result>" + str(temp_var_index), "GF")
-        memory.eq("<temp_result>" + str(temp_var_index), "GF")
-        result = memory.get_var("<temp_result>" + str(temp_var_index), "GF")
-        temp_var_index += 1
-        if result.value == "false":
-            return label_arg.value
+    def execute(self, context):
+        if not self._stack_operands_equal(context.memory):
+            return self._args[0].value
 
 
 
@@ -817,7 +797,11 @@ class LABEL(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    # label itself is not a jump target reference
+    def link_labels(self, labels_indeces: dict[str, int]) -> None:
+        pass
+
+    def execute(self, context):
         pass
 
 # CALL <label>
@@ -825,10 +809,9 @@ class CALL(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
         label_arg = self._args[0]
-        cur_index = Instruction.instruction_index_callback()
-        memory.push_to_call_stack(cur_index + 1)
+        context.memory.push_to_call_stack(context.instruction_index + 1)
         return label_arg.value
 
 # RETURN
@@ -836,8 +819,8 @@ class RETURN(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        index = memory.pop_from_call_stack()
+    def execute(self, context):
+        index = context.memory.pop_from_call_stack()
         return index
 
 # EXIT <symb>
@@ -845,48 +828,39 @@ class EXIT(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
+    def execute(self, context):
         arg = self._args[0]
         if arg.type_ == ArgumentType.VAR:
-            name = self.get_name_from_arg_value(arg.value)
-            frame = self.get_frame_from_arg_value(arg.value)
-            var = memory.get_var(name, frame)
+            name, frame = self.get_var_from_arg(arg)
+            var = context.memory.get_set_var(name, frame)
             if var.datatype != DataType.TYPE_INT:
                 # TODO nie som si isty
                 DEBUG_PRINT("Exit bad operand 1")
-                exit(ErrorCodes.OperandValueBad)
+                sys.exit(ErrorCodes.OperandValueBad)
 
-            try:
-                x = int(var.value)
-            except:
-                DEBUG_PRINT("Exit bad operand 2")
-                exit(ErrorCodes.OperandValueBad)
+            x = var.value
 
             if x >= 0 and x <= 49:
-                exit(x)
+                sys.exit(x)
             else:
                 DEBUG_PRINT("Exit bad operand 3")
-                exit(ErrorCodes.OperandValueBad)
+                sys.exit(ErrorCodes.OperandValueBad)
 
         if arg.datatype != "int":
             DEBUG_PRINT("Exit bad operand 4")
-            exit(ErrorCodes.OperandValueBad)
+            sys.exit(ErrorCodes.OperandValueBad)
 
-        try:
-            x = int(arg.value)
-        except Exception as e:
-            DEBUG_PRINT("Exit bad operand 5")
-            exit(ErrorCodes.OperandValueBad)
+        x = arg.value
 
         if x >= 0 and x <= 49:
-            exit(x)
+            sys.exit(x)
         else:
             DEBUG_PRINT("Exit bad operand 6")
-            exit(ErrorCodes.OperandValueBad)
+            sys.exit(ErrorCodes.OperandValueBad)
 
 class CLEARS(Instruction):
     def __init__(self, args: list[Argument]):
         super().__init__(self.__class__.__name__, args)
 
-    def execute(self):
-        memory.clear_data_stack()
+    def execute(self, context):
+        context.memory.clear_data_stack()
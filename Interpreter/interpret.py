@@ -1,92 +1,119 @@
 from input_handler import InputHandler
-from input_handler import Argument
-from memory import Memory
-import instructions as InstructionsClass
-from debug import DEBUG_PRINT
-from error_codes import ErrorCodes
-
+from interpreter import Interpreter
+from context import ExecutionContext
+from input_reader import InputReader
+from output import OutputBuffer
+from program_cache import ProgramCache
+from program_cache import MemoryProgramCache
+from bytecode import BytecodeReader
+from bytecode import is_bytecode
+
+import gc
 import sys
 
 
-# the interpreter gets list of lines from input handler
-class Interpreter:
-    def __init__(self, instructions_raw: list[str, list[Argument]]):
-        self._instruction_index = 0
-        self._instructions = []
-        self._labels_indeces = {}
-        self._create_labels(instructions_raw)
-        self._create_instructions(instructions_raw)
-        InstructionsClass.Instruction.instruction_index_callback = self.get_instruction_index
-        # [print(x) for x in self._instructions]
-
-    
-    def get_instruction_index(self) -> int:
-        return self._instruction_index
-
-    def _create_labels(self, instructions_raw: list[str, list[Argument]]) -> None:
-        for index, (opcode, args) in enumerate(instructions_raw):
-            if opcode == "LABEL":
-                # duplicate label
-                if args[0].value in self._labels_indeces:
-                    DEBUG_PRINT("Duplicate label")
-                    exit(ErrorCodes.InputSemanticsBad)
-
-                self._labels_indeces[args[0].value] = index
-
-
-    # created _instructions list of instruction objects
-    # based on opcode string and arguments
-    def _create_instructions(self,
-                            instructions_raw: list[str, list[Argument]]) -> None:
-
-        for opcode, args in instructions_raw:
-            # dynamically create instruction object based on opcode string
-            instruction_obj = getattr(InstructionsClass, opcode)(args)
-            self._instructions.append(instruction_obj)
-
-    def execute_instructions(self) -> None:
-        self._instruction_index = 0
-        while self._instruction_index < len(self._instructions):
-            label = self._instructions[self._instruction_index].execute()
-            if label is None:
-                self._instruction_index += 1
-                continue
-
-            if type(label) == str:
-                if label not in self._labels_indeces:
-                    DEBUG_PRINT("Label doesn't exist")
-                    exit(ErrorCodes.InputSemanticsBad)
-
-                self._instruction_index = self._labels_indeces[label]
-
-            elif type(label) == int:
-                self._instruction_index = label
-            else:
-                # this should never happen
-                print(type(label))
-                print("DFDSFSFDSAFASFADSFSF neni dobre")
-
-
-    def print_instructions(self):
-        for instruction in self._instructions:
-            print(instruction)
-
-
-inpt = InputHandler()
-inpt.parse_arguments()
-inpt.parse_input()
-inpt.convert_source()
-inpt.verify_structure()
-
-memory = Memory()
-instructions, input_file = inpt.get_instructions()
-if input_file == "stdin":
-    input_stream = sys.stdin
-else:
-    input_stream = open(input_file, 'r')
-
-InstructionsClass.Instruction.input_stream = input_stream
-interpreter = Interpreter(instructions)
-interpreter.execute_instructions() 
-
-exit(0)
+# the linked program from inpt.source_file, bytecode from ippc.py is already linked,
+# a program which was already run is loaded linked from the memory of this process
+# (memory_cache of a process running many programs) or from the cache
+def load_image(inpt: InputHandler, memory_cache: MemoryProgramCache = None) -> dict:
+    bytecode = is_bytecode(inpt.source_file)
+    cache = None if bytecode else ProgramCache.open(inpt.args["cache"], inpt.args["cache_size"])
+    cache_key = None
+    image = None
+    if cache is not None or memory_cache is not None:
+        cache_key = ProgramCache.key(inpt.read_source())
+        if memory_cache is not None:
+            image = memory_cache.load(cache_key)
+            if image is not None:
+                return image
+
+        if cache is not None:
+            image = cache.load(cache_key)
+
+    if image is None and bytecode:
+        image = BytecodeReader.open(inpt.source_file).load()
+
+    if image is None:
+        inpt.load_program()
+        instructions, _ = inpt.get_instructions()
+        image = Interpreter(instructions).get_image()
+        if cache is not None:
+            cache.store(cache_key, image)
+
+    if memory_cache is not None:
+        memory_cache.store(cache_key, image)
+    return image
+
+
+# load and run the program from inpt.source_file with the arguments in inpt.args,
+# READ and WRITE use the streams from the command line if none are given,
+# errors and EXIT leave through SystemExit
+def run_program(inpt: InputHandler, input_stream: InputReader = None, output_stream: OutputBuffer = None,
+                memory_cache: MemoryProgramCache = None, image: dict = None) -> int:
+    if image is None:
+        image = load_image(inpt, memory_cache)
+
+    # READ gets its lines from a mapped --input file or from stdin read in chunks
+    if input_stream is None:
+        input_stream = InputReader.open(None if inpt.input_file == "stdin" else inpt.input_file)
+    # WRITE goes to a buffer, it's written out at EXIT, at the end of the program
+    # and on errors because all of them leave through sys.exit()
+    # the --output file is closed at the end, the streams of the callers stay open
+    opened_output = output_stream is None
+    if opened_output:
+        output_stream = OutputBuffer.open(inpt.args["output"])
+
+    # every run has its own frames and stacks, nothing is shared with
+    # other programs run by the same process
+    context = ExecutionContext(input_stream, output_stream)
+    if inpt.args["frame_pool"] is not None:
+        context.memory.set_frame_pool_cap(inpt.args["frame_pool"])
+
+    interpreter = None
+    try:
+        interpreter = Interpreter(None, engine=inpt.args["engine"], image=image, context=context)
+        interpreter.execute_instructions()
+
+    # EXIT ends the program with sys.exit(), so the statistics are printed on the way out
+    finally:
+        if inpt.args["stats"] and interpreter is not None:
+            interpreter.print_statistics()
+        if opened_output:
+            output_stream.close()
+        else:
+            output_stream.flush()
+
+    return 0
+
+
+# run the interpreter with the command line arguments (sys.argv without
+# the program name by default), errors and EXIT leave through SystemExit
+def main(argv: list[str] = None) -> int:
+    inpt = InputHandler()
+    inpt.parse_arguments(argv)
+    if inpt.args["serve"] is not None:
+        from server import serve
+        return serve(inpt.args["serve"])
+    if inpt.args["batch"] is not None:
+        from batch import run_batch
+        return run_batch(inpt.args["batch"], inpt.args["results"], inpt.run_options())
+
+    inpt.parse_input()
+    if inpt.args["inputs_glob"] is not None:
+        from parallel import run_inputs
+        return run_inputs(inpt)
+
+    # the collector is set up only here where the process runs one program,
+    # loading and running don't change it for processes and threads running many:
+    # loading only creates objects, the collector would walk all of them again
+    # and again as the program grows, and the linked program lives until
+    # the end, so the collector doesn't go through it during the run and at the exit
+    gc.disable()
+    image = load_image(inpt)
+    gc.freeze()
+    gc.enable()
+    return run_program(inpt, image=image)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+from input_handler import Argument
+from input_handler import ArgumentType
+from context import ExecutionContext
+import instructions as InstructionsClass
+from debug import DEBUG_PRINT
+from error_codes import ErrorCodes
+
+import sys
+
+
+# the biggest number of LF/TF variable names for which the frames are slot lists
+MAX_LOCAL_SLOTS = 64
+
+
+# the interpreter gets list of lines from input handler
+class Interpreter:
+    # image is a linked program from get_image, the instructions aren't needed then,
+    # the program runs in the given context or in a new one without streams
+    def __init__(self, instructions_raw: list[str, list[Argument]], engine: str = "tree", image: dict = None,
+                 context: ExecutionContext = None):
+        self._context = ExecutionContext() if context is None else context
+        self._instructions = []
+        self._labels_indeces = {}
+        # slot in the global frame for every global variable name
+        self._global_slots = {}
+        # slot in the local and temporary frames for every LF/TF variable name,
+        # None if the frames stay dicts
+        self._local_slots = None
+        # list of closures when running with the closure engine
+        self._code = None
+        # python function when running with the transpile engine
+        self._program = None
+        if image is None:
+            self._create_labels(instructions_raw)
+            self._create_global_slots(instructions_raw)
+            self._create_local_slots(instructions_raw)
+            self._create_instructions(instructions_raw)
+            self._link_labels()
+            self._link_variables()
+        else:
+            self._restore_image(image)
+
+        memory = self._context.memory
+        memory.set_global_layout(list(self._global_slots))
+        if self._local_slots is not None:
+            memory.set_local_layout(list(self._local_slots))
+
+        # the engines are imported only when they're used
+        if engine == "closure":
+            from compiler import ClosureCompiler
+            self._code = ClosureCompiler(self._context).compile(self._instructions)
+        elif engine == "transpile":
+            from transpiler import Transpiler
+            self._program = Transpiler(self._instructions).compile()
+        # [print(x) for x in self._instructions]
+
+    @property
+    def context(self) -> ExecutionContext:
+        return self._context
+
+    def get_instruction_index(self) -> int:
+        return self._context.instruction_index
+
+    def _create_labels(self, instructions_raw: list[str, list[Argument]]) -> None:
+        for index, (opcode, args) in enumerate(instructions_raw):
+            if opcode == "LABEL":
+                # duplicate label
+                if args[0].value in self._labels_indeces:
+                    DEBUG_PRINT("Duplicate label")
+                    sys.exit(ErrorCodes.InputSemanticsBad)
+
+                self._labels_indeces[args[0].value] = index
+
+
+    # give every global variable a slot, the variables defined by DEFVAR
+    # come first, global variables which are only used get a slot too
+    # so using them fails with undefined variable at runtime
+    def _create_global_slots(self, instructions_raw: list[str, list[Argument]]) -> None:
+        defined = []
+        used = []
+        for opcode, args in instructions_raw:
+            for arg in args:
+                if arg.type_ != ArgumentType.VAR or not arg.value.startswith("GF@"):
+                    continue
+
+                (defined if opcode == "DEFVAR" else used).append(arg.value[3:])
+
+        for name in defined + used:
+            if name not in self._global_slots:
+                self._global_slots[name] = len(self._global_slots)
+
+    # every frame gets a slot for every LF/TF name in the program because
+    # a temporary frame becomes the local frame of any function it's pushed for,
+    # programs with too many names keep the dict frames to make CREATEFRAME cheap
+    def _create_local_slots(self, instructions_raw: list[str, list[Argument]]) -> None:
+        local_slots = {}
+        for _, args in instructions_raw:
+            for arg in args:
+                if arg.type_ != ArgumentType.VAR or arg.value.startswith("GF@"):
+                    continue
+
+                name = arg.value[3:]
+                if name not in local_slots:
+                    local_slots[name] = len(local_slots)
+
+        if len(local_slots) > MAX_LOCAL_SLOTS:
+            return
+
+        self._local_slots = local_slots
+
+    # created _instructions list of instruction objects
+    # based on opcode string and arguments
+    def _create_instructions(self,
+                            instructions_raw: list[str, list[Argument]]) -> None:
+
+        for opcode, args in instructions_raw:
+            # dynamically create instruction object based on opcode string
+            instruction_obj = getattr(InstructionsClass, opcode)(args)
+            self._instructions.append(instruction_obj)
+
+    # rewrite every label operand to the index of its instruction
+    # undefined labels are reported here, before anything is executed
+    def _link_labels(self) -> None:
+        for instruction in self._instructions:
+            instruction.link_labels(self._labels_indeces)
+
+    # split variable operands and resolve global variables to their slots
+    def _link_variables(self) -> None:
+        for instruction in self._instructions:
+            instruction.link_variables(self._global_slots, self._local_slots)
+
+    # the linked program which can be cached and run again without loading the source
+    def get_image(self) -> dict:
+        return {"instructions": self._instructions,
+                "labels": self._labels_indeces,
+                "global_slots": self._global_slots,
+                "local_slots": self._local_slots}
+
+    def _restore_image(self, image: dict) -> None:
+        self._instructions = image["instructions"]
+        self._labels_indeces = image["labels"]
+        self._global_slots = image["global_slots"]
+        self._local_slots = image["local_slots"]
+
+    # jumps return the index of the next instruction, others return None
+    def execute_instructions(self) -> None:
+        if self._code is not None:
+            self._execute_code()
+            return
+
+        if self._program is not None:
+            from transpiler import TranspiledRuntime
+            self._program(TranspiledRuntime(self._context.input_stream, self._context.output_stream))
+            return
+
+        context = self._context
+        instructions = self._instructions
+        num_instructions = len(instructions)
+        context.instruction_index = 0
+        while context.instruction_index < num_instructions:
+            next_index = instructions[context.instruction_index].execute(context)
+            if next_index is None:
+                context.instruction_index += 1
+            else:
+                context.instruction_index = next_index
+
+
+    # every closure returns the index of the next instruction
+    def _execute_code(self) -> None:
+        code = self._code
+        num_instructions = len(code)
+        pc = 0
+        while pc < num_instructions:
+            pc = code[pc]()
+
+    # statistics of the memory, the transpiled program doesn't use it
+    def get_statistics(self) -> dict[str, int]:
+        if self._program is not None:
+            return {}
+
+        return self._context.memory.get_statistics()
+
+    def print_statistics(self) -> None:
+        for name, value in self.get_statistics().items():
+            print(f"{name}: {value}", file=sys.stderr)
+
+    def print_instructions(self):
+        for instruction in self._instructions:
+            print(instruction)
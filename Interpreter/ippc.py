@@ -0,0 +1,52 @@
+from input_handler import InputHandler
+from interpreter import Interpreter
+from bytecode import BytecodeWriter
+from bytecode import BytecodeReader
+from bytecode import disassemble
+from bytecode import is_bytecode
+
+import argparse
+import gc
+import sys
+
+# ippc converts an XML program to the binary bytecode which interpret.py
+# loads without parsing, the program is verified and linked the same way
+# as before running it, so the errors have the same return codes
+#
+#   python ippc.py program.xml -o program.ippc
+#   python ippc.py --disassemble program.ippc
+
+parser = argparse.ArgumentParser(prog="ippc.py", description="Compile IPPcode23 XML to bytecode")
+parser.add_argument("source", nargs="?", help="XML program or bytecode to disassemble (default stdin)")
+parser.add_argument("--output", "-o", help="Bytecode file (default stdout)")
+parser.add_argument("--disassemble", "-d", action="store_true",
+                    help="Print the instructions with their orders instead of compiling")
+
+args = parser.parse_args()
+
+# the compiler only creates objects which live until it ends, the collector would walk them for nothing
+gc.disable()
+
+inpt = InputHandler()
+inpt.input_file = "stdin"
+inpt.source_file = inpt.open_source(args.source) if args.source is not None else sys.stdin.buffer
+
+if is_bytecode(inpt.source_file):
+    image = BytecodeReader.open(inpt.source_file).load()
+else:
+    inpt.load_program()
+    instructions, _ = inpt.get_instructions()
+    image = Interpreter(instructions).get_image()
+    # instructions are sorted by their orders by get_instructions
+    image["orders"] = [order for order, _ in inpt.instructions]
+
+if args.disassemble:
+    disassemble(image, sys.stdout)
+    sys.exit(0)
+
+data = BytecodeWriter().assemble(image)
+if args.output is None:
+    sys.stdout.buffer.write(data)
+else:
+    with open(args.output, "wb") as file:
+        file.write(data)
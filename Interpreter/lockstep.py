@@ -0,0 +1,629 @@
+from input_handler import ArgumentType
+from context import ExecutionContext
+from memory import Memory
+from memory import DataType
+from memory import Variable
+from memory import Frame
+from memory import GlobalFrame
+from memory import SlotFrame
+from debug import DEBUG_PRINT
+from error_codes import ErrorCodes
+
+import numpy
+import sys
+
+# ///--------- LOCK STEP ENGINE -------\\\\\\
+#
+# experimental engine which runs one program for K inputs at once, every
+# variable holds a vector of K values (one per instance, called a lane)
+# so ADD, LT, EQ... are single vectorized operations
+#
+# the lanes of a batch always execute the same instruction and their
+# variables always have the same datatype, so the frames, stacks and type
+# errors are shared, a batch is split in two when a conditional jump goes
+# both ways or when READ gets nil only for some lanes, a lane which fails
+# on its own value (division by zero, index out of range) leaves the batch
+# with its return code
+#
+# ints are int64 vectors as long as the results can't overflow,
+# bigger ones are object vectors of python ints
+
+# ints smaller than this can be added or subtracted in int64 without overflow
+INT64_SAFE = 2 ** 62
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+# vector of ints, object vector if any of them doesn't fit into int64
+def int_vector(values: list) -> numpy.ndarray:
+    try:
+        return numpy.array(values, dtype=numpy.int64)
+    except OverflowError:
+        return object_vector(values)
+
+
+def object_vector(values: list) -> numpy.ndarray:
+    vector = numpy.empty(len(values), dtype=object)
+    vector[:] = values
+    return vector
+
+
+# vector of python values of the datatype
+def typed_vector(values: list, datatype: DataType) -> numpy.ndarray:
+    if datatype == DataType.TYPE_INT:
+        return int_vector(values)
+    elif datatype == DataType.TYPE_FLOAT:
+        return numpy.array(values, dtype=numpy.float64)
+    elif datatype == DataType.TYPE_BOOL:
+        return numpy.array(values, dtype=bool)
+
+    return object_vector(values)
+
+
+# the biggest absolute value of an int vector, None for object vectors
+def magnitude(vector: numpy.ndarray) -> int:
+    if vector.dtype == object:
+        return None
+    if len(vector) == 0:
+        return 0
+
+    return max(-int(vector.min()), int(vector.max()))
+
+
+# WRITE text of every value of a vector of the datatype
+def write_texts(vector: numpy.ndarray, datatype: DataType) -> list[str]:
+    values = vector.tolist()
+    if datatype == DataType.TYPE_INT:
+        return [str(value) for value in values]
+    elif datatype == DataType.TYPE_BOOL:
+        return ["true" if value else "false" for value in values]
+    elif datatype == DataType.TYPE_FLOAT:
+        return [float.hex(value) for value in values]
+
+    return values
+
+
+# ///--------- VECTOR MEMORY -------\\\\\\
+
+# Memory of one batch, the values of the variables and of the data stack
+# are vectors with one value per lane, constants are turned into vectors
+# when they're stored or used, the operations keep the checks of Memory
+# and record the lanes which fail on their values in failures
+class VectorMemory(Memory):
+    def __init__(self, size: int):
+        super().__init__()
+        self.size = size
+        # (mask of the lanes, return code) of the lanes which failed in the last instruction
+        self.failures = []
+
+    # vector of the value for every lane, vectors are returned as they are
+    def vector(self, value, datatype: DataType):
+        if datatype is None or isinstance(value, numpy.ndarray):
+            return value
+
+        if datatype == DataType.TYPE_INT:
+            if INT64_MIN <= value <= INT64_MAX:
+                return numpy.full(self.size, value, dtype=numpy.int64)
+            return object_vector([value] * self.size)
+        elif datatype == DataType.TYPE_FLOAT:
+            return numpy.full(self.size, value, dtype=numpy.float64)
+        elif datatype == DataType.TYPE_BOOL:
+            return numpy.full(self.size, value, dtype=bool)
+
+        return object_vector([value] * self.size)
+
+    def fail(self, mask: numpy.ndarray, return_code: int) -> None:
+        if mask.any():
+            self.failures.append((mask, return_code))
+
+    # copy of the memory with only the lanes in the mask
+    def select(self, mask: numpy.ndarray) -> "VectorMemory":
+        memory = VectorMemory(int(mask.sum()))
+        memory._local_names = self._local_names
+
+        memory._global_frame = GlobalFrame(self._global_frame.names)
+        memory._global_frame.variables = [self._select_variable(var, mask) for var in self._global_frame.variables]
+        memory._global_frame.defined = list(self._global_frame.defined)
+
+        memory._temporary_frame = self._select_frame(self._temporary_frame, mask)
+        memory._frame_stack = [self._select_frame(frame, mask) for frame in self._frame_stack]
+        memory._data_values = [None if value is None else value[mask] for value in self._data_values]
+        memory._data_types = list(self._data_types)
+        memory._call_stack = list(self._call_stack)
+        return memory
+
+    @staticmethod
+    def _select_variable(var: Variable, mask: numpy.ndarray) -> Variable:
+        if var is None:
+            return None
+
+        selected = Variable(var.name)
+        selected.datatype = var.datatype
+        selected.value = None if var.value is None else var.value[mask]
+        return selected
+
+    def _select_frame(self, frame, mask: numpy.ndarray):
+        if frame is None:
+            return None
+
+        if isinstance(frame, SlotFrame):
+            selected = SlotFrame(frame.names)
+            selected.variables = [self._select_variable(var, mask) for var in frame.variables]
+            selected.defined = list(frame.defined)
+            return selected
+
+        selected = Frame()
+        selected.variables = {name: self._select_variable(var, mask) for name, var in frame.variables.items()}
+        return selected
+
+    # ///--------- VECTORS IN FRAMES AND ON THE STACK -------\\\\\\
+
+    def set_var(self, name: str, frame: str, value, datatype: DataType) -> None:
+        super().set_var(name, frame, self.vector(value, datatype), datatype)
+
+    def push_to_data_stack(self, value, datatype: DataType) -> None:
+        super().push_to_data_stack(self.vector(value, datatype), datatype)
+
+    # ///--------- VECTOR OPERATIONS -------\\\\\\
+
+    # int operation in int64 if it can't overflow, on python ints otherwise
+    def _int_operation(self, operation, first_value, second_value, limit: int) -> numpy.ndarray:
+        first_magnitude = magnitude(first_value)
+        second_magnitude = magnitude(second_value)
+        if first_magnitude is not None and second_magnitude is not None and \
+                first_magnitude < limit and second_magnitude < limit:
+            return operation(first_value, second_value)
+
+        return operation(first_value.astype(object), second_value.astype(object))
+
+    def add(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._arithmetic_operands(first_datatype, second_datatype)
+        first_value = self.vector(first_value, first_datatype)
+        second_value = self.vector(second_value, second_datatype)
+        if first_datatype == DataType.TYPE_INT:
+            return self._int_operation(numpy.add, first_value, second_value, INT64_SAFE), first_datatype
+
+        return first_value + second_value, first_datatype
+
+    def sub(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._arithmetic_operands(first_datatype, second_datatype)
+        first_value = self.vector(first_value, first_datatype)
+        second_value = self.vector(second_value, second_datatype)
+        if first_datatype == DataType.TYPE_INT:
+            return self._int_operation(numpy.subtract, first_value, second_value, INT64_SAFE), first_datatype
+
+        return first_value - second_value, first_datatype
+
+    def mul(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._arithmetic_operands(first_datatype, second_datatype)
+        first_value = self.vector(first_value, first_datatype)
+        second_value = self.vector(second_value, second_datatype)
+        if first_datatype == DataType.TYPE_INT:
+            # both operands under 2 ** 31 keep the product under 2 ** 62
+            return self._int_operation(numpy.multiply, first_value, second_value, 2 ** 31), first_datatype
+
+        return first_value * second_value, first_datatype
+
+    def idiv(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._check_type(first_datatype, [DataType.TYPE_INT])
+        self._check_type(second_datatype, [DataType.TYPE_INT])
+        first_value = self.vector(first_value, first_datatype)
+        second_value = self.vector(second_value, second_datatype)
+        zero = second_value == 0
+        self.fail(zero, ErrorCodes.OperandValueBad)
+        second_value = numpy.where(zero, 1, second_value)
+        # only -2 ** 63 // -1 overflows
+        return self._int_operation(numpy.floor_divide, first_value, second_value, INT64_SAFE), DataType.TYPE_INT
+
+    def div(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._check_type(first_datatype, [DataType.TYPE_FLOAT])
+        self._check_type(second_datatype, [DataType.TYPE_FLOAT])
+        first_value = self.vector(first_value, first_datatype)
+        second_value = self.vector(second_value, second_datatype)
+        zero = second_value == 0
+        self.fail(zero, ErrorCodes.OperandValueBad)
+        return first_value / numpy.where(zero, 1.0, second_value), DataType.TYPE_FLOAT
+
+    def lt(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._comparable_operands(first_datatype, second_datatype)
+        first_value = self.vector(first_value, first_datatype)
+        second_value = self.vector(second_value, second_datatype)
+        return numpy.asarray(first_value < second_value, dtype=bool), DataType.TYPE_BOOL
+
+    def gt(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._comparable_operands(first_datatype, second_datatype)
+        first_value = self.vector(first_value, first_datatype)
+        second_value = self.vector(second_value, second_datatype)
+        return numpy.asarray(first_value > second_value, dtype=bool), DataType.TYPE_BOOL
+
+    # mask of the lanes where the values are equal
+    def equals(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType):
+        if first_datatype == DataType.TYPE_NIL or second_datatype == DataType.TYPE_NIL:
+            return numpy.full(self.size, first_datatype == second_datatype, dtype=bool)
+
+        self._check_matching_operands(first_datatype, second_datatype)
+        first_value = self.vector(first_value, first_datatype)
+        second_value = self.vector(second_value, second_datatype)
+        return numpy.asarray(first_value == second_value, dtype=bool)
+
+    def and_(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._check_type(first_datatype, [DataType.TYPE_BOOL])
+        self._check_matching_operands(first_datatype, second_datatype)
+        return self.vector(first_value, first_datatype) & self.vector(second_value, second_datatype), \
+            DataType.TYPE_BOOL
+
+    def or_(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._check_type(first_datatype, [DataType.TYPE_BOOL])
+        self._check_matching_operands(first_datatype, second_datatype)
+        return self.vector(first_value, first_datatype) | self.vector(second_value, second_datatype), \
+            DataType.TYPE_BOOL
+
+    def not_(self, value, datatype: DataType) -> tuple:
+        self._check_type(datatype, [DataType.TYPE_BOOL])
+        return ~self.vector(value, datatype), DataType.TYPE_BOOL
+
+    def concat(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._check_type(first_datatype, [DataType.TYPE_STRING])
+        self._check_type(second_datatype, [DataType.TYPE_STRING])
+        return self.vector(first_value, first_datatype) + self.vector(second_value, second_datatype), \
+            DataType.TYPE_STRING
+
+    def strlen(self, value, datatype: DataType) -> tuple:
+        self._check_type(datatype, [DataType.TYPE_STRING])
+        strings = self.vector(value, datatype)
+        return numpy.fromiter(map(len, strings), dtype=numpy.int64, count=len(strings)), DataType.TYPE_INT
+
+    # the string operations go through the lanes one by one
+    def getchar(self, string, string_datatype: DataType, index, index_datatype: DataType) -> tuple:
+        self._check_type(string_datatype, [DataType.TYPE_STRING])
+        self._check_type(index_datatype, [DataType.TYPE_INT])
+        strings = self.vector(string, string_datatype).tolist()
+        indexes = self.vector(index, index_datatype).tolist()
+
+        bad = numpy.array([index >= len(string) or index < 0 for string, index in zip(strings, indexes)], dtype=bool)
+        self.fail(bad, ErrorCodes.StringError)
+        chars = [string[index] if 0 <= index < len(string) else "" for string, index in zip(strings, indexes)]
+        return object_vector(chars), DataType.TYPE_STRING
+
+    def setchar(self, string, string_datatype: DataType, index, index_datatype: DataType,
+                char, char_datatype: DataType) -> tuple:
+        self._check_type(char_datatype, [DataType.TYPE_STRING])
+        self._check_type(index_datatype, [DataType.TYPE_INT])
+        self._check_type(string_datatype, [DataType.TYPE_STRING])
+        strings = self.vector(string, string_datatype).tolist()
+        indexes = self.vector(index, index_datatype).tolist()
+        chars = self.vector(char, char_datatype).tolist()
+
+        bad = numpy.array([index >= len(string) or index < 0 or len(char) == 0
+                           for string, index, char in zip(strings, indexes, chars)], dtype=bool)
+        self.fail(bad, ErrorCodes.StringError)
+        results = [string if failed else string[:index] + char[0] + string[index + 1:]
+                   for string, index, char, failed in zip(strings, indexes, chars, bad.tolist())]
+        return object_vector(results), DataType.TYPE_STRING
+
+
+# ///--------- BATCHES -------\\\\\\
+
+# lanes which execute the same instruction, with their memory and program counter
+class Batch:
+    def __init__(self, lanes: numpy.ndarray, memory: VectorMemory, instruction_index: int):
+        self.lanes = lanes
+        self.context = ExecutionContext(memory=memory)
+        self.context.instruction_index = instruction_index
+
+    # new batch of the lanes in the mask which continues at instruction_index
+    def select(self, mask: numpy.ndarray, instruction_index: int) -> "Batch":
+        return Batch(self.lanes[mask], self.context.memory.select(mask), instruction_index)
+
+
+# LockstepRunner runs a linked program (Interpreter.get_image) once for every
+# pair of input and output, the instructions without their own lock step version
+# run their execute with the VectorMemory of the batch in the context
+class LockstepRunner:
+    def __init__(self, image: dict, input_streams: list["InputReader"], output_streams: list["OutputBuffer"]):
+        self._instructions = image["instructions"]
+        self._global_names = list(image["global_slots"])
+        self._local_names = None if image["local_slots"] is None else list(image["local_slots"])
+        self._input_streams = input_streams
+        self._output_streams = output_streams
+        self._return_codes = [None] * len(input_streams)
+        self._executors = {
+            "READ": self._execute_READ,
+            "WRITE": self._execute_WRITE,
+            "EXIT": self._execute_EXIT,
+            "JUMPIFEQ": lambda batch, instruction: self._conditional_jump(batch, instruction, True),
+            "JUMPIFNEQ": lambda batch, instruction: self._conditional_jump(batch, instruction, False),
+            "JUMPIFEQS": lambda batch, instruction: self._stack_conditional_jump(batch, instruction, True),
+            "JUMPIFNEQS": lambda batch, instruction: self._stack_conditional_jump(batch, instruction, False),
+            "INT2CHAR": self._execute_INT2CHAR,
+            "INT2FLOAT": self._execute_INT2FLOAT,
+            "FLOAT2INT": self._execute_FLOAT2INT,
+            "INT2CHARS": self._execute_INT2CHARS,
+            "STRI2INT": self._execute_STRI2INT,
+            "STRI2INTS": self._execute_STRI2INTS,
+        }
+
+    # run all lanes to their end, returns the return code of every lane,
+    # the outputs are flushed by the caller
+    def run(self) -> list[int]:
+        size = len(self._input_streams)
+        memory = VectorMemory(size)
+        memory.set_global_layout(self._global_names)
+        if self._local_names is not None:
+            memory.set_local_layout(self._local_names)
+
+        batches = [Batch(numpy.arange(size), memory, 0)]
+        while batches:
+            batches.extend(self._run_batch(batches.pop()))
+
+        return self._return_codes
+
+    def _finish(self, lanes: numpy.ndarray, return_code: int) -> None:
+        for lane in lanes.tolist():
+            self._return_codes[lane] = return_code
+
+    # run the batch until all its lanes end or it's split,
+    # returns the batches it was split into
+    def _run_batch(self, batch: Batch) -> list[Batch]:
+        instructions = self._instructions
+        num_instructions = len(instructions)
+        context = batch.context
+        while context.instruction_index < num_instructions:
+            instruction = instructions[context.instruction_index]
+            execute = self._executors.get(instruction.opcode)
+            try:
+                if execute is None:
+                    next_index = instruction.execute(context)
+                else:
+                    next_index = execute(batch, instruction)
+            # errors which don't depend on the values end every lane of the batch
+            except SystemExit as e:
+                self._finish(batch.lanes, e.code or 0)
+                return []
+
+            if isinstance(next_index, list):
+                return next_index
+            if next_index is None:
+                next_index = context.instruction_index + 1
+
+            if context.memory.failures:
+                batch = self._drop_failed_lanes(batch, next_index)
+                if batch is None:
+                    return []
+                context = batch.context
+            else:
+                context.instruction_index = next_index
+
+        self._finish(batch.lanes, 0)
+        return []
+
+    # end the lanes which failed in the last instruction,
+    # the rest continues at next_index, None if no lane is left
+    def _drop_failed_lanes(self, batch: Batch, next_index: int) -> Batch:
+        failed = numpy.zeros(len(batch.lanes), dtype=bool)
+        # the first error of a lane is the one it ends with
+        for mask, return_code in batch.context.memory.failures:
+            self._finish(batch.lanes[mask & ~failed], return_code)
+            failed |= mask
+
+        batch.context.memory.failures.clear()
+        if failed.all():
+            return None
+        return batch.select(~failed, next_index)
+
+    # (vector, datatype) of a variable or a constant
+    @staticmethod
+    def _symbol(memory: VectorMemory, instruction, arg) -> tuple:
+        value, datatype = instruction.get_symbol(arg, memory)
+        return memory.vector(value, datatype), datatype
+
+    # ///--------- INPUT AND OUTPUT -------\\\\\\
+
+    # lanes which read nil continue in their own batch
+    def _execute_READ(self, batch: Batch, instruction) -> object:
+        memory = batch.context.memory
+        var_arg, type_arg = instruction.args
+        if type_arg.value not in ["string", "int", "bool", "float"]:
+            DEBUG_PRINT("Bad type on input")
+            sys.exit(ErrorCodes.InputStructureBad)
+
+        name, frame = instruction.get_var_from_arg(var_arg)
+        memory.get_var(name, frame)
+
+        values = [self._input_streams[lane].read(type_arg.value) for lane in batch.lanes.tolist()]
+        missing = numpy.array([value is None for value in values], dtype=bool)
+        datatype = DataType.convert_to_enum(type_arg.value)
+        if not missing.any():
+            memory.set_var(name, frame, typed_vector(values, datatype), datatype)
+            return None
+        if missing.all():
+            memory.set_var(name, frame, None, DataType.TYPE_NIL)
+            return None
+
+        next_index = batch.context.instruction_index + 1
+        read_batch = batch.select(~missing, next_index)
+        read_batch.context.memory.set_var(name, frame, typed_vector([value for value in values if value is not None],
+                                                                    datatype), datatype)
+        nil_batch = batch.select(missing, next_index)
+        nil_batch.context.memory.set_var(name, frame, None, DataType.TYPE_NIL)
+        return [read_batch, nil_batch]
+
+    def _execute_WRITE(self, batch: Batch, instruction) -> None:
+        vector, datatype = self._symbol(batch.context.memory, instruction, instruction.args[0])
+        if datatype is None:
+            DEBUG_PRINT("WRITE uninitialized variable")
+            sys.exit(ErrorCodes.MissingValue)
+
+        if datatype == DataType.TYPE_NIL:
+            return None
+
+        for lane, text in zip(batch.lanes.tolist(), write_texts(vector, datatype)):
+            self._output_streams[lane].write(text)
+
+    # every lane ends with its own return code
+    def _execute_EXIT(self, batch: Batch, instruction) -> list:
+        arg = instruction.args[0]
+        vector, datatype = self._symbol(batch.context.memory, instruction, arg)
+        if datatype != DataType.TYPE_INT:
+            DEBUG_PRINT("Exit bad operand")
+            sys.exit(ErrorCodes.OperandValueBad)
+
+        for lane, value in zip(batch.lanes.tolist(), vector.tolist()):
+            self._return_codes[lane] = value if 0 <= value <= 49 else ErrorCodes.OperandValueBad
+        return []
+
+    # ///--------- JUMPS -------\\\\\\
+
+    # jump if all lanes agree, split the batch otherwise
+    def _branch(self, batch: Batch, instruction, taken: numpy.ndarray) -> object:
+        target = instruction.args[0].value
+        if taken.all():
+            return target
+        if not taken.any():
+            return None
+
+        next_index = batch.context.instruction_index + 1
+        return [batch.select(taken, target), batch.select(~taken, next_index)]
+
+    def _conditional_jump(self, batch: Batch, instruction, equal: bool) -> object:
+        memory = batch.context.memory
+        _, first_arg, second_arg = instruction.args
+        first_value, first_datatype = instruction.get_symbol(first_arg, memory)
+        second_value, second_datatype = instruction.get_symbol(second_arg, memory)
+        equals = memory.equals(first_value, first_datatype, second_value, second_datatype)
+        return self._branch(batch, instruction, equals if equal else ~equals)
+
+    def _stack_conditional_jump(self, batch: Batch, instruction, equal: bool) -> object:
+        memory = batch.context.memory
+        second_value, second_datatype = memory.pop_from_data_stack()
+        first_value, first_datatype = memory.pop_from_data_stack()
+        equals = memory.equals(first_value, first_datatype, second_value, second_datatype)
+        return self._branch(batch, instruction, equals if equal else ~equals)
+
+    # ///--------- CONVERSIONS -------\\\\\\
+
+    # chars of the codes, lanes with invalid codes fail
+    @staticmethod
+    def _chars(memory: VectorMemory, codes: numpy.ndarray) -> numpy.ndarray:
+        chars = []
+        bad = []
+        for code in codes.tolist():
+            try:
+                chars.append(chr(code))
+                bad.append(False)
+            except (ValueError, OverflowError):
+                chars.append("")
+                bad.append(True)
+
+        memory.fail(numpy.array(bad, dtype=bool), ErrorCodes.StringError)
+        return object_vector(chars)
+
+    # codes of the chars at the indexes, lanes with indexes out of range fail
+    @staticmethod
+    def _codes(memory: VectorMemory, strings: numpy.ndarray, indexes: numpy.ndarray) -> numpy.ndarray:
+        strings = strings.tolist()
+        indexes = indexes.tolist()
+        bad = numpy.array([index < 0 or index >= len(string) for string, index in zip(strings, indexes)], dtype=bool)
+        memory.fail(bad, ErrorCodes.StringError)
+        return int_vector([ord(string[index]) if 0 <= index < len(string) else 0
+                           for string, index in zip(strings, indexes)])
+
+    def _execute_INT2CHAR(self, batch: Batch, instruction) -> None:
+        memory = batch.context.memory
+        instruction.check_vars_exist(memory)
+        dest_arg, source_arg = instruction.args
+        dest_name, dest_frame = instruction.get_var_from_arg(dest_arg)
+
+        codes = memory.vector(instruction._get_source_value(memory, source_arg, DataType.TYPE_INT), DataType.TYPE_INT)
+        memory.set_var(dest_name, dest_frame, self._chars(memory, codes), DataType.TYPE_STRING)
+
+    def _execute_INT2FLOAT(self, batch: Batch, instruction) -> None:
+        memory = batch.context.memory
+        instruction.check_vars_exist(memory)
+        dest_arg, source_arg = instruction.args
+        dest_name, dest_frame = instruction.get_var_from_arg(dest_arg)
+
+        values = memory.vector(instruction._get_source_value(memory, source_arg, DataType.TYPE_INT), DataType.TYPE_INT)
+        if values.dtype != object:
+            memory.set_var(dest_name, dest_frame, values.astype(numpy.float64), DataType.TYPE_FLOAT)
+            return
+
+        # python ints too big for a float fail
+        floats = []
+        bad = []
+        for value in values.tolist():
+            try:
+                floats.append(float(value))
+                bad.append(False)
+            except OverflowError:
+                floats.append(0.0)
+                bad.append(True)
+
+        memory.fail(numpy.array(bad, dtype=bool), ErrorCodes.OperandTypeBad)
+        memory.set_var(dest_name, dest_frame, numpy.array(floats, dtype=numpy.float64), DataType.TYPE_FLOAT)
+
+    def _execute_FLOAT2INT(self, batch: Batch, instruction) -> None:
+        memory = batch.context.memory
+        instruction.check_vars_exist(memory)
+        dest_arg, source_arg = instruction.args
+        dest_name, dest_frame = instruction.get_var_from_arg(dest_arg)
+
+        values = memory.vector(instruction._get_source_value(memory, source_arg, DataType.TYPE_FLOAT),
+                               DataType.TYPE_FLOAT)
+        # infinity and nan can't be converted
+        finite = numpy.isfinite(values)
+        memory.fail(~finite, ErrorCodes.OperandTypeBad)
+        values = numpy.where(finite, values, 0.0)
+        if len(values) == 0 or numpy.abs(values).max() < INT64_SAFE:
+            ints = numpy.trunc(values).astype(numpy.int64)
+        else:
+            ints = object_vector([int(value) for value in values.tolist()])
+        memory.set_var(dest_name, dest_frame, ints, DataType.TYPE_INT)
+
+    def _execute_INT2CHARS(self, batch: Batch, instruction) -> None:
+        memory = batch.context.memory
+        codes, datatype = memory.pop_from_data_stack()
+        if datatype != DataType.TYPE_INT:
+            DEBUG_PRINT("INT2CHARS bad type")
+            sys.exit(ErrorCodes.OperandTypeBad)
+
+        memory.push_to_data_stack(self._chars(memory, codes), DataType.TYPE_STRING)
+
+    def _execute_STRI2INT(self, batch: Batch, instruction) -> None:
+        memory = batch.context.memory
+        dest_arg, source_arg, index_arg = instruction.args
+        dest_name, dest_frame = instruction.get_var_from_arg(dest_arg)
+
+        if source_arg.type_ == ArgumentType.VAR:
+            source_var = memory.get_set_var(*instruction.get_var_from_arg(source_arg))
+            if source_var.datatype != DataType.TYPE_STRING:
+                DEBUG_PRINT("STRI2INT bad source type")
+                sys.exit(ErrorCodes.OperandTypeBad)
+            strings = source_var.value
+        else:
+            strings = memory.vector(source_arg.value, DataType.TYPE_STRING)
+
+        if index_arg.type_ == ArgumentType.VAR:
+            index_var = memory.get_set_var(*instruction.get_var_from_arg(index_arg))
+            if index_var.datatype != DataType.TYPE_INT:
+                DEBUG_PRINT("STRI2INT bad index type")
+                sys.exit(ErrorCodes.OperandTypeBad)
+            indexes = index_var.value
+        else:
+            indexes = memory.vector(index_arg.value, DataType.TYPE_INT)
+
+        memory.set_var(dest_name, dest_frame, self._codes(memory, strings, indexes), DataType.TYPE_INT)
+
+    def _execute_STRI2INTS(self, batch: Batch, instruction) -> None:
+        memory = batch.context.memory
+        indexes, index_datatype = memory.pop_from_data_stack()
+        strings, source_datatype = memory.pop_from_data_stack()
+        if source_datatype != DataType.TYPE_STRING:
+            DEBUG_PRINT("STR2INTS bad source type")
+            sys.exit(ErrorCodes.OperandTypeBad)
+
+        if index_datatype != DataType.TYPE_INT:
+            DEBUG_PRINT("STR2INTS bad index type")
+            sys.exit(ErrorCodes.OperandTypeBad)
+
+        memory.push_to_data_stack(self._codes(memory, strings, indexes), DataType.TYPE_INT)
@@ -3,8 +3,11 @@ from error_codes import ErrorCodes
 from debug import DEBUG_PRINT
 from enum import Enum
 
-from typing import Callable
+from collections.abc import Callable
+import sys
 
+# value is a native python value (int, float, bool, str or None for nil),
+# datatype None means the variable is not initialized
 class Variable:
     def __init__(self, name_: str):
         self.name = name_
@@ -46,12 +49,6 @@ class DataType(Enum):
 
 
 
-def convert_string_to_bool(string: str) -> bool:
-    if string.lower() == "true":
-        return True
-    return False
-
-
 class Frame:
     def __init__(self):
         self.variables: set[Variable] = {}
@@ -68,7 +65,7 @@ class Frame:
     def define(self, name: str) -> None:
         if name in self.variables:
             DEBUG_PRINT("Variable {} not found in frame".format(name))
-            exit(ErrorCodes.VariableRedefinition)
+            sys.exit(ErrorCodes.VariableRedefinition)
 
         self.variables[name] = Variable(name)
 
@@ -76,28 +73,98 @@ class Frame:
     def set(self, name: str, value: str, type_: type) -> None:
         if not name in self.variables:
             DEBUG_PRINT("Variable {} not found in frame".format(name))
-            exit(ErrorCodes.VariableNotDefined)
+            sys.exit(ErrorCodes.VariableNotDefined)
 
         self.variables[name].value = value
-        self.variables[name].type_ = type_
 
+    # remove all variables so the frame can be reused
+    def clear(self) -> None:
+        self.variables.clear()
+
+
+# the global frame has a fixed slot for every global variable
+# found in the program when it's loaded, a variable exists
+# only after its DEFVAR was executed
+class GlobalFrame:
+    def __init__(self, names: list[str]):
+        self.names = names
+        self.variables = [Variable(name) for name in names]
+        self.defined = [False] * len(names)
+
+    # get the variable in the slot or None if it's not defined yet
+    def get(self, slot: int) -> Variable:
+        if self.defined[slot]:
+            return self.variables[slot]
+        else:
+            return None
+
+    # define the variable in the slot or exit with error if its already defined
+    def define(self, slot: int) -> None:
+        if self.defined[slot]:
+            DEBUG_PRINT("Variable {} already defined".format(self.names[slot]))
+            sys.exit(ErrorCodes.VariableRedefinition)
+
+        self.defined[slot] = True
+
+
+# local and temporary frames use one layout for the whole program,
+# every LF/TF variable name has a slot, the variable objects
+# are kept when the frame is cleared so a reused frame doesn't allocate them again
+class SlotFrame:
+    def __init__(self, names: list[str]):
+        self.names = names
+        self.variables: list[Variable] = [None] * len(names)
+        self.defined = [False] * len(names)
+        # copied over the flags when the frame is cleared
+        self._undefined = [False] * len(names)
+
+    # get the variable in the slot or None if it's not defined
+    def get(self, slot: int) -> Variable:
+        if self.defined[slot]:
+            return self.variables[slot]
+        else:
+            return None
 
-class Singleton(type):
-    _instances = {}
+    # define the variable in the slot or exit with error if its already defined
+    def define(self, slot: int) -> None:
+        if self.defined[slot]:
+            DEBUG_PRINT("Variable {} already defined".format(self.names[slot]))
+            sys.exit(ErrorCodes.VariableRedefinition)
 
-    def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
-        return cls._instances[cls]
+        var = self.variables[slot]
+        if var is None:
+            self.variables[slot] = Variable(self.names[slot])
+        else:
+            var.value = None
+            var.datatype = None
+        self.defined[slot] = True
 
+    # undefine all variables so the frame can be reused
+    def clear(self) -> None:
+        self.defined[:] = self._undefined
 
-# Memory is resposible for handling all the frames
-class Memory(metaclass=Singleton):
+
+# default number of discarded frames kept for reuse by CREATEFRAME
+FRAME_POOL_CAP = 64
+
+
+# Memory is resposible for handling all the frames,
+# every ExecutionContext has its own
+class Memory:
     def __init__(self):
-        self._global_frame = Frame()
+        self._global_frame = GlobalFrame([])
         self._temporary_frame = None
+        # names of the local variable slots, None when the frames are dicts
+        self._local_names = None
+        # discarded temporary frames which CREATEFRAME reuses
+        self._frame_pool = []
+        self._frame_pool_cap = FRAME_POOL_CAP
+        self._frame_pool_hits = 0
+        self._frame_pool_misses = 0
         self._frame_stack = []
-        self._data_stack = []
+        self._data_values = []
+        self._data_types = []
+        self._data_stack_high_water = 0
         self._call_stack = []
 
 
@@ -107,7 +174,7 @@ class Memory(metaclass=Singleton):
     def _local_define(self, name: str) -> None:
         # check if there is any frame at all
         if len(self._frame_stack) == 0:
-            exit(ErrorCodes.FrameNotDefined)
+            sys.exit(ErrorCodes.FrameNotDefined)
 
         local_frame = self._frame_stack[-1]
 
@@ -117,19 +184,30 @@ class Memory(metaclass=Singleton):
     def _temporary_define(self, name: str) -> None:
         if self._temporary_frame == None: 
             DEBUG_PRINT("Temporary frame doesn't exist")
-            exit(ErrorCodes.FrameNotDefined)
+            sys.exit(ErrorCodes.FrameNotDefined)
 
         self._temporary_frame.define(name)
 
-    # define a variable in the global frame
-    def _global_define(self, name: str) -> None:
-        self._global_frame.define(name)
+    # define a variable in the global frame, name is its slot
+    def _global_define(self, slot: int) -> None:
+        self._global_frame.define(slot)
+
+    def define_var(self, name, frame: str):
+        if frame == "GF":
+            self._global_define(name)
+        elif frame == "LF":
+            self._local_define(name)
+        else:
+            self._temporary_define(name)
+
+    # make the new local and temporary frames slot frames,
+    # None makes them dict frames
+    def set_local_layout(self, names: list[str]) -> None:
+        self._local_names = names
 
-    def define_var(self, name: str, frame: str):
-        assert(frame in ["GF", "LF", "TF"])
-        {'GF': self._global_define,
-         'LF': self._local_define,
-         'TF': self._temporary_define}[frame](name)
+    # create the global frame with a slot for every global variable name
+    def set_global_layout(self, names: list[str]) -> None:
+        self._global_frame = GlobalFrame(names)
 
 
     # ///--------- FUNCTIONS WITH FRAME STACK -------\\\\\\
@@ -137,13 +215,36 @@ class Memory(metaclass=Singleton):
     # create a new temporary frame
     # discard the old one if it exists
     def create_frame(self) -> None:
-        self._temporary_frame = Frame()
+        self._release_frame(self._temporary_frame)
+
+        if self._frame_pool:
+            self._frame_pool_hits += 1
+            self._temporary_frame = self._frame_pool.pop()
+        elif self._local_names is None:
+            self._frame_pool_misses += 1
+            self._temporary_frame = Frame()
+        else:
+            self._frame_pool_misses += 1
+            self._temporary_frame = SlotFrame(self._local_names)
+
+    # return a discarded temporary frame to the pool if there's room
+    def _release_frame(self, frame) -> None:
+        if frame is None or len(self._frame_pool) >= self._frame_pool_cap:
+            return
+
+        frame.clear()
+        self._frame_pool.append(frame)
+
+    # the biggest number of frames kept for reuse, 0 disables the pool
+    def set_frame_pool_cap(self, cap: int) -> None:
+        self._frame_pool_cap = cap
+        del self._frame_pool[cap:]
 
     # push temporary frame onto the stack
     def push_frame(self) -> None:
         if self._temporary_frame == None:
             DEBUG_PRINT("Temporary frame doesn't exist")
-            exit(ErrorCodes.FrameNotDefined)
+            sys.exit(ErrorCodes.FrameNotDefined)
 
         self._frame_stack.append(self._temporary_frame)
 
@@ -158,22 +259,25 @@ class Memory(metaclass=Singleton):
         # check if there's a local frame
         if len(self._frame_stack) == 0:
             DEBUG_PRINT("Local frame doesn't exist")
-            exit(ErrorCodes.FrameNotDefined)
-
-        if self._temporary_frame != None:
-            del self._temporary_frame
+            sys.exit(ErrorCodes.FrameNotDefined)
 
+        self._release_frame(self._temporary_frame)
         self._temporary_frame = self._frame_stack.pop(-1)
 
-    # return variable in global frame
-    def _global_get_var(self, name: str) -> Variable:
-        return self._global_frame.get(name)
+    # return defined global variable in the slot or exit with error
+    def get_global_var(self, slot: int) -> Variable:
+        var = self._global_frame.get(slot)
+        if var is None:
+            DEBUG_PRINT(f"Variable {self._global_frame.names[slot]} not defined in GF")
+            sys.exit(ErrorCodes.VariableNotDefined)
+
+        return var
 
     # return variable in local frame
     def _local_get_var(self, name: str) -> Variable:
         if len(self._frame_stack) == 0:        
             DEBUG_PRINT(f"Local frame doesn't exist")
-            exit(ErrorCodes.FrameNotDefined)
+            sys.exit(ErrorCodes.FrameNotDefined)
 
         local_frame = self._frame_stack[-1]
         var = local_frame.get(name)
@@ -182,20 +286,24 @@ class Memory(metaclass=Singleton):
     def _temporary_get_var(self, name: str) -> Variable:
         if self._temporary_frame is None:
             DEBUG_PRINT(f"Temporary frame doesn't exist")
-            exit(ErrorCodes.FrameNotDefined)
+            sys.exit(ErrorCodes.FrameNotDefined)
 
         var = self._temporary_frame.get(name)
         return var
 
 
-    def get_var(self, name: str, frame: str) -> Variable:
-        var =  {'GF': self._global_get_var,
-                'LF': self._local_get_var,
-                'TF': self._temporary_get_var}[frame](name)
+    # name of a global variable is its slot in the global frame
+    def get_var(self, name, frame: str) -> Variable:
+        if frame == "GF":
+            return self.get_global_var(name)
+        elif frame == "LF":
+            var = self._local_get_var(name)
+        else:
+            var = self._temporary_get_var(name)
 
         if var is None:
             DEBUG_PRINT(f"Variable {name} not defined in {frame}")
-            exit(ErrorCodes.VariableNotDefined)
+            sys.exit(ErrorCodes.VariableNotDefined)
 
         return var
 
@@ -207,16 +315,32 @@ class Memory(metaclass=Singleton):
         dest_var.datatype = source_var.datatype
     
     def check_var_set(self, name: str, frame: str) -> None:
+        self.get_set_var(name, frame)
+
+    # return the variable or exit with error if it has no value yet,
+    # every engine reads an uninitialized variable as a missing value
+    def get_set_var(self, name, frame: str) -> Variable:
         var = self.get_var(name, frame)
-        if var.value is None:
-            DEBUG_PRINT("Uninitialized variable")
-            exit(ErrorCodes.CallStackEmpty)
+        if var.datatype is None:
+            DEBUG_PRINT(f"Variable {name} in {frame} is not initialized")
+            sys.exit(ErrorCodes.MissingValue)
+
+        return var
+
+    # get_set_var of a global variable in the slot
+    def get_set_global_var(self, slot: int) -> Variable:
+        var = self.get_global_var(slot)
+        if var.datatype is None:
+            DEBUG_PRINT(f"Variable {self._global_frame.names[slot]} in GF is not initialized")
+            sys.exit(ErrorCodes.MissingValue)
+
+        return var
 
 
-    def set_var(self, name: str, frame: str, value: str, datatype: DataType) -> None:
-        if value is None:
+    def set_var(self, name: str, frame: str, value, datatype: DataType) -> None:
+        if datatype is None:
             DEBUG_PRINT("Uninitialized variable")
-            exit(ErrorCodes.CallStackEmpty)
+            sys.exit(ErrorCodes.CallStackEmpty)
 
         var = self.get_var(name, frame)
         var.datatype = datatype
@@ -226,295 +350,183 @@ class Memory(metaclass=Singleton):
     def _check_type(self, type_: DataType, allowed_types: list[DataType]) -> None:
         if type_ not in allowed_types:
             DEBUG_PRINT("Instruction wrong datatype")
-            exit(ErrorCodes.OperandTypeBad)
+            sys.exit(ErrorCodes.OperandTypeBad)
 
     def _check_matching_operands(self, operand1_datatype: DataType, operand2_datatype: DataType) -> None:
         if operand1_datatype != operand2_datatype:
             DEBUG_PRINT("OPERAND datatypes not matching"+ str(operand1_datatype) + "/" + str(operand2_datatype))
-            exit(ErrorCodes.OperandTypeBad)
-
-    def _operation(self, function: Callable, dest_name, dest_frame, first_operand: Variable, second_operand: Variable, stack_only: bool = False):
-        self._check_type(first_operand.datatype, [DataType.TYPE_INT, DataType.TYPE_FLOAT])
-        self._check_matching_operands(first_operand.datatype, second_operand.datatype)
-
-        if first_operand.datatype == DataType.TYPE_INT:
-            result = str(function(int(first_operand.value), int(second_operand.value)))
-        else:
-            result = str(float.hex(function(float.fromhex(first_operand.value), float.fromhex(second_operand.value))))
-
-        if stack_only:
-            self.push_to_data_stack(result, first_operand.datatype)
-            return
-
-        self.set_var(dest_name, dest_frame, result, first_operand.datatype)
-
-    def add(self, dest_name: str, dest_frame: str, stack_only: bool = False) -> None:
-        first_operand = self.pop_from_data_stack()
-        second_operand = self.pop_from_data_stack()
-
-        self._operation(lambda x, y: x + y, dest_name, dest_frame, first_operand, second_operand, stack_only=stack_only)
-
-    def sub(self, dest_name: str, dest_frame: str, stack_only: bool = False) -> None:
-        second_operand = self.pop_from_data_stack()
-        first_operand = self.pop_from_data_stack()
-
-        self._operation(lambda x, y: x - y, dest_name, dest_frame, first_operand, second_operand, stack_only=stack_only)
+            sys.exit(ErrorCodes.OperandTypeBad)
 
+    # ///--------- OPERATIONS -------\\\
 
-    def mul(self, dest_name: str, dest_frame: str, stack_only: bool = False) -> None:
-        first_operand = self.pop_from_data_stack()
-        second_operand = self.pop_from_data_stack()
+    # operations take the values and datatypes of their operands
+    # and return the (value, datatype) of the result, the three address
+    # instructions store it in their variable, the stack ones push it
 
-        self._operation(lambda x, y: x * y, dest_name, dest_frame, first_operand, second_operand, stack_only=stack_only)
+    def _arithmetic_operands(self, first_datatype: DataType, second_datatype: DataType) -> None:
+        self._check_type(first_datatype, [DataType.TYPE_INT, DataType.TYPE_FLOAT])
+        self._check_matching_operands(first_datatype, second_datatype)
 
-    def idiv(self, dest_name: str, dest_frame: str, stack_only: bool = False) -> None:
-        second_operand = self.pop_from_data_stack()
-        first_operand = self.pop_from_data_stack()
-        self._check_type(first_operand.datatype, [DataType.TYPE_INT])
-        self._check_type(second_operand.datatype, [DataType.TYPE_INT])
+    def add(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._arithmetic_operands(first_datatype, second_datatype)
+        return first_value + second_value, first_datatype
 
-        def check_function(x, y):
-            try:
-                return int(x) // int(y)
-            except ZeroDivisionError:
-                DEBUG_PRINT("IDIV by zero")
-                exit(ErrorCodes.OperandValueBad)
+    def sub(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._arithmetic_operands(first_datatype, second_datatype)
+        return first_value - second_value, first_datatype
 
-        self._operation(check_function, dest_name, dest_frame, first_operand, second_operand, stack_only=stack_only)
+    def mul(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._arithmetic_operands(first_datatype, second_datatype)
+        return first_value * second_value, first_datatype
 
-    def div(self, dest_name: str, dest_frame: str, stack_only: bool = False) -> None:
-        second_operand = self.pop_from_data_stack()
-        first_operand = self.pop_from_data_stack()
-        self._check_type(first_operand.datatype, [DataType.TYPE_FLOAT])
-        self._check_type(second_operand.datatype, [DataType.TYPE_FLOAT])
+    def idiv(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._check_type(first_datatype, [DataType.TYPE_INT])
+        self._check_type(second_datatype, [DataType.TYPE_INT])
+        if second_value == 0:
+            DEBUG_PRINT("IDIV by zero")
+            sys.exit(ErrorCodes.OperandValueBad)
 
-        def check_function(x, y):
-            try:
-                return x / y
-            except ZeroDivisionError:
-                DEBUG_PRINT("IDIV by zero")
-                exit(ErrorCodes.OperandValueBad)
+        return first_value // second_value, DataType.TYPE_INT
 
-        self._operation(check_function, dest_name, dest_frame, first_operand, second_operand, stack_only=stack_only)
+    def div(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._check_type(first_datatype, [DataType.TYPE_FLOAT])
+        self._check_type(second_datatype, [DataType.TYPE_FLOAT])
+        if second_value == 0:
+            DEBUG_PRINT("DIV by zero")
+            sys.exit(ErrorCodes.OperandValueBad)
 
+        return first_value / second_value, DataType.TYPE_FLOAT
 
+    def _comparable_operands(self, first_datatype: DataType, second_datatype: DataType) -> None:
+        self._check_matching_operands(first_datatype, second_datatype)
+        self._check_type(first_datatype, [DataType.TYPE_INT, DataType.TYPE_STRING, DataType.TYPE_BOOL,
+                                          DataType.TYPE_FLOAT])
 
-    def _compare_operation(self, compare_function: Callable, dest_name: str, dest_frame: str, first_operand,
-                           second_operand, stack_only: bool = False):
-        result = "true" if compare_function(first_operand.value, second_operand.value) else "false"
-        if stack_only:
-            self.push_to_data_stack(result, DataType.TYPE_BOOL)
-            return 
+    # comparison between two values
+    def lt(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._comparable_operands(first_datatype, second_datatype)
+        return first_value < second_value, DataType.TYPE_BOOL
 
-        self.set_var(dest_name, dest_frame, result, DataType.TYPE_BOOL)
-
-    # comparison between two variables
-    def lt(self, dest_name: str, dest_frame: str, stack_only: bool = False) -> None:
-        second_operand = self.pop_from_data_stack()
-        first_operand = self.pop_from_data_stack()
-        self._check_matching_operands(first_operand.datatype, second_operand.datatype)
-        self._check_type(first_operand.datatype, [DataType.TYPE_INT, DataType.TYPE_STRING, DataType.TYPE_BOOL,
-                                                  DataType.TYPE_FLOAT])
-
-        if first_operand.datatype == DataType.TYPE_INT:
-            self._compare_operation(lambda x, y: True if int(x) < int(y) else False, dest_name, dest_frame,
-                                    first_operand, second_operand, stack_only = stack_only)
-
-        elif first_operand.datatype == DataType.TYPE_FLOAT:
-            self._compare_operation(lambda x, y: True if float.fromhex(x) < float.fromhex(y) else False, dest_name, dest_frame,
-                                    first_operand, second_operand, stack_only = stack_only)
-
-        elif first_operand.datatype == DataType.TYPE_BOOL:
-            self._compare_operation(lambda x, y: True if convert_string_to_bool(x) < convert_string_to_bool(y) else
-                                    False, dest_name, dest_frame, first_operand, second_operand, stack_only=stack_only)
-
-        elif first_operand.datatype == DataType.TYPE_STRING:
-            self._compare_operation(lambda x, y: True if x < y else False, dest_name, dest_frame, first_operand,
-                                    second_operand, stack_only=stack_only)
-
-
-    # comparison between two variables
-    def gt(self, dest_name: str, dest_frame: str, stack_only: bool = False) -> None:
-        second_operand = self.pop_from_data_stack()
-        first_operand = self.pop_from_data_stack()
-        self._check_matching_operands(first_operand.datatype, second_operand.datatype)
-        self._check_type(first_operand.datatype, [DataType.TYPE_INT, DataType.TYPE_STRING, DataType.TYPE_BOOL,
-                                                  DataType.TYPE_FLOAT])
-
-        if first_operand.datatype == DataType.TYPE_INT:
-            self._compare_operation(lambda x, y: True if int(x) > int(y) else False, dest_name, dest_frame,
-                                    first_operand, second_operand, stack_only = stack_only)
-
-        elif first_operand.datatype == DataType.TYPE_FLOAT:
-
-            self._compare_operation(lambda x, y: True if float.fromhex(x) > float.fromhex(y) else False, dest_name, dest_frame,
-                                    first_operand, second_operand, stack_only = stack_only)
-
-        elif first_operand.datatype == DataType.TYPE_BOOL:
-            self._compare_operation(lambda x, y: True if convert_string_to_bool(x) > convert_string_to_bool(y) else
-                                    False, dest_name, dest_frame, first_operand, second_operand, stack_only=stack_only)
-
-        elif first_operand.datatype == DataType.TYPE_STRING:
-            self._compare_operation(lambda x, y: True if x > y else False, dest_name, dest_frame, first_operand,
-                                    second_operand, stack_only=stack_only)
-
-
-    # comparison between two variables
-    def eq(self, dest_name: str, dest_frame: str, stack_only: bool = False) -> None:
-        first_operand = self.pop_from_data_stack()
-        second_operand = self.pop_from_data_stack()
+    # comparison between two values
+    def gt(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._comparable_operands(first_datatype, second_datatype)
+        return first_value > second_value, DataType.TYPE_BOOL
 
+    # compare two values for EQ and the conditional jumps
+    def equals(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> bool:
         # nil is a special case
-        if first_operand.datatype == DataType.TYPE_NIL or second_operand.datatype == DataType.TYPE_NIL:
-            if first_operand.datatype == second_operand.datatype:
-                result = "true"
-            else:
-                result = "false"
-            if stack_only:
-                self.push_to_data_stack(result, DataType.TYPE_BOOL)
-            else:
-                self.set_var(dest_name, dest_frame, result, DataType.TYPE_BOOL)
-            return 
-
-        self._check_matching_operands(first_operand.datatype, second_operand.datatype)
-
-        if first_operand.datatype == DataType.TYPE_INT:
-            self._compare_operation(lambda x, y: int(first_operand.value) == int(second_operand.value),
-                                    dest_name, dest_frame, first_operand, second_operand, stack_only=stack_only)
-
-        elif first_operand.datatype == DataType.TYPE_FLOAT:
-            self._compare_operation(lambda x, y: float.fromhex(first_operand.value) == float.fromhex(second_operand.value),
-                                    dest_name, dest_frame, first_operand, second_operand, stack_only=stack_only)
-
-        elif first_operand.datatype == DataType.TYPE_BOOL:
-            self._compare_operation(lambda x, y: convert_string_to_bool(first_operand.value) ==
-                                    convert_string_to_bool(second_operand.value),
-                                    dest_name, dest_frame, first_operand, second_operand, stack_only=stack_only)
-
-        elif first_operand.datatype in [DataType.TYPE_STRING, DataType.TYPE_NIL]:
-            self._compare_operation(lambda x, y: first_operand.value == second_operand.value,
-                                    dest_name, dest_frame, first_operand, second_operand, stack_only=stack_only)
-
-
-
-    # bitwise and operation
-    def and_(self, dest_name: str, dest_frame: str, stack_only: bool = False) -> None: 
-        first_operand = self.pop_from_data_stack()
-        second_operand = self.pop_from_data_stack()
-
-        self._check_type(first_operand.datatype, [DataType.TYPE_BOOL])
-        self._check_matching_operands(first_operand.datatype, second_operand.datatype)
-
-        new_value = "true" if convert_string_to_bool(first_operand.value) and convert_string_to_bool(second_operand.value) else "false"
-        if stack_only:
-            self.push_to_data_stack(new_value, DataType.TYPE_BOOL)
-            return
-
-        self.set_var(dest_name, dest_frame, new_value, DataType.TYPE_BOOL)
-
-    # bitwise or operation
-    def or_(self, dest_name: str, dest_frame: str, stack_only: bool = False) -> None: 
-        first_operand = self.pop_from_data_stack()
-        second_operand = self.pop_from_data_stack()
-
-        self._check_type(first_operand.datatype, [DataType.TYPE_BOOL])
-        self._check_matching_operands(first_operand.datatype, second_operand.datatype)
-
-        new_value = "true" if convert_string_to_bool(first_operand.value) or \
-        convert_string_to_bool(second_operand.value) else "false"
-        if stack_only:
-            self.push_to_data_stack(new_value, DataType.TYPE_BOOL)
-            return
-        self.set_var(dest_name, dest_frame, new_value, DataType.TYPE_BOOL)
-
-    # bitwise not operation
-    def not_(self, dest_name: str, dest_frame: str, stack_only: bool = False) -> None:
-        operand = self.pop_from_data_stack()
-        self._check_type(operand.datatype, [DataType.TYPE_BOOL])
-        new_value = "true" if not convert_string_to_bool(operand.value) else "false"
-        if stack_only:
-            self.push_to_data_stack(new_value, DataType.TYPE_BOOL)
-            return 
-
-        self.set_var(dest_name, dest_frame, new_value, DataType.TYPE_BOOL)
-
-    def concat(self, dest_name: str, dest_frame: str) -> None:
-        operand1 = self.pop_from_data_stack()
-        operand2 = self.pop_from_data_stack()
-        self._check_type(operand1.datatype, [DataType.TYPE_STRING])
-        self._check_type(operand2.datatype, [DataType.TYPE_STRING])
-
-        new_value = operand1.value + operand2.value
-        self.set_var(dest_name, dest_frame, new_value, DataType.TYPE_STRING)
-
-
-    def strlen(self, dest_name: str, dest_frame: str) -> None:
-        operand = self.pop_from_data_stack()
-        self._check_type(operand.datatype, [DataType.TYPE_STRING])
-        new_value = len(operand.value)
-        self.set_var(dest_name, dest_frame, new_value, DataType.TYPE_INT)
-
+        if first_datatype == DataType.TYPE_NIL or second_datatype == DataType.TYPE_NIL:
+            return first_datatype == second_datatype
+
+        self._check_matching_operands(first_datatype, second_datatype)
+        return first_value == second_value
+
+    # comparison between two values
+    def eq(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        return self.equals(first_value, first_datatype, second_value, second_datatype), DataType.TYPE_BOOL
+
+    # logical and operation
+    def and_(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._check_type(first_datatype, [DataType.TYPE_BOOL])
+        self._check_matching_operands(first_datatype, second_datatype)
+        return first_value and second_value, DataType.TYPE_BOOL
+
+    # logical or operation
+    def or_(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._check_type(first_datatype, [DataType.TYPE_BOOL])
+        self._check_matching_operands(first_datatype, second_datatype)
+        return first_value or second_value, DataType.TYPE_BOOL
+
+    # logical not operation
+    def not_(self, value, datatype: DataType) -> tuple:
+        self._check_type(datatype, [DataType.TYPE_BOOL])
+        return not value, DataType.TYPE_BOOL
+
+    def concat(self, first_value, first_datatype: DataType, second_value, second_datatype: DataType) -> tuple:
+        self._check_type(first_datatype, [DataType.TYPE_STRING])
+        self._check_type(second_datatype, [DataType.TYPE_STRING])
+        return first_value + second_value, DataType.TYPE_STRING
+
+    def strlen(self, value, datatype: DataType) -> tuple:
+        self._check_type(datatype, [DataType.TYPE_STRING])
+        return len(value), DataType.TYPE_INT
 
     # get char from string at index
-    def getchar(self, dest_name: str, dest_frame: str) -> None:
-        operand1 = self.pop_from_data_stack()
-        operand2 = self.pop_from_data_stack()
-        self._check_type(operand1.datatype, [DataType.TYPE_STRING])
-        self._check_type(operand2.datatype, [DataType.TYPE_INT])
-        if int(operand2.value) >= len(operand1.value) or int(operand2.value) < 0:
+    def getchar(self, string, string_datatype: DataType, index, index_datatype: DataType) -> tuple:
+        self._check_type(string_datatype, [DataType.TYPE_STRING])
+        self._check_type(index_datatype, [DataType.TYPE_INT])
+        if index >= len(string) or index < 0:
             DEBUG_PRINT("GETCHAR greater than length")
-            exit(ErrorCodes.StringError)
-
-        new_value = operand1.value[int(operand2.value)]
-        self.set_var(dest_name, dest_frame, new_value, DataType.TYPE_STRING)
-
-    # set char in string at index
-    def setchar(self, dest_name: str, dest_frame: str) -> None:
-        operand1 = self.pop_from_data_stack()
-        operand2 = self.pop_from_data_stack()
-        self._check_type(operand1.datatype, [DataType.TYPE_STRING])
-        self._check_type(operand2.datatype, [DataType.TYPE_INT])
-
-        var = self.get_var(dest_name, dest_frame)
-        if int(operand2.value) >= len(var.value) or int(operand2.value) < 0:
-            DEBUG_PRINT("GETCHAR greater than length")
-            exit(ErrorCodes.StringError)
-
-        index = int(operand2.value)
-        new_char = operand1.value[0]
-        new_string = var.value[:index] + new_char + var.value[index + 1:]
-        self.set_var(dest_name, dest_frame, new_string, DataType.TYPE_STRING)
+            sys.exit(ErrorCodes.StringError)
+
+        return string[index], DataType.TYPE_STRING
+
+    # set char in string at index, the string is the current value of the variable
+    def setchar(self, string, string_datatype: DataType, index, index_datatype: DataType,
+                char, char_datatype: DataType) -> tuple:
+        self._check_type(char_datatype, [DataType.TYPE_STRING])
+        self._check_type(index_datatype, [DataType.TYPE_INT])
+        self._check_type(string_datatype, [DataType.TYPE_STRING])
+        if index >= len(string) or index < 0 or len(char) == 0:
+            DEBUG_PRINT("SETCHAR index out of range")
+            sys.exit(ErrorCodes.StringError)
+
+        return string[:index] + char[0] + string[index + 1:], DataType.TYPE_STRING
+
+    # run a binary operation on the two values on top of the data stack
+    # and push the result, the second operand is on the top
+    def stack_operation(self, operation: Callable) -> None:
+        second_value, second_datatype = self.pop_from_data_stack()
+        first_value, first_datatype = self.pop_from_data_stack()
+        value, datatype = operation(first_value, first_datatype, second_value, second_datatype)
+        self.push_to_data_stack(value, datatype)
+
+    # run an unary operation on the value on top of the data stack
+    def stack_unary_operation(self, operation: Callable) -> None:
+        value, datatype = operation(*self.pop_from_data_stack())
+        self.push_to_data_stack(value, datatype)
 
     # testing function
     def get_frame_stack(self) -> list[Frame]:
         return self._frame_stack
 
-    def get_global_frame(self) -> Frame:
+    def get_global_frame(self) -> GlobalFrame:
         return self._global_frame
 
     # ///--------- FUNCTIONS WITH DATA STACK -------\\\\\\ 
 
-    # push data on top of the data stack
-    def push_to_data_stack(self, value: str, datatype: DataType) -> None:
-        # "stack_var" is default name for stack variables - they can be anonymous
-        new_var = Variable("stack_var")
-        new_var.value = value
-        new_var.datatype = datatype
-        self._data_stack.append(new_var)
-
-    # pop data from the top of the data stack
-
-    def pop_from_data_stack(self) -> str:
-        if len(self._data_stack) == 0:
+    # push data on top of the data stack, values and datatypes
+    # are kept in two parallel lists so a push doesn't create any object
+    def push_to_data_stack(self, value, datatype: DataType) -> None:
+        self._data_values.append(value)
+        self._data_types.append(datatype)
+        if len(self._data_values) > self._data_stack_high_water:
+            self._data_stack_high_water = len(self._data_values)
+
+    # pop (value, datatype) from the top of the data stack
+    def pop_from_data_stack(self) -> tuple:
+        if len(self._data_values) == 0:
             DEBUG_PRINT("Data stack is empty")
-            exit(ErrorCodes.CallStackEmpty)
+            sys.exit(ErrorCodes.CallStackEmpty)
 
-        return self._data_stack.pop(-1)
+        return self._data_values.pop(), self._data_types.pop()
 
     # clear the data stack 
-    def clear_data_stack(self) -> int:
-        del self._data_stack
-        self._data_stack = []
+    def clear_data_stack(self) -> None:
+        self._data_values.clear()
+        self._data_types.clear()
+
+    # the biggest number of values which were on the data stack at once
+    def get_data_stack_high_water(self) -> int:
+        return self._data_stack_high_water
+
+    # runtime statistics printed with --stats
+    def get_statistics(self) -> dict[str, int]:
+        created_frames = self._frame_pool_hits + self._frame_pool_misses
+        return {"data_stack_high_water": self._data_stack_high_water,
+                "frame_pool_hits": self._frame_pool_hits,
+                "frame_pool_misses": self._frame_pool_misses,
+                "frame_pool_hit_rate": round(self._frame_pool_hits / created_frames, 3) if created_frames else 0}
 
     # push current index to call stack
     # when running CALL instruction
@@ -526,6 +538,6 @@ class Memory(metaclass=Singleton):
     def pop_from_call_stack(self) -> int:
         if not len(self._call_stack):
             DEBUG_PRINT("Call stack is empty")
-            exit(ErrorCodes.CallStackEmpty)
+            sys.exit(ErrorCodes.CallStackEmpty)
         return self._call_stack.pop(-1)
     
@@ -0,0 +1,59 @@
+from error_codes import ErrorCodes
+
+import sys
+
+
+# default size of the output buffer in bytes
+OUTPUT_BUFFER_SIZE = 64 * 1024
+
+
+# OutputBuffer collects everything the program writes in one reusable
+# byte buffer and writes it to the binary stream only when the buffer
+# is full or when it's flushed by the interpreter
+class OutputBuffer:
+    def __init__(self, stream=None, buffer_size: int = OUTPUT_BUFFER_SIZE):
+        # stdout is written through its binary layer, anything
+        # printed through its text layer goes first
+        self._to_stdout = stream is None
+        if stream is None:
+            stream = sys.stdout.buffer
+
+        self._stream = stream
+        self._buffer = bytearray()
+        self._buffer_size = buffer_size
+
+    # open the output file given by --output, stdout if there's none,
+    # exit with error if the file can't be opened
+    @staticmethod
+    def open(file_name: str = None) -> "OutputBuffer":
+        if file_name is None:
+            return OutputBuffer()
+
+        try:
+            return OutputBuffer(open(file_name, "wb"))
+        except OSError as e:
+            print(e, file=sys.stderr)
+            sys.exit(ErrorCodes.OutputFileError)
+
+    def write(self, text: str) -> None:
+        self._buffer += text.encode("utf-8")
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    # write out the buffer, called at EXIT, at the end
+    # of the program and when it ends with an error
+    def flush(self) -> None:
+        if self._buffer:
+            if self._to_stdout:
+                sys.stdout.flush()
+
+            self._stream.write(self._buffer)
+            self._buffer.clear()
+
+        self._stream.flush()
+
+    # flush and close the file opened by open, stdout stays open
+    def close(self) -> None:
+        self.flush()
+        if not self._to_stdout:
+            self._stream.close()
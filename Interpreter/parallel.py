@@ -0,0 +1,187 @@
+from input_handler import InputHandler
+from interpret import load_image
+from interpret import run_program
+from input_reader import InputReader
+from output import OutputBuffer
+
+import contextlib
+import gc
+import glob
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+# ///--------- PARALLEL RUNS -------\\\\\\
+#
+# one program is run for every input file matched by --inputs_glob,
+# the parent loads and links the program once and the forked workers
+# inherit it copy on write and run it directly, every run has
+# its own execution context and writes straight to its output file
+#
+# the output of input tests/a.in is written to OUTPUT_DIR/tests/a.in.out
+# (relative to the directory all inputs are in) and the results are
+# json lines in the order of the sorted input paths:
+#   {"input": "tests/a.in", "output": "out/tests/a.in.out", "exit_code": 0,
+#    "timed_out": false, "output_truncated": false, "seconds": 0.004, "stderr": ""}
+#
+# the limits of the server don't apply, timed_out and output_truncated are always false,
+# with --lockstep K every worker runs K inputs at once with the lock step
+# engine (lockstep.py) and seconds is the time of the whole group of inputs
+
+# return codes of inputs which couldn't be run
+BAD_OPTION = 10
+MISSING_FILE = 11
+OUTPUT_FILE_ERROR = 12
+
+# inherited by the forked workers
+_inpt = None
+_image = None
+
+
+# run the program from inpt.source_file for every input in inpt.args["inputs_glob"]
+# with jobs worker processes, the results go to inpt.args["results"] (default stdout)
+def run_inputs(inpt: InputHandler) -> int:
+    global _inpt, _image
+
+    inputs = sorted(path for path in glob.glob(inpt.args["inputs_glob"], recursive=True) if os.path.isfile(path))
+    if not inputs:
+        print(f"No input files match {inpt.args['inputs_glob']}", file=sys.stderr)
+        sys.exit(MISSING_FILE)
+
+    # a program which can't be loaded fails the same way for every input,
+    # the collector is off while it loads like in interpret.main
+    gc.disable()
+    _inpt = inpt
+    _image = load_image(inpt)
+    gc.enable()
+
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in inputs])
+    output_dir = inpt.args["output_dir"]
+    jobs = [(path, os.path.join(output_dir, os.path.relpath(os.path.abspath(path), root) + ".out"))
+            for path in inputs]
+
+    group_size = inpt.args["lockstep"]
+    if group_size is not None:
+        if group_size < 1:
+            print("--lockstep needs at least one input at a time", file=sys.stderr)
+            sys.exit(BAD_OPTION)
+        # numpy is needed only by the lock step engine, the workers inherit it
+        try:
+            import lockstep
+        except ImportError:
+            print("--lockstep needs numpy", file=sys.stderr)
+            sys.exit(BAD_OPTION)
+
+    results_file = sys.stdout if inpt.args["results"] is None else open(inpt.args["results"], "w", encoding="utf-8")
+    # the workers don't touch the pages of the linked program when they collect
+    gc.freeze()
+    processes = inpt.args["jobs"] or os.cpu_count()
+    with multiprocessing.get_context("fork").Pool(processes) as pool:
+        if group_size is None:
+            chunk_size = max(1, len(jobs) // (processes * 16))
+            results = pool.imap(_run_input, jobs, chunk_size)
+        else:
+            groups = [jobs[i:i + group_size] for i in range(0, len(jobs), group_size)]
+            results = itertools.chain.from_iterable(pool.imap(_run_lockstep, groups))
+
+        for result in results:
+            results_file.write(json.dumps(result) + "\n")
+            results_file.flush()
+
+    if inpt.args["results"] is not None:
+        results_file.close()
+
+    return 0
+
+
+# run the inherited program for one input in a worker
+def _run_input(job: tuple[str, str]) -> dict:
+    input_path, output_path = job
+    result = {"input": input_path, "output": output_path}
+
+    result.update(exit_code=0, timed_out=False, output_truncated=False, seconds=0.0, stderr="")
+
+    start = time.perf_counter()
+    try:
+        input_stream = InputReader.open(input_path)
+    except OSError as e:
+        result.update(exit_code=MISSING_FILE, stderr=str(e))
+        return result
+
+    try:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        output_file = open(output_path, "wb")
+    except OSError as e:
+        result.update(exit_code=OUTPUT_FILE_ERROR, stderr=str(e))
+        return result
+
+    # text printed directly (messages of errors) goes to stderr of the result,
+    # the stdout of the worker is the one of the results
+    stderr = io.StringIO()
+    with output_file, contextlib.redirect_stdout(stderr), contextlib.redirect_stderr(stderr):
+        try:
+            result["exit_code"] = run_program(_inpt, input_stream, OutputBuffer(output_file), image=_image)
+
+        # errors and EXIT end the run with their return code like they end the process
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                result["exit_code"] = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                result["exit_code"] = 1
+
+        # a crash of the interpreter doesn't stop the worker
+        except Exception:
+            traceback.print_exc()
+            result["exit_code"] = 1
+
+    result["seconds"] = time.perf_counter() - start
+    result["stderr"] = stderr.getvalue()
+    return result
+
+
+# run the inherited program for a group of inputs at once in a worker
+def _run_lockstep(group: list[tuple[str, str]]) -> list[dict]:
+    from lockstep import LockstepRunner
+
+    start = time.perf_counter()
+    results = []
+    lanes = []
+    for input_path, output_path in group:
+        result = {"input": input_path, "output": output_path, "exit_code": None, "timed_out": False,
+                  "output_truncated": False, "seconds": 0.0, "stderr": ""}
+        results.append(result)
+        try:
+            input_stream = InputReader.open(input_path)
+        except OSError as e:
+            result.update(exit_code=MISSING_FILE, stderr=str(e))
+            continue
+
+        try:
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            output_file = open(output_path, "wb")
+        except OSError as e:
+            result.update(exit_code=OUTPUT_FILE_ERROR, stderr=str(e))
+            continue
+
+        lanes.append((result, input_stream, OutputBuffer(output_file), output_file))
+
+    if lanes:
+        input_streams = [input_stream for _, input_stream, _, _ in lanes]
+        output_streams = [output_stream for _, _, output_stream, _ in lanes]
+        return_codes = LockstepRunner(_image, input_streams, output_streams).run()
+        for (result, _, output_stream, output_file), return_code in zip(lanes, return_codes):
+            result["exit_code"] = return_code
+            output_stream.flush()
+            output_file.close()
+
+    seconds = time.perf_counter() - start
+    for result in results:
+        result["seconds"] = seconds
+
+    return results
@@ -0,0 +1,145 @@
+from debug import DEBUG_PRINT
+from error_codes import ErrorCodes
+
+import os
+import sys
+
+# environment variable with the cache directory when --cache isn't given
+CACHE_ENVIRONMENT_VARIABLE = "IPP_CACHE_DIR"
+# default size limit of the cache directory in MB
+CACHE_SIZE = 64
+# changed whenever the cached image or the instruction classes change,
+# so images written by an older interpreter are never loaded
+CACHE_VERSION = b"ippcode23-image-1"
+CACHE_SUFFIX = ".image"
+
+
+# ProgramCache stores the linked program (instructions after loading, verifying
+# and linking) under the SHA-256 of the source, the least recently used
+# images are removed when the directory is over its size limit,
+# the images are pickles so the cache directory must be trusted,
+# the modules of the cache are imported only when a cache is used
+class ProgramCache:
+    def __init__(self, directory: str, max_size: int = CACHE_SIZE):
+        self._directory = directory
+        self._max_bytes = max_size * 1024 * 1024
+        os.makedirs(directory, exist_ok=True)
+
+    # cache from --cache or from the environment variable, None if neither is set,
+    # exit with error if the --cache directory can't be created, a bad directory
+    # from the environment only prints a warning and the program runs without the cache
+    @staticmethod
+    def open(directory: str = None, max_size: int = None) -> "ProgramCache":
+        from_environment = directory is None
+        if from_environment:
+            directory = os.environ.get(CACHE_ENVIRONMENT_VARIABLE)
+        if not directory:
+            return None
+
+        try:
+            return ProgramCache(directory, CACHE_SIZE if max_size is None else max_size)
+        except OSError as e:
+            if from_environment:
+                print(f"Running without the program cache from ${CACHE_ENVIRONMENT_VARIABLE}: {e}", file=sys.stderr)
+                return None
+
+            print(e, file=sys.stderr)
+            sys.exit(ErrorCodes.OutputFileError)
+
+    @staticmethod
+    def key(source: bytes) -> str:
+        import hashlib
+        return hashlib.sha256(CACHE_VERSION + source).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key + CACHE_SUFFIX)
+
+    # return the cached image or None, a hit makes the image the most recently used
+    def load(self, key: str):
+        import pickle
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                image = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # broken image is treated as a miss and written again
+            DEBUG_PRINT(f"Broken cached program {path}: {e}")
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return image
+
+    # write the image atomically so other runs never see a partial file
+    def store(self, key: str, image) -> None:
+        import pickle
+        import tempfile
+
+        try:
+            descriptor, temporary_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as file:
+                pickle.dump(image, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, self._path(key))
+        except OSError as e:
+            # the program still runs without the cache
+            DEBUG_PRINT(f"Can't write cached program: {e}")
+            return
+
+        self._evict()
+
+    # remove the least recently used images until the cache fits its size limit
+    def _evict(self) -> None:
+        images = []
+        total_size = 0
+        for entry in os.scandir(self._directory):
+            if not entry.name.endswith(CACHE_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            images.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+        images.sort()
+        for _, size, path in images:
+            if total_size <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+
+
+# default number of linked programs kept by a process which runs many of them
+MEMORY_CACHE_SIZE = 256
+
+
+# MemoryProgramCache keeps the linked programs of one process under the same keys
+# as ProgramCache, a program which is run again skips loading and linking without
+# reading anything from the disk, the instructions only keep their operands
+# so one image can be run any number of times
+class MemoryProgramCache:
+    def __init__(self, max_images: int = MEMORY_CACHE_SIZE):
+        self._images = {}
+        self._max_images = max_images
+
+    # return the image or None, a hit makes the image the most recently used
+    def load(self, key: str):
+        image = self._images.pop(key, None)
+        if image is not None:
+            self._images[key] = image
+        return image
+
+    # the least recently used image is dropped when there are too many
+    def store(self, key: str, image) -> None:
+        self._images.pop(key, None)
+        self._images[key] = image
+        if len(self._images) > self._max_images:
+            del self._images[next(iter(self._images))]
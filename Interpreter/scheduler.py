@@ -0,0 +1,288 @@
+from input_handler import InputHandler
+from input_reader import ChunkedInputReader
+from output import OutputBuffer
+from context import ExecutionContext
+from interpreter import Interpreter
+from program_cache import MemoryProgramCache
+from interpret import load_image
+from server import REQUEST_SOURCE
+
+import collections
+import io
+import sys
+import time
+
+# ///--------- GREEN THREADS -------\\\\\\
+#
+# the Scheduler runs many programs in one thread, each in its own execution
+# context, the programs which are ready take turns of QUANTUM instructions,
+# a program which wants to READ a line that wasn't fed yet is parked
+# until the line or the end of its input comes, then it gets the next turn
+#
+#   scheduler = Scheduler()
+#   program = scheduler.add(source, budget=10 ** 6)
+#   program.feed(b"5\n")
+#   scheduler.run()          # returns when every program is finished or parked
+#   program.close_input()
+#   scheduler.run()
+#   program.exit_code, program.output.getvalue(), scheduler.get_statistics()
+#
+# the programs run on the tree engine, the only one which can stop between
+# any two instructions
+
+# number of instructions of one turn
+QUANTUM = 1000
+
+# return code of a program with options it can't run with
+BAD_OPTION = 10
+
+READY = "ready"
+BLOCKED = "blocked"
+FINISHED = "finished"
+
+
+# input of a program fed by whoever talks to it, READ never waits for more input,
+# the scheduler runs READ only when a whole line or the end of the input is there
+class ProgramInput(ChunkedInputReader):
+    def __init__(self):
+        super().__init__(None)
+        self.closed = False
+
+    def feed(self, data: bytes) -> None:
+        # drop the lines which were already read
+        del self._buffer[:self._position]
+        self._position = 0
+        self._buffer += data
+
+    def close(self) -> None:
+        self.closed = True
+
+    def _fill(self) -> bool:
+        if self.closed:
+            self._eof = True
+        return False
+
+    def line_ready(self) -> bool:
+        return self.closed or self._buffer.find(b"\n", self._position) != -1
+
+
+# one program of the scheduler with its execution context and statistics
+class GreenProgram:
+    def __init__(self, scheduler: "Scheduler", name: str, output: io.RawIOBase, budget: int):
+        self.name = name
+        # stream the program writes to, a BytesIO if none was given
+        self.output = output
+        # number of instructions the program may execute, None for no limit
+        self.budget = budget
+        self.state = READY
+        # None while the program runs and when it used its whole budget
+        self.exit_code = None
+        self.budget_exhausted = False
+
+        self.input = ProgramInput()
+        self.context = ExecutionContext(self.input, OutputBuffer(output))
+        self._scheduler = scheduler
+        self._instructions = []
+
+        # statistics
+        self.instructions = 0
+        self.turns = 0
+        # time spent ready (waiting for a turn and running) and parked
+        self.ready_time = 0.0
+        self.blocked_time = 0.0
+        # time the program waited in the queue for its turns, the longest wait
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self._since = time.perf_counter()
+
+    # give the program more input, a parked program waiting for it gets ready
+    def feed(self, data: bytes) -> None:
+        self.input.feed(data)
+        self._scheduler._wake(self)
+
+    # end the input, READ gets nil after the fed lines
+    def close_input(self) -> None:
+        self.input.close()
+        self._scheduler._wake(self)
+
+    def get_statistics(self) -> dict:
+        return {"name": self.name,
+                "state": self.state,
+                "exit_code": self.exit_code,
+                "budget_exhausted": self.budget_exhausted,
+                "instructions": self.instructions,
+                "turns": self.turns,
+                "ready_time": round(self.ready_time, 6),
+                "blocked_time": round(self.blocked_time, 6),
+                "wait_time": round(self.wait_time, 6),
+                "max_wait": round(self.max_wait, 6)}
+
+
+# Jain's fairness index of the values, 1 when all are equal, 1 / n when one gets everything
+def fairness_index(values: list[float]) -> float:
+    if not values or not any(values):
+        return 1.0
+
+    return sum(values) ** 2 / (len(values) * sum(value * value for value in values))
+
+
+class Scheduler:
+    def __init__(self, quantum: int = QUANTUM, memory_cache: MemoryProgramCache = None):
+        self.quantum = quantum
+        self.programs: list[GreenProgram] = []
+        self._ready = collections.deque()
+        # programs repeated by the tenants are loaded and linked only once
+        self._memory_cache = MemoryProgramCache() if memory_cache is None else memory_cache
+
+    # add a program (XML or bytecode) with the command line options in args,
+    # input_data is its whole input, without it the input is given with feed,
+    # a program which can't be loaded is finished right away with its return code
+    def add(self, program: bytes, input_data: bytes = None, args: list[str] = None, budget: int = None,
+            output: io.RawIOBase = None, name: str = None) -> GreenProgram:
+        green = GreenProgram(self, str(len(self.programs)) if name is None else name,
+                             io.BytesIO() if output is None else output, budget)
+        self.programs.append(green)
+        if input_data is not None:
+            green.input.feed(input_data)
+            green.input.close()
+
+        try:
+            inpt = InputHandler()
+            inpt.parse_arguments(list(args or []) + [f"--source={REQUEST_SOURCE}"])
+            if inpt.args["engine"] != "tree":
+                print(f"Green threads can't run on the {inpt.args['engine']} engine", file=sys.stderr)
+                green.exit_code = BAD_OPTION
+                self._finish(green)
+                return green
+
+            inpt.input_file = "stdin"
+            # bytecode is recognised by peeking at the source
+            inpt.source_file = io.BufferedReader(io.BytesIO(program))
+            image = load_image(inpt, self._memory_cache)
+
+            if inpt.args["frame_pool"] is not None:
+                green.context.memory.set_frame_pool_cap(inpt.args["frame_pool"])
+            # the interpreter lays out the frames, the scheduler runs its instructions
+            Interpreter(None, image=image, context=green.context)
+            green._instructions = image["instructions"]
+
+        except SystemExit as e:
+            self._finish(green, e)
+            return green
+
+        self._ready.append(green)
+        return green
+
+    # run the ready programs until all programs are finished or parked
+    def run(self) -> None:
+        # the programs wait for their turns only while the scheduler runs
+        now = time.perf_counter()
+        for program in self._ready:
+            program._since = now
+
+        while self._ready:
+            program = self._ready.popleft()
+            self._run_turn(program)
+
+    def get_statistics(self) -> dict:
+        programs = [program.get_statistics() for program in self.programs]
+        # instructions per second of the time the programs wanted to run
+        rates = [program.instructions / program.ready_time for program in self.programs if program.ready_time > 0]
+        waits = [program.max_wait for program in self.programs]
+        return {"programs": programs,
+                "turns": sum(program.turns for program in self.programs),
+                "instructions": sum(program.instructions for program in self.programs),
+                "max_wait": round(max(waits, default=0.0), 6),
+                "fairness": round(fairness_index(rates), 6)}
+
+    # a parked program continues when its line or the end of its input comes
+    def _wake(self, program: GreenProgram) -> None:
+        if program.state == BLOCKED and program.input.line_ready():
+            now = time.perf_counter()
+            program.blocked_time += now - program._since
+            program._since = now
+            program.state = READY
+            # a program which got its input goes first, interactive programs
+            # answer quickly and a busy one waits at most for them
+            self._ready.appendleft(program)
+
+    def _finish(self, program: GreenProgram, e: SystemExit = None) -> None:
+        if e is not None:
+            if e.code is None or isinstance(e.code, int):
+                program.exit_code = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                program.exit_code = 1
+
+        program.state = FINISHED
+        program.context.output_stream.flush()
+
+    # run one turn of at most quantum instructions of the program
+    def _run_turn(self, program: GreenProgram) -> None:
+        start = time.perf_counter()
+        wait = start - program._since
+        program.wait_time += wait
+        if wait > program.max_wait:
+            program.max_wait = wait
+        program.turns += 1
+
+        steps = self.quantum
+        if program.budget is not None:
+            steps = min(steps, program.budget - program.instructions)
+
+        context = program.context
+        instructions = program._instructions
+        num_instructions = len(instructions)
+        executed = 0
+        state = READY
+        try:
+            while executed < steps:
+                if context.instruction_index >= num_instructions:
+                    program.exit_code = 0
+                    state = FINISHED
+                    break
+
+                instruction = instructions[context.instruction_index]
+                # park before READ until the line is there
+                if instruction.opcode == "READ" and not program.input.line_ready():
+                    state = BLOCKED
+                    break
+
+                next_index = instruction.execute(context)
+                if next_index is None:
+                    context.instruction_index += 1
+                else:
+                    context.instruction_index = next_index
+                executed += 1
+
+        # errors and EXIT finish the program with their return code like they end the process
+        except SystemExit as e:
+            executed += 1
+            program.instructions += executed
+            self._finish(program, e)
+            self._end_turn(program)
+            return
+
+        program.instructions += executed
+        if state == READY and program.budget is not None and program.instructions >= program.budget:
+            if context.instruction_index >= num_instructions:
+                program.exit_code = 0
+            else:
+                program.budget_exhausted = True
+            state = FINISHED
+
+        if state == FINISHED:
+            self._finish(program)
+        elif state == BLOCKED:
+            # the one who feeds the input sees everything written before
+            context.output_stream.flush()
+            program.state = BLOCKED
+        else:
+            self._ready.append(program)
+        self._end_turn(program)
+
+    # the program was ready since it was queued
+    def _end_turn(self, program: GreenProgram) -> None:
+        now = time.perf_counter()
+        program.ready_time += now - program._since
+        program._since = now
@@ -0,0 +1,215 @@
+from input_handler import InputHandler
+from input_reader import ChunkedInputReader
+from output import OutputBuffer
+from interpret import run_program
+from program_cache import MemoryProgramCache
+
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+import traceback
+
+# ///--------- PROTOCOL -------\\\\\\
+#
+# every message is its length (u32, little endian) and the bytes,
+# a request is three messages:
+#   header    json {"args": [...], "timeout": seconds, "max_output": bytes}
+#   program   XML or bytecode
+#   input     bytes read by READ
+# and a reply is three messages:
+#   header    json {"exit_code": n, "timed_out": bool, "output_truncated": bool}
+#   stdout    bytes written by the program
+#   stderr    utf-8 text from DPRINT, BREAK, --stats and errors
+#
+# exit_code is null when the program was stopped by one of the limits
+
+length_struct = struct.Struct("<I")
+
+# --source the arguments of a request are parsed with, the program is in the request
+REQUEST_SOURCE = "<request>"
+
+
+def write_message(stream, data: bytes) -> None:
+    stream.write(length_struct.pack(len(data)))
+    stream.write(data)
+
+
+# return the next message, None at the end of the stream
+def read_message(stream) -> bytes:
+    header = stream.read(length_struct.size)
+    if not header:
+        return None
+
+    if len(header) < length_struct.size:
+        raise EOFError("Truncated message")
+
+    length, = length_struct.unpack(header)
+    data = stream.read(length)
+    if len(data) < length:
+        raise EOFError("Truncated message")
+
+    return data
+
+
+# ///--------- LIMITS -------\\\\\\
+
+# the limits aren't Exceptions so the interpreter can't catch them by accident
+class TimeLimitExceeded(BaseException):
+    pass
+
+
+class OutputLimitExceeded(BaseException):
+    pass
+
+
+def _time_limit_exceeded(signal_number, frame):
+    raise TimeLimitExceeded()
+
+
+# SIGTERM stops the server between or during requests
+class ServerStopped(BaseException):
+    pass
+
+
+def _stop_server(signal_number, frame):
+    raise ServerStopped()
+
+
+# output of a program, writing over the limit stops the program
+# and everything written after that is dropped
+class LimitedOutput(io.BytesIO):
+    def __init__(self, max_size: int = None):
+        super().__init__()
+        self._max_size = max_size
+        self.exceeded = False
+
+    def write(self, data) -> int:
+        if self.exceeded:
+            return len(data)
+
+        if self._max_size is not None and self.tell() + len(data) > self._max_size:
+            super().write(data[:self._max_size - self.tell()])
+            self.exceeded = True
+            raise OutputLimitExceeded()
+
+        return super().write(data)
+
+
+# ///--------- SERVER -------\\\\\\
+
+# run one program in this process, run_program gives it its own execution context
+def handle_request(header: dict, program: bytes, input_data: bytes,
+                   memory_cache: MemoryProgramCache = None) -> tuple[dict, bytes, bytes]:
+    stdout = LimitedOutput(header.get("max_output"))
+    # text printed directly (help, messages of errors) goes before the output like on a terminal
+    printed = io.StringIO()
+    stderr = io.StringIO()
+    reply = {"exit_code": 0, "timed_out": False, "output_truncated": False}
+
+    timeout = header.get("timeout")
+    with contextlib.redirect_stdout(printed), contextlib.redirect_stderr(stderr):
+        try:
+            try:
+                if timeout:
+                    signal.signal(signal.SIGALRM, _time_limit_exceeded)
+                    signal.setitimer(signal.ITIMER_REAL, timeout)
+
+                inpt = InputHandler()
+                inpt.parse_arguments(list(header.get("args", [])) + [f"--source={REQUEST_SOURCE}"])
+                inpt.input_file = "stdin"
+                # bytecode is recognised by peeking at the source
+                inpt.source_file = io.BufferedReader(io.BytesIO(program))
+                reply["exit_code"] = run_program(inpt, ChunkedInputReader(io.BytesIO(input_data)),
+                                                 OutputBuffer(stdout), memory_cache)
+
+            # the timer is disarmed before the handlers below, an alarm which goes
+            # off right at the end of the program is caught as TimeLimitExceeded there
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                reply["exit_code"] = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                reply["exit_code"] = 1
+
+        except TimeLimitExceeded:
+            reply["exit_code"] = None
+            reply["timed_out"] = True
+
+        except OutputLimitExceeded:
+            reply["exit_code"] = None
+            reply["output_truncated"] = True
+
+        # a crash of the interpreter doesn't stop the server
+        except Exception:
+            traceback.print_exc()
+            reply["exit_code"] = 1
+
+    output = printed.getvalue().encode("utf-8") + stdout.getvalue()
+    return reply, output, stderr.getvalue().encode("utf-8")
+
+
+# answer the requests until the client closes the stream, programs
+# sent again are taken linked from the memory cache
+def _serve_stream(reader, writer, memory_cache: MemoryProgramCache) -> None:
+    while True:
+        header = read_message(reader)
+        if header is None:
+            return
+
+        program = read_message(reader)
+        input_data = read_message(reader)
+        if program is None or input_data is None:
+            raise EOFError("Truncated request")
+
+        reply, stdout, stderr = handle_request(json.loads(header), program, input_data, memory_cache)
+        write_message(writer, json.dumps(reply).encode("utf-8"))
+        write_message(writer, stdout)
+        write_message(writer, stderr)
+        writer.flush()
+
+
+# serve requests from stdin ("-") or from the clients of the Unix socket one at a time
+def serve(address: str) -> int:
+    signal.signal(signal.SIGTERM, _stop_server)
+    try:
+        _serve(address)
+    except (ServerStopped, KeyboardInterrupt):
+        pass
+
+    return 0
+
+
+def _serve(address: str) -> None:
+    # one cache for all clients of the server
+    memory_cache = MemoryProgramCache()
+    if address == "-":
+        _serve_stream(sys.stdin.buffer, sys.stdout.buffer, memory_cache)
+        return
+
+    # socket left by a server which didn't end cleanly
+    if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+        os.remove(address)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(address)
+        listener.listen()
+        try:
+            while True:
+                connection, _ = listener.accept()
+                with connection, connection.makefile("rb") as reader, connection.makefile("wb") as writer:
+                    try:
+                        _serve_stream(reader, writer, memory_cache)
+                    # a client which disconnects in the middle of a request
+                    except (EOFError, ConnectionError):
+                        pass
+        finally:
+            os.remove(address)
@@ -1,10 +1,18 @@
 import os
 import glob
 import argparse
+import asyncio
+import contextlib
+import io
 import subprocess
 import multiprocessing
 import difflib
+import json
 import os
+import shutil
+import socket
+import sys
+import tempfile
 
 from collections import defaultdict
 
@@ -20,6 +28,14 @@ parser = argparse.ArgumentParser()
 parser.add_argument("--verbose", "--v", default="1")
 parser.add_argument("--return_code_only", "--rco", default="0")
 parser.add_argument("--run_only")
+parser.add_argument("--test_dir", default=TEST_DIR)
+parser.add_argument("--engine", default="tree")
+parser.add_argument("--python", default="py")
+# fail tests whose peak resident memory is over the limit (in MB), needs os.wait4
+parser.add_argument("--max_rss", type=int)
+# run the tests through one of the other ways of running a program
+parser.add_argument("--mode", default="run", choices=["run", "cache", "bytecode", "serve", "batch", "inputs", "lockstep",
+                                                      "sessions", "scheduler"])
 
 
 
@@ -46,6 +62,10 @@ class Test():
         self.passed = True
         self.return_code_passed = True
         self.diff = ""
+        # peak resident memory in kB, only measured with --max_rss
+        self.max_rss = None
+        # what the mode found wrong besides the output and the return code
+        self.problems = []
 
     def check_if_passed(self):
         diff = difflib.unified_diff([line.strip() for line in self.stdout.splitlines()], [line.strip() for line in
@@ -58,6 +78,14 @@ class Test():
             self.diff = diff
             self.passed = False
 
+        if args.max_rss is not None and self.max_rss > args.max_rss * 1024:
+            self.diff += f"\nPeak memory {self.max_rss} kB is over the limit of {args.max_rss} MB"
+            self.passed = False
+
+        for problem in self.problems:
+            self.diff += f"\n{problem}"
+            self.passed = False
+
     def print_test(self):
         num_dir_tests = num_files[self.dirname]
         if self.stderr and args.verbose:
@@ -124,22 +152,38 @@ class Test():
 
         print("---------------------------------")
 
-def run_program(file_name: str, num_test: int) -> Test:
-    command = f"py interpret.py --source={file_name}.src --input={file_name}.in"
-    # now without source
+# run the command and measure its peak resident memory,
+# returns (stdout, stderr, return code, max rss in kB)
+def run_measured(command: str, input_file_name: str) -> tuple[str, str, int, int]:
+    with open(input_file_name) as stdin, tempfile.TemporaryFile() as stdout, \
+            tempfile.TemporaryFile() as stderr:
+        program = subprocess.Popen(command, stdin=stdin, stdout=stdout, stderr=stderr, shell=True)
+        _, status, usage = os.wait4(program.pid, 0)
+        program.returncode = os.waitstatus_to_exitcode(status)
 
-    command = f"py interpret.py --input={file_name}.in"
-    
-    with open(f'{file_name}.src') as file:
-        inpt = file.read().split('\n')
+        stdout.seek(0)
+        stderr.seek(0)
+        return (stdout.read().decode("utf-8"), stderr.read().decode("utf-8"),
+                program.returncode, usage.ru_maxrss)
 
+
+# run the command with the text on stdin, returns (stdout, stderr, return code)
+def run_command(command: str, input_text: str = "") -> tuple[str, str, int]:
     program = subprocess.run(command,
-                             input="\n".join([x for x in inpt]),
+                             input=input_text,
                              stdout=subprocess.PIPE,
                              stderr=subprocess.PIPE,
                              encoding="utf-8",
                              shell=True)
+    return program.stdout, program.stderr, program.returncode
+
+
+def interpret_command(options: str) -> str:
+    return f"{args.python} interpret.py {options} --engine={args.engine}"
 
+
+# (expected output, expected return codes) of the test
+def read_expected(file_name: str) -> tuple[str, list[int]]:
     if not os.path.exists(f"{file_name}.out"):
         expected_output = ""
     else:
@@ -149,6 +193,358 @@ def run_program(file_name: str, num_test: int) -> Test:
     with open(f"{file_name}.rc", "r") as file:
         expected_rc = list(map(int, file.read().split(",")))
 
+    return expected_output, expected_rc
+
+
+def read_source(file_name: str) -> str:
+    with open(f'{file_name}.src') as file:
+        inpt = file.read().split('\n')
+
+    return "\n".join([x for x in inpt])
+
+
+# ///--------- MODES -------\\\\\\
+#
+# every mode runs the program of the test and returns
+# (stdout, stderr, return code, problems found on the way)
+
+def run_default(file_name: str) -> tuple[str, str, int, list[str]]:
+    command = f"py interpret.py --source={file_name}.src --input={file_name}.in"
+    # now without source
+
+    command = interpret_command(f"--input={file_name}.in")
+    return (*run_command(command, read_source(file_name)), [])
+
+
+# names and inodes of the images in the cache directory
+def cached_images(directory: str) -> dict:
+    if not os.path.isdir(directory):
+        return {}
+
+    return {entry.name: entry.inode() for entry in os.scandir(directory) if entry.name.endswith(".image")}
+
+
+# the first run stores the linked program, the second one must load it
+# without storing it again and a run with a cache of size 0 evicts its image
+def run_cache(file_name: str) -> tuple[str, str, int, list[str]]:
+    cache_dir = os.path.join(work_dir, "cache")
+    command = interpret_command(f"--input={file_name}.in --cache={cache_dir}")
+    source = read_source(file_name)
+    problems = []
+
+    stdout, _, return_code = run_command(command, source)
+    images = cached_images(cache_dir)
+    result = run_command(command, source)
+    if result[0] != stdout or result[2] != return_code:
+        problems.append("Run with the cached program differs from the first run")
+    if cached_images(cache_dir) != images:
+        problems.append("Second run didn't load the program from the cache")
+
+    evicted_dir = os.path.join(work_dir, "evicted")
+    stdout, _, return_code = run_command(interpret_command(f"--input={file_name}.in --cache={evicted_dir} --cache_size=0"),
+                                         source)
+    if result[0] != stdout or result[2] != return_code:
+        problems.append("Run with a cache of size 0 differs from the first run")
+    if cached_images(evicted_dir):
+        problems.append("Cache of size 0 kept an image")
+
+    return (*result, problems)
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+# the program is compiled by ippc.py, which fails with the return codes of loading,
+# the bytecode compiled again from the bytecode must be the same and the bytecode is run
+def run_bytecode(file_name: str) -> tuple[str, str, int, list[str]]:
+    bytecode = os.path.join(work_dir, "program.ippc")
+    stdout, stderr, return_code = run_command(f"{args.python} ippc.py {file_name}.src -o {bytecode}")
+    if return_code != 0:
+        return stdout, stderr, return_code, []
+
+    problems = []
+    again = os.path.join(work_dir, "again.ippc")
+    if run_command(f"{args.python} ippc.py {bytecode} -o {again}")[2] != 0 or read_bytes(bytecode) != read_bytes(again):
+        problems.append("Bytecode compiled from the bytecode differs")
+    if run_command(f"{args.python} ippc.py --disassemble {bytecode}")[2] != 0:
+        problems.append("Bytecode can't be disassembled")
+
+    return (*run_command(interpret_command(f"--source={bytecode} --input={file_name}.in")), problems)
+
+
+# one server started by the first test runs all of them, every program is sent twice,
+# the second time it's run from the memory cache of the server
+client = None
+
+
+def run_serve(file_name: str) -> tuple[str, str, int, list[str]]:
+    global client
+    if client is None:
+        from client import InterpreterClient
+        client = InterpreterClient(python=args.python)
+
+    program = read_bytes(f"{file_name}.src")
+    input_data = read_bytes(f"{file_name}.in")
+    problems = []
+    replies = [client.run(program, input_data, args=[f"--engine={args.engine}"]) for _ in range(2)]
+    if replies[0].stdout != replies[1].stdout or replies[0].exit_code != replies[1].exit_code:
+        problems.append("Program sent again to the server gives another result")
+
+    reply = replies[1]
+    return reply.stdout.decode("utf-8"), reply.stderr, reply.exit_code, problems
+
+
+# results of the tests of a directory run all at once by run_batch_dir
+batch_results = {}
+
+
+# one --batch runs the tests of the directory, every test is in the manifest twice,
+# with an output file and with the output in its result, the second one is run from
+# the memory cache of the batch, a bad line before them must not stop the batch
+def run_batch_dir(files: list[str]) -> None:
+    manifest = os.path.join(work_dir, "manifest.jsonl")
+    results = os.path.join(work_dir, "results.jsonl")
+    with open(manifest, "w") as file:
+        file.write("not a job\n")
+        for number, file_name in enumerate(files):
+            job = {"source": os.path.relpath(f"{file_name}.src", work_dir),
+                   "input": os.path.relpath(f"{file_name}.in", work_dir)}
+            file.write(json.dumps(dict(job, output=f"{number}.out")) + "\n")
+            file.write(json.dumps(job) + "\n")
+
+    _, stderr, return_code = run_command(interpret_command(f"--batch={manifest} --results={results}"))
+    problems = [] if return_code == 0 else [f"Batch failed with {return_code}: {stderr}"]
+    with open(results) as file:
+        lines = [json.loads(line) for line in file]
+    if lines[0]["exit_code"] != 10:
+        problems.append(f"Bad line of the manifest gave {lines[0]}")
+
+    for number, file_name in enumerate(files):
+        to_file, to_result = lines[1 + 2 * number:3 + 2 * number]
+        test_problems = list(problems)
+        stdout = read_bytes(os.path.join(work_dir, to_file["output"])).decode("utf-8")
+        if stdout != to_result["stdout"] or to_file["exit_code"] != to_result["exit_code"]:
+            test_problems.append("Job with an output file gives another result than the job without it")
+        batch_results[file_name] = (to_result["stdout"], to_result["stderr"], to_result["exit_code"], test_problems)
+
+
+def run_batch(file_name: str) -> tuple[str, str, int, list[str]]:
+    return batch_results.pop(file_name)
+
+
+# the test name.src can have more inputs name.1.in, name.2.in, ... with their
+# own name.1.out and name.1.rc, only the modes which run many inputs run them
+def input_lanes(file_name: str) -> list[str]:
+    lanes = [file_name]
+    while os.path.exists(f"{file_name}.{len(lanes)}.in"):
+        lanes.append(f"{file_name}.{len(lanes)}")
+    return lanes
+
+
+# run the program of the test for its input and its other inputs with --inputs_glob,
+# the results of the other inputs are checked here
+def run_inputs_glob(file_name: str, options: str = "") -> tuple[str, str, int, list[str]]:
+    inputs_dir = os.path.join(work_dir, "inputs")
+    outputs_dir = os.path.join(work_dir, "outputs")
+    results = os.path.join(work_dir, "results.jsonl")
+    for directory in [inputs_dir, outputs_dir]:
+        shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(inputs_dir)
+
+    lanes = input_lanes(file_name)
+    for number, lane in enumerate(lanes):
+        shutil.copy(f"{lane}.in", os.path.join(inputs_dir, f"{number:03}.in"))
+
+    stdout, stderr, return_code = run_command(interpret_command(
+        f"--source={file_name}.src --inputs_glob={inputs_dir}/*.in --output_dir={outputs_dir} "
+        f"--results={results} --jobs=2 {options}"))
+    # a program which can't be loaded fails before any input is run
+    if return_code != 0:
+        return stdout, stderr, return_code, []
+
+    with open(results) as file:
+        lines = [json.loads(line) for line in file]
+
+    problems = []
+    for lane, line in zip(lanes[1:], lines[1:]):
+        output = read_bytes(line["output"]).decode("utf-8")
+        expected_output, expected_rc = read_expected(lane)
+        if line["exit_code"] not in expected_rc or \
+                [x.strip() for x in output.splitlines()] != [x.strip() for x in expected_output.splitlines()]:
+            problems.append(f"Input {lane}.in gave return code {line['exit_code']} and output {output!r}")
+
+    return read_bytes(lines[0]["output"]).decode("utf-8"), lines[0]["stderr"], lines[0]["exit_code"], problems
+
+
+# all inputs of the test run at once on the lock step engine, the lanes
+# of the tests in interpret_tests/lanes go different ways
+def run_lockstep(file_name: str) -> tuple[str, str, int, list[str]]:
+    return run_inputs_glob(file_name, f"--lockstep={len(input_lanes(file_name))}")
+
+
+# every test is an asyncio session of async_interpreter run in this process on the tree
+# engine, one after another, the sessions which ended with an error must not close sys.stdin
+def run_session(file_name: str) -> tuple[str, str, int, list[str]]:
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        stdout, return_code = asyncio.run(session(file_name))
+
+    problems = []
+    if sys.stdin is not None and sys.stdin.closed:
+        problems.append("A session closed sys.stdin")
+    return stdout.decode("utf-8"), stderr.getvalue(), return_code, problems
+
+
+# (output, return code) of the program of the test run as a session over a socket pair
+async def session(file_name: str) -> tuple[bytes, int]:
+    from async_interpreter import run_program
+
+    server_socket, client_socket = socket.socketpair()
+    reader, writer = await asyncio.open_connection(sock=server_socket)
+    client_reader, client_writer = await asyncio.open_connection(sock=client_socket)
+
+    async def client() -> bytes:
+        client_writer.write(read_bytes(f"{file_name}.in"))
+        await client_writer.drain()
+        client_writer.write_eof()
+        return await client_reader.read()
+
+    output = asyncio.create_task(client())
+    return_code = await run_program(read_bytes(f"{file_name}.src"), reader, writer)
+    writer.close()
+    stdout = await output
+    client_writer.close()
+    return stdout, return_code
+
+
+# results of the tests of a directory run all at once by run_scheduler_dir
+scheduler_results = {}
+
+SCHEDULER_QUANTUM = 50
+
+# counts to 1000 without reading anything
+SPIN_PROGRAM = b"""<?xml version="1.0" encoding="UTF-8"?>
+<program language="IPPcode23">
+    <instruction order="1" opcode="DEFVAR"><arg1 type="var">GF@i</arg1></instruction>
+    <instruction order="2" opcode="MOVE"><arg1 type="var">GF@i</arg1><arg2 type="int">0</arg2></instruction>
+    <instruction order="3" opcode="LABEL"><arg1 type="label">loop</arg1></instruction>
+    <instruction order="4" opcode="ADD"><arg1 type="var">GF@i</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">1</arg3></instruction>
+    <instruction order="5" opcode="JUMPIFNEQ"><arg1 type="label">loop</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">1000</arg3></instruction>
+</program>
+"""
+
+
+# the tests of the directory are green programs of one scheduler (on the tree engine)
+# which get their input line by line, a program is parked at READ until its line
+# is fed and woken by the line or by the end of the input, every test is then
+# run again with a budget of the instructions it needed, which must be enough,
+# and with one instruction less, which must exhaust the budget
+def run_scheduler_dir(files: list[str]) -> None:
+    from scheduler import Scheduler, READY, BLOCKED, FINISHED, fairness_index
+
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        scheduler = Scheduler(SCHEDULER_QUANTUM)
+        programs = [scheduler.add(read_bytes(f"{file_name}.src")) for file_name in files]
+        spinners = [scheduler.add(SPIN_PROGRAM, b"") for _ in range(3)]
+        bad_option = scheduler.add(SPIN_PROGRAM, b"", args=["--engine=closure"])
+        inputs = [read_bytes(f"{file_name}.in").splitlines(keepends=True) for file_name in files]
+        problems = {file_name: [] for file_name in files}
+
+        def check_parked() -> None:
+            for file_name, program in zip(files, programs):
+                if program.state not in [BLOCKED, FINISHED]:
+                    problems[file_name].append(f"Program is {program.state} after the scheduler ran")
+
+        scheduler.run()
+        check_parked()
+        for number in range(max(map(len, inputs), default=0)):
+            for file_name, program, lines in zip(files, programs, inputs):
+                if number < len(lines):
+                    blocked = program.state == BLOCKED
+                    program.feed(lines[number])
+                    if blocked and lines[number].endswith(b"\n") and program.state != READY:
+                        problems[file_name].append("Fed line didn't wake the parked program")
+            scheduler.run()
+            check_parked()
+
+        for file_name, program in zip(files, programs):
+            blocked = program.state == BLOCKED
+            program.close_input()
+            if blocked and program.state != READY:
+                problems[file_name].append("End of the input didn't wake the parked program")
+        scheduler.run()
+
+        statistics = scheduler.get_statistics()
+        common_problems = []
+        for spinner in spinners:
+            if spinner.exit_code != 0 or spinner.turns != -(-spinner.instructions // SCHEDULER_QUANTUM):
+                common_problems.append(f"Program which never reads took {spinner.turns} turns "
+                                       f"for {spinner.instructions} instructions")
+        if bad_option.state != FINISHED or bad_option.exit_code != 10:
+            common_problems.append(f"Program on the closure engine gave {bad_option.exit_code}")
+        if sys.stdin is not None and sys.stdin.closed:
+            common_problems.append("A program of the scheduler closed sys.stdin")
+        rates = [program.instructions / program.ready_time for program in scheduler.programs
+                 if program.ready_time > 0]
+        if abs(statistics["fairness"] - fairness_index(rates)) > 1e-3 or not 0 < statistics["fairness"] <= 1:
+            common_problems.append(f"Fairness {statistics['fairness']} doesn't match the programs")
+        if fairness_index([2.0, 2.0, 2.0]) != 1.0 or abs(fairness_index([3.0, 0.0, 0.0]) - 1 / 3) > 1e-9:
+            common_problems.append("Fairness index of known rates is wrong")
+        if statistics["instructions"] != sum(program.instructions for program in scheduler.programs):
+            common_problems.append("Instructions of the scheduler aren't the sum of its programs")
+
+        for file_name, program in zip(files, programs):
+            if program.state != FINISHED:
+                problems[file_name].append(f"Program is {program.state} after the end of its input")
+
+            needed = program.instructions
+            for budget in [needed, needed - 1] if needed > 0 else []:
+                single = Scheduler(SCHEDULER_QUANTUM)
+                green = single.add(read_bytes(f"{file_name}.src"), read_bytes(f"{file_name}.in"), budget=budget)
+                single.run()
+                if budget == needed and (green.budget_exhausted or green.exit_code != program.exit_code
+                                         or green.output.getvalue() != program.output.getvalue()):
+                    problems[file_name].append(f"Budget of {budget} needed instructions wasn't enough")
+                if budget < needed and not (green.budget_exhausted and green.exit_code is None
+                                            and green.instructions == budget):
+                    problems[file_name].append(f"Budget of {budget} instructions wasn't exhausted")
+
+    for file_name, program in zip(files, programs):
+        scheduler_results[file_name] = (program.output.getvalue().decode("utf-8"), "", program.exit_code,
+                                        common_problems + problems[file_name])
+
+
+def run_scheduler(file_name: str) -> tuple[str, str, int, list[str]]:
+    return scheduler_results.pop(file_name)
+
+
+modes = {"run": run_default, "cache": run_cache, "bytecode": run_bytecode, "serve": run_serve, "batch": run_batch,
+         "inputs": run_inputs_glob, "lockstep": run_lockstep, "sessions": run_session, "scheduler": run_scheduler}
+# modes which run all tests of a directory before their results are checked
+directory_modes = {"batch": run_batch_dir, "scheduler": run_scheduler_dir}
+
+# files written by the modes
+work_dir = tempfile.mkdtemp(prefix="ipp_test_")
+
+
+def run_program(file_name: str, num_test: int) -> Test:
+    max_rss = None
+    problems = []
+    if args.max_rss is not None:
+        command = interpret_command(f"--input={file_name}.in")
+        stdout, stderr, return_code, max_rss = run_measured(command, f"{file_name}.src")
+    else:
+        stdout, stderr, return_code, problems = modes[args.mode](file_name)
+
+    # a program stopped by a limit or a budget has no return code
+    if return_code is None:
+        return_code = -1
+
+    expected_output, expected_rc = read_expected(file_name)
+
     with open(f"{file_name}.src", "r") as file:
         src = file.read()
 
@@ -156,8 +552,10 @@ def run_program(file_name: str, num_test: int) -> Test:
 
     test = Test(directory, file_name,
                 expected_output, expected_rc,
-                program.stdout, program.stderr, program.returncode,
+                stdout, stderr, return_code,
                 src, num_test)
+    test.max_rss = max_rss
+    test.problems = problems
 
     return test
 
@@ -166,6 +564,8 @@ def test_dir(dirname: str) -> None:
     path = os.path.join(dirname, "*.src")
     files = list(map(lambda x: x.replace(".src", ""), list(glob.glob(path))))
     print(f"{BLUE} Runninng tests for {dirname} {BLACK}")
+    if args.mode in directory_modes:
+        directory_modes[args.mode](files)
     for num_test, file in enumerate(files):
         test = run_program(file, num_test + 1)
         test.check_if_passed()
@@ -173,10 +573,10 @@ def test_dir(dirname: str) -> None:
         test.print_test()
 
 num_files = {}
-for folder in glob.glob("./interpret_tests/*"):
+for folder in glob.glob(os.path.join(args.test_dir, "*")):
     num_files[folder.split('/')[-1]] = len(list(glob.glob(os.path.join(folder, "*.src"))))
 
-for folder in glob.glob("./interpret_tests/*"):
+for folder in glob.glob(os.path.join(args.test_dir, "*")):
     if args.run_only:
         if folder.split('/')[-1] == args.run_only:
             test_dir(folder)
@@ -197,3 +597,10 @@ for test_dir in test_dic.keys():
 # total = sum(1 for test in test_dic[test_dir] for test_dir in test_dic.keys())
 
 print(f"{YELLOW} Passed {passed}/{total} tests.{BLACK}")
+
+shutil.rmtree(work_dir, ignore_errors=True)
+if client is not None:
+    client.close()
+
+# non zero return code so the run can be used as a conformance check
+exit(0 if passed == total else 1)
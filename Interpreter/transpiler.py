@@ -0,0 +1,708 @@
+from input_handler import ArgumentType
+from input_handler import Argument
+from error_codes import ErrorCodes
+from debug import DEBUG_PRINT
+import instructions as InstructionsClass
+
+from collections.abc import Callable
+import sys
+
+
+# the transpiler turns the whole program into the source code of one python
+# function, every basic block is a branch of a "while True" state machine,
+# variables in the global frame are locals of that function and values are
+# native python values (int, float, bool, str, None for nil)
+
+
+# markers for variables which are not defined / defined but not initialized
+class _Missing:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+UNDEF = _Missing("UNDEF")
+UNSET = _Missing("UNSET")
+
+
+# ///--------- RUNTIME HELPERS USED BY THE GENERATED CODE -------\\\\\\
+
+def missing(value: _Missing, name: str) -> None:
+    if value is UNDEF:
+        DEBUG_PRINT(f"Variable {name} not defined")
+        sys.exit(ErrorCodes.VariableNotDefined)
+
+    DEBUG_PRINT(f"Variable {name} not initialized")
+    sys.exit(ErrorCodes.MissingValue)
+
+
+def redefined(name: str) -> None:
+    DEBUG_PRINT(f"Variable {name} already defined")
+    sys.exit(ErrorCodes.VariableRedefinition)
+
+
+def bad_type(operation: str) -> None:
+    DEBUG_PRINT(f"{operation} wrong datatype")
+    sys.exit(ErrorCodes.OperandTypeBad)
+
+
+def bad_string(operation: str) -> None:
+    DEBUG_PRINT(f"{operation} string error")
+    sys.exit(ErrorCodes.StringError)
+
+
+def _check_numeric(a, b, operation: str) -> None:
+    if type(a) is not type(b) or type(a) not in (int, float):
+        bad_type(operation)
+
+
+def add(a, b):
+    _check_numeric(a, b, "ADD")
+    return a + b
+
+
+def sub(a, b):
+    _check_numeric(a, b, "SUB")
+    return a - b
+
+
+def mul(a, b):
+    _check_numeric(a, b, "MUL")
+    return a * b
+
+
+def idiv(a, b):
+    if type(a) is not int or type(b) is not int:
+        bad_type("IDIV")
+
+    if b == 0:
+        DEBUG_PRINT("IDIV by zero")
+        sys.exit(ErrorCodes.OperandValueBad)
+
+    return a // b
+
+
+def div(a, b):
+    if type(a) is not float or type(b) is not float:
+        bad_type("DIV")
+
+    if b == 0:
+        DEBUG_PRINT("DIV by zero")
+        sys.exit(ErrorCodes.OperandValueBad)
+
+    return a / b
+
+
+def _check_comparable(a, b, operation: str) -> None:
+    if type(a) is not type(b) or type(a) not in (int, str, bool, float):
+        bad_type(operation)
+
+
+def lt(a, b):
+    _check_comparable(a, b, "LT")
+    return a < b
+
+
+def gt(a, b):
+    _check_comparable(a, b, "GT")
+    return a > b
+
+
+# nil can be compared with anything
+def eq(a, b):
+    if a is None or b is None:
+        return a is b
+
+    if type(a) is not type(b):
+        bad_type("EQ")
+
+    return a == b
+
+
+def and_(a, b):
+    if type(a) is not bool or type(b) is not bool:
+        bad_type("AND")
+
+    return a and b
+
+
+def or_(a, b):
+    if type(a) is not bool or type(b) is not bool:
+        bad_type("OR")
+
+    return a or b
+
+
+def not_(a):
+    if type(a) is not bool:
+        bad_type("NOT")
+
+    return not a
+
+
+def int2char(a):
+    if type(a) is not int:
+        bad_type("INT2CHAR")
+
+    try:
+        return chr(a)
+    except (ValueError, OverflowError):
+        bad_string("INT2CHAR")
+
+
+def stri2int(string, index):
+    if type(string) is not str or type(index) is not int:
+        bad_type("STRI2INT")
+
+    if index < 0 or index >= len(string):
+        bad_string("STRI2INT")
+
+    return ord(string[index])
+
+
+def int2float(a):
+    if type(a) is not int:
+        bad_type("INT2FLOAT")
+
+    return float(a)
+
+
+def float2int(a):
+    if type(a) is not float:
+        bad_type("FLOAT2INT")
+
+    try:
+        return int(a)
+    except (ValueError, OverflowError):
+        bad_type("FLOAT2INT")
+
+
+def concat(a, b):
+    if type(a) is not str or type(b) is not str:
+        bad_type("CONCAT")
+
+    return a + b
+
+
+def strlen(a):
+    if type(a) is not str:
+        bad_type("STRLEN")
+
+    return len(a)
+
+
+def getchar(string, index):
+    if type(string) is not str or type(index) is not int:
+        bad_type("GETCHAR")
+
+    if index < 0 or index >= len(string):
+        bad_string("GETCHAR")
+
+    return string[index]
+
+
+def setchar(string, index, char):
+    if type(string) is not str or type(index) is not int or type(char) is not str:
+        bad_type("SETCHAR")
+
+    if index < 0 or index >= len(string) or len(char) == 0:
+        bad_string("SETCHAR")
+
+    return string[:index] + char[0] + string[index + 1:]
+
+
+def type_name(a) -> str:
+    if a is UNSET:
+        return ""
+
+    return {int: "int", float: "float", bool: "bool",
+            str: "string", type(None): "nil"}[type(a)]
+
+
+def exit_(a) -> None:
+    if type(a) is not int or a < 0 or a > 49:
+        DEBUG_PRINT("Exit bad operand")
+        sys.exit(ErrorCodes.OperandValueBad)
+
+    sys.exit(a)
+
+
+# state which can't live in locals of the generated function
+class TranspiledRuntime:
+    def __init__(self, input_stream, output_stream):
+        self.input_stream = input_stream
+        self.output_stream = output_stream
+        self.temporary_frame = None
+        self.frame_stack = []
+        self.data_stack = []
+        self.call_stack = []
+
+    def create_frame(self) -> None:
+        self.temporary_frame = {}
+
+    def push_frame(self) -> None:
+        if self.temporary_frame is None:
+            DEBUG_PRINT("Temporary frame doesn't exist")
+            sys.exit(ErrorCodes.FrameNotDefined)
+
+        self.frame_stack.append(self.temporary_frame)
+        self.temporary_frame = None
+
+    def pop_frame(self) -> None:
+        if len(self.frame_stack) == 0:
+            DEBUG_PRINT("Local frame doesn't exist")
+            sys.exit(ErrorCodes.FrameNotDefined)
+
+        self.temporary_frame = self.frame_stack.pop()
+
+    def _local_frame(self) -> dict:
+        if len(self.frame_stack) == 0:
+            DEBUG_PRINT("Local frame doesn't exist")
+            sys.exit(ErrorCodes.FrameNotDefined)
+
+        return self.frame_stack[-1]
+
+    def _temporary_frame(self) -> dict:
+        if self.temporary_frame is None:
+            DEBUG_PRINT("Temporary frame doesn't exist")
+            sys.exit(ErrorCodes.FrameNotDefined)
+
+        return self.temporary_frame
+
+    @staticmethod
+    def _define(frame: dict, name: str) -> None:
+        if name in frame:
+            redefined(name)
+
+        frame[name] = UNSET
+
+    @staticmethod
+    def _get(frame: dict, name: str):
+        value = frame.get(name, UNDEF)
+        if value is UNDEF:
+            missing(UNDEF, name)
+
+        return value
+
+    @staticmethod
+    def _set(frame: dict, name: str, value) -> None:
+        if name not in frame:
+            missing(UNDEF, name)
+
+        frame[name] = value
+
+    def define_lf(self, name: str) -> None:
+        self._define(self._local_frame(), name)
+
+    def define_tf(self, name: str) -> None:
+        self._define(self._temporary_frame(), name)
+
+    def get_lf(self, name: str):
+        return self._get(self._local_frame(), name)
+
+    def get_tf(self, name: str):
+        return self._get(self._temporary_frame(), name)
+
+    def set_lf(self, name: str, value) -> None:
+        self._set(self._local_frame(), name, value)
+
+    def set_tf(self, name: str, value) -> None:
+        self._set(self._temporary_frame(), name, value)
+
+    def pop(self):
+        if len(self.data_stack) == 0:
+            DEBUG_PRINT("Data stack is empty")
+            sys.exit(ErrorCodes.CallStackEmpty)
+
+        return self.data_stack.pop()
+
+    def return_index(self) -> int:
+        if len(self.call_stack) == 0:
+            DEBUG_PRINT("Call stack is empty")
+            sys.exit(ErrorCodes.CallStackEmpty)
+
+        return self.call_stack.pop()
+
+    # empty line or a value which can't be converted is nil
+    def read(self, datatype: str):
+        return self.input_stream.read(datatype)
+
+    def write(self, a) -> None:
+        if a is None:
+            return
+
+        if type(a) is bool:
+            self.output_stream.write("true" if a else "false")
+        elif type(a) is float:
+            self.output_stream.write(float.hex(a))
+        else:
+            self.output_stream.write(str(a))
+
+
+runtime_helpers = {
+    "UNDEF": UNDEF, "UNSET": UNSET,
+    "missing": missing, "redefined": redefined,
+    "add": add, "sub": sub, "mul": mul, "idiv": idiv, "div": div,
+    "lt": lt, "gt": gt, "eq": eq, "and_": and_, "or_": or_, "not_": not_,
+    "int2char": int2char, "stri2int": stri2int,
+    "int2float": int2float, "float2int": float2int,
+    "concat": concat, "strlen": strlen, "getchar": getchar, "setchar": setchar,
+    "type_name": type_name, "exit_": exit_,
+    "ErrorCodes": ErrorCodes, "DEBUG_PRINT": DEBUG_PRINT, "sys": sys,
+}
+
+# instructions after which the next instruction starts a new basic block
+block_terminators = {"JUMP", "JUMPIFEQ", "JUMPIFNEQ", "JUMPIFEQS", "JUMPIFNEQS",
+                     "CALL", "RETURN", "EXIT"}
+
+# instructions which never continue with the next instruction
+unconditional_jumps = {"JUMP", "CALL", "RETURN", "EXIT"}
+
+# binary operations, the first expression is used when both operands
+# have the type on the right, otherwise the checking helper is called
+binary_operations = {
+    "ADD": ("{a} + {b}", "int", "add"),
+    "SUB": ("{a} - {b}", "int", "sub"),
+    "MUL": ("{a} * {b}", "int", "mul"),
+    "IDIV": (None, None, "idiv"),
+    "DIV": (None, None, "div"),
+    "LT": ("{a} < {b}", "int", "lt"),
+    "GT": ("{a} > {b}", "int", "gt"),
+    "AND": ("{a} and {b}", "bool", "and_"),
+    "OR": ("{a} or {b}", "bool", "or_"),
+    "CONCAT": ("{a} + {b}", "str", "concat"),
+    "GETCHAR": (None, None, "getchar"),
+    "STRI2INT": (None, None, "stri2int"),
+}
+
+unary_operations = {
+    "NOT": ("not {a}", "bool", "not_"),
+    "STRLEN": ("len({a})", "str", "strlen"),
+    "INT2CHAR": (None, None, "int2char"),
+    "INT2FLOAT": (None, None, "int2float"),
+    "FLOAT2INT": (None, None, "float2int"),
+}
+
+stack_binary_operations = {
+    "ADDS": "ADD", "SUBS": "SUB", "MULS": "MUL", "IDIVS": "IDIV",
+    "LTS": "LT", "GTS": "GT", "ANDS": "AND", "ORS": "OR",
+    "STRI2INTS": "STRI2INT",
+}
+
+stack_unary_operations = {
+    "NOTS": "NOT", "INT2CHARS": "INT2CHAR",
+}
+
+# python type names of the IPPcode23 literal types
+python_types = {"int": "int", "bool": "bool", "string": "str", "float": "float", "nil": "None"}
+
+
+# Transpiler generates the source code of the program function
+# from the list of (already verified and linked) instruction objects
+class Transpiler:
+    def __init__(self, instructions: list[InstructionsClass.Instruction]):
+        self._instructions = instructions
+        # name of the variable in GF -> name of the python local
+        self._global_slots = {}
+        # constants which can't be written as python literals
+        self._constants = []
+
+    # compile the generated source and return the program function,
+    # it's called with TranspiledRuntime
+    def compile(self) -> Callable[[TranspiledRuntime], None]:
+        source = self.transpile()
+        namespace = dict(runtime_helpers)
+        namespace["constants"] = self._constants
+        exec(compile(source, "<IPPcode23>", "exec"), namespace)
+        return namespace["program"]
+
+    def transpile(self) -> str:
+        self._global_slots = {}
+        self._constants = []
+
+        blocks = self._split_blocks()
+        body = []
+        self._emit_dispatch(blocks, body, 2)
+
+        lines = ["def program(rt):"]
+        lines += ["    " + line for line in self._prologue()]
+        lines += ["    pc = 0", "    while True:"]
+        lines += body
+        return "\n".join(lines) + "\n"
+
+    def _prologue(self) -> list[str]:
+        lines = [
+            "get_lf = rt.get_lf", "get_tf = rt.get_tf",
+            "set_lf = rt.set_lf", "set_tf = rt.set_tf",
+            "define_lf = rt.define_lf", "define_tf = rt.define_tf",
+            "create_frame = rt.create_frame", "push_frame = rt.push_frame",
+            "pop_frame = rt.pop_frame", "read = rt.read", "write = rt.write",
+            "stack = rt.data_stack", "push = stack.append", "pop = rt.pop",
+            "call_stack = rt.call_stack", "return_index = rt.return_index",
+        ]
+        for index in range(len(self._constants)):
+            lines.append(f"k_{index} = constants[{index}]")
+
+        for name, slot in self._global_slots.items():
+            lines.append(f"{slot} = UNDEF  # GF@{name}")
+
+        return lines
+
+    # return (start, end) of basic blocks, the last block is the end of the program
+    def _split_blocks(self) -> list[tuple[int, int]]:
+        num_instructions = len(self._instructions)
+        leaders = {0, num_instructions}
+        for index, instruction in enumerate(self._instructions):
+            if instruction.opcode == "LABEL":
+                leaders.add(index)
+            elif instruction.opcode in block_terminators:
+                leaders.add(index + 1)
+
+        leaders = sorted(leaders)
+        blocks = list(zip(leaders, leaders[1:]))
+        blocks.append((num_instructions, num_instructions))
+        return blocks
+
+    # emit the blocks as a binary tree of ifs on pc,
+    # so choosing a block takes log(number of blocks) comparisons
+    def _emit_dispatch(self, blocks: list[tuple[int, int]], lines: list[str], depth: int) -> None:
+        indent = "    " * depth
+        if len(blocks) == 1:
+            lines += [indent + line for line in self._emit_block(*blocks[0])]
+            return
+
+        middle = len(blocks) // 2
+        lines.append(f"{indent}if pc < {blocks[middle][0]}:")
+        self._emit_dispatch(blocks[:middle], lines, depth + 1)
+        lines.append(f"{indent}else:")
+        self._emit_dispatch(blocks[middle:], lines, depth + 1)
+
+    def _emit_block(self, start: int, end: int) -> list[str]:
+        if start == len(self._instructions):
+            return ["return"]
+
+        lines = []
+        for index in range(start, end):
+            instruction = self._instructions[index]
+            lines.append(f"# {index}: {instruction.opcode}")
+            lines += getattr(self, "_emit_" + instruction.opcode, self._emit_operation)(instruction, index)
+
+        if self._instructions[end - 1].opcode not in unconditional_jumps:
+            lines += [f"pc = {end}", "continue"]
+
+        return lines
+
+    # ///--------- OPERANDS -------\\\\\\
+
+    @staticmethod
+    def _split_var(arg: Argument) -> tuple[str, str]:
+        frame, name = arg.value.split('@', 1)
+        return frame, name
+
+    def _global_slot(self, name: str) -> str:
+        if name not in self._global_slots:
+            self._global_slots[name] = f"g_{len(self._global_slots)}"
+
+        return self._global_slots[name]
+
+    # literals are already decoded to python values
+    def _literal(self, arg: Argument) -> str:
+        if arg.datatype == "float":
+            self._constants.append(arg.value)
+            return f"k_{len(self._constants) - 1}"
+
+        return repr(arg.value)
+
+    # return lines which load the operand into temp and the expression
+    # with its value, constants are used directly
+    def _load(self, arg: Argument, temp: str, initialized: bool = True) -> tuple[list[str], str]:
+        if arg.type_ != ArgumentType.VAR:
+            return [], self._literal(arg)
+
+        frame, name = self._split_var(arg)
+        if frame == "GF":
+            lines = [f"{temp} = {self._global_slot(name)}"]
+            check = f"{temp} is UNDEF or {temp} is UNSET" if initialized else f"{temp} is UNDEF"
+        else:
+            lines = [f"{temp} = get_{frame.lower()}({name!r})"]
+            check = f"{temp} is UNSET" if initialized else None
+
+        if check is not None:
+            lines.append(f"if {check}: missing({temp}, {arg.value!r})")
+
+        return lines, temp
+
+    def _store(self, arg: Argument, expression: str) -> list[str]:
+        frame, name = self._split_var(arg)
+        if frame == "GF":
+            slot = self._global_slot(name)
+            return [f"r = {expression}",
+                    f"if {slot} is UNDEF: missing(UNDEF, {arg.value!r})",
+                    f"{slot} = r"]
+
+        return [f"set_{frame.lower()}({name!r}, {expression})"]
+
+    # expression for an operation, with the fast path inlined when it exists
+    @staticmethod
+    def _operation_expression(operation: tuple, operands: list[tuple[Argument, str]]) -> str:
+        fast, fast_type, helper = operation
+        slow = f"{helper}({', '.join(expression for _, expression in operands)})"
+        if fast is None:
+            return slow
+
+        names = ["a", "b"]
+        fast = fast.format(**{names[i]: expression for i, (_, expression) in enumerate(operands)})
+        conditions = []
+        for arg, expression in operands:
+            if arg is None or arg.type_ == ArgumentType.VAR:
+                conditions.append(f"type({expression}) is {fast_type}")
+            elif python_types[arg.datatype] != fast_type:
+                return slow
+
+        if not conditions:
+            return fast
+
+        return f"({fast} if {' and '.join(conditions)} else {slow})"
+
+    # ///--------- INSTRUCTIONS -------\\\\\\
+
+    # three address instructions and unary instructions
+    def _emit_operation(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        if instruction.opcode in stack_binary_operations:
+            operation = binary_operations[stack_binary_operations[instruction.opcode]]
+            expression = self._operation_expression(operation, [(None, "a"), (None, "b")])
+            return ["b = pop()", "a = pop()", f"push({expression})"]
+
+        if instruction.opcode in stack_unary_operations:
+            operation = unary_operations[stack_unary_operations[instruction.opcode]]
+            expression = self._operation_expression(operation, [(None, "a")])
+            return ["a = pop()", f"push({expression})"]
+
+        dest_arg, *operand_args = instruction.args
+        lines = []
+        operands = []
+        for arg, temp in zip(operand_args, ["a", "b"]):
+            load_lines, expression = self._load(arg, temp)
+            lines += load_lines
+            operands.append((arg, expression))
+
+        if instruction.opcode in binary_operations:
+            operation = binary_operations[instruction.opcode]
+        else:
+            operation = unary_operations[instruction.opcode]
+
+        return lines + self._store(dest_arg, self._operation_expression(operation, operands))
+
+    def _emit_EQ(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        dest_arg, operand1_arg, operand2_arg = instruction.args
+        lines, expression = self._emit_compare(operand1_arg, operand2_arg)
+        return lines + self._store(dest_arg, expression)
+
+    def _emit_compare(self, operand1_arg: Argument, operand2_arg: Argument) -> tuple[list[str], str]:
+        lines1, a = self._load(operand1_arg, "a")
+        lines2, b = self._load(operand2_arg, "b")
+        return lines1 + lines2, f"({a} == {b} if type({a}) is type({b}) else eq({a}, {b}))"
+
+    def _emit_conditional_jump(self, condition: str, target: int) -> list[str]:
+        return [f"if {condition}:", f"    pc = {target}", "    continue"]
+
+    def _emit_JUMPIFEQ(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        label_arg, operand1_arg, operand2_arg = instruction.args
+        lines, expression = self._emit_compare(operand1_arg, operand2_arg)
+        return lines + self._emit_conditional_jump(expression, label_arg.value)
+
+    def _emit_JUMPIFNEQ(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        label_arg, operand1_arg, operand2_arg = instruction.args
+        lines, expression = self._emit_compare(operand1_arg, operand2_arg)
+        return lines + self._emit_conditional_jump("not " + expression, label_arg.value)
+
+    def _emit_JUMPIFEQS(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        condition = "(a == b if type(a) is type(b) else eq(a, b))"
+        return ["b = pop()", "a = pop()"] + self._emit_conditional_jump(condition, instruction.args[0].value)
+
+    def _emit_JUMPIFNEQS(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        condition = "not (a == b if type(a) is type(b) else eq(a, b))"
+        return ["b = pop()", "a = pop()"] + self._emit_conditional_jump(condition, instruction.args[0].value)
+
+    def _emit_EQS(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        return ["b = pop()", "a = pop()", "push(a == b if type(a) is type(b) else eq(a, b))"]
+
+    def _emit_JUMP(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        return [f"pc = {instruction.args[0].value}", "continue"]
+
+    def _emit_CALL(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        return [f"call_stack.append({index + 1})", f"pc = {instruction.args[0].value}", "continue"]
+
+    def _emit_RETURN(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        return ["pc = return_index()", "continue"]
+
+    def _emit_EXIT(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        lines, expression = self._load(instruction.args[0], "a")
+        return lines + [f"exit_({expression})"]
+
+    def _emit_nop(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        return []
+
+    _emit_LABEL = _emit_nop
+    _emit_DPRINT = _emit_nop
+    _emit_BREAK = _emit_nop
+
+    def _emit_DEFVAR(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        frame, name = self._split_var(instruction.args[0])
+        if frame == "GF":
+            slot = self._global_slot(name)
+            return [f"if {slot} is not UNDEF: redefined({instruction.args[0].value!r})",
+                    f"{slot} = UNSET"]
+
+        return [f"define_{frame.lower()}({name!r})"]
+
+    def _emit_CREATEFRAME(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        return ["create_frame()"]
+
+    def _emit_PUSHFRAME(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        return ["push_frame()"]
+
+    def _emit_POPFRAME(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        return ["pop_frame()"]
+
+    def _emit_MOVE(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        dest_arg, source_arg = instruction.args
+        lines, expression = self._load(source_arg, "a")
+        return lines + self._store(dest_arg, expression)
+
+    def _emit_PUSHS(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        lines, expression = self._load(instruction.args[0], "a")
+        return lines + [f"push({expression})"]
+
+    def _emit_POPS(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        return self._store(instruction.args[0], "pop()")
+
+    def _emit_CLEARS(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        return ["stack.clear()"]
+
+    def _emit_READ(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        var_arg, type_arg = instruction.args
+        if type_arg.value not in ["string", "int", "bool", "float"]:
+            return ["DEBUG_PRINT('Bad type on input')", "sys.exit(ErrorCodes.InputStructureBad)"]
+
+        return self._store(var_arg, f"read({type_arg.value!r})")
+
+    def _emit_WRITE(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        lines, expression = self._load(instruction.args[0], "a")
+        return lines + [f"write({expression})"]
+
+    def _emit_TYPE(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        dest_arg, source_arg = instruction.args
+        lines, expression = self._load(source_arg, "a", initialized=False)
+        return lines + self._store(dest_arg, f"type_name({expression})")
+
+    def _emit_SETCHAR(self, instruction: InstructionsClass.Instruction, index: int) -> list[str]:
+        dest_arg, index_arg, char_arg = instruction.args
+        lines, string = self._load(dest_arg, "s")
+        index_lines, index_expression = self._load(index_arg, "a")
+        char_lines, char_expression = self._load(char_arg, "b")
+        lines += index_lines + char_lines
+        expression = f"setchar({string}, {index_expression}, {char_expression})"
+        return lines + self._store(dest_arg, expression)